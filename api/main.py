@@ -42,8 +42,20 @@ async def get_duty_shell(date: date, shell_repo = Depends(ScheduleShellRepositor
 
 
 @app.get("/api/build") # TODO: make this a post request with schedules route
-async def build_schedule():
-    subprocess.Popen(['python', '../autoscheduler/main.py'])
+async def build_schedule(start: date | None = None, end: date | None = None, num_workers: int | None = None, max_time: float | None = None, relative_gap: float | None = None, random_seed: int | None = None):
+    args = ['python', '../autoscheduler/main.py']
+
+    # the days to build; the repository only loads the shell and absences that fall inside them
+    for (flag, value) in (('--start', start), ('--end', end)):
+        if value != None:
+            args += [flag, value.isoformat()]
+
+    # per-build overrides of the [SOLVER] section in config.ini
+    for (flag, value) in (('--num-workers', num_workers), ('--max-time', max_time), ('--relative-gap', relative_gap), ('--random-seed', random_seed)):
+        if value != None:
+            args += [flag, str(value)]
+
+    subprocess.Popen(args)
     return "Building..."
 
 @app.get("/api/schedules", response_model=list[schemas.Schedule])
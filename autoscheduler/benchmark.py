@@ -0,0 +1,192 @@
+import argparse
+import json
+import sys
+import time
+from ortools.sat.python import cp_model
+from concurrent.futures import ProcessPoolExecutor
+from scheduler.decomposition import DecompositionSolver
+from scheduler.instrumentation import max_rss_kb
+from scheduler.parameters import SolverParameters
+from scheduler.portfolio import PortfolioSolver
+from scheduler.rolling import RollingHorizonSolver
+from scheduler.solver import ScheduleModel, ScheduleSolver, ShellSchedule
+from synthetic import generate
+
+# (num_days, lines_per_day, num_personnel) per case, smallest first
+SIZES = {
+    'small': [(1, 10, 20), (2, 15, 30), (3, 20, 40)],
+    'default': [(1, 20, 40), (3, 25, 60), (5, 30, 90), (10, 35, 120)],
+    'large': [(5, 30, 90), (10, 35, 120), (20, 40, 160), (40, 40, 200)]
+}
+
+def run_case(num_days: int, lines_per_day: int, num_personnel: int, seed: int, max_time: float, overlap_mode: str, recurring_absence_density: float, decompose: bool = False, rolling: tuple[int, int] | None = None, objective_mode: str = 'weighted', symmetry_breaking: bool = False, portfolio: bool = False) -> dict:
+    inputs = generate(seed = seed, num_days = num_days, lines_per_day = lines_per_day, num_personnel = num_personnel, recurring_absence_density = recurring_absence_density)
+
+    start = time.perf_counter()
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences, overlap_mode = overlap_mode, objective_mode = objective_mode, symmetry_breaking = symmetry_breaking)
+    model.add_all_contraints()
+    build_time = time.perf_counter() - start
+
+    proto = model._handle().Proto()
+    num_vars = len(proto.variables)
+    num_constraints = len(proto.constraints)
+
+    solver = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(max_time_s = max_time))
+
+    start = time.perf_counter()
+    solution = solver.solve()
+    solve_time = time.perf_counter() - start
+
+    result = {
+        'num_days': num_days,
+        'lines_per_day': lines_per_day,
+        'num_personnel': num_personnel,
+        'num_commitments': len(shell.commitments()),
+        'num_variables': num_vars,
+        'num_constraints': num_constraints,
+        'build_time_s': build_time,
+        'solve_time_s': solve_time,
+        'peak_rss_kb': max_rss_kb(),
+        'status': solution.status_name(),
+        'objective': solution._objective,
+        'phases': [{'name': phase.name, 'status': cp_model.CpSolver().StatusName(phase.status), 'wall_time_s': phase.wall_time} for phase in solution._phases]
+    }
+
+    if (decompose):
+        decomposed_shell = ShellSchedule(inputs.lines, inputs.duties)
+        decomposition = DecompositionSolver(decomposed_shell, inputs.personnel, inputs.absences, overlap_mode = overlap_mode)
+
+        start = time.perf_counter()
+        decomposed = decomposition.solve()
+        result['decomposed'] = {
+            'solve_time_s': time.perf_counter() - start,
+            'status': decomposed.status_name(),
+            'objective': decomposed._objective,
+            'rounds': decomposition.report().rounds,
+            'converged': decomposition.report().converged
+        }
+
+    if (rolling != None):
+        rolling_shell = ShellSchedule(inputs.lines, inputs.duties)
+        (window_days, commit_days) = rolling
+        rolling_solver = RollingHorizonSolver(rolling_shell, inputs.personnel, inputs.absences, window_days, commit_days, overlap_mode = overlap_mode, parameters = SolverParameters(max_time_s = max_time))
+
+        start = time.perf_counter()
+        rolled = rolling_solver.solve()
+        result['rolling'] = {
+            'solve_time_s': time.perf_counter() - start,
+            'status': rolled.status_name(),
+            'objective': rolled._objective,
+            'max_window_variables': max(w.num_variables for w in rolling_solver.windows()),
+            'max_window_solve_time_s': max(w.wall_time for w in rolling_solver.windows()),
+            'peak_rss_kb': max_rss_kb()
+        }
+
+    if (portfolio):
+        portfolio_shell = ShellSchedule(inputs.lines, inputs.duties)
+        portfolio_solver = PortfolioSolver(portfolio_shell, inputs.personnel, inputs.absences, parameters = SolverParameters(max_time_s = max_time))
+
+        start = time.perf_counter()
+        raced = portfolio_solver.solve()
+        result['portfolio'] = {
+            'solve_time_s': time.perf_counter() - start,
+            'status': raced.status_name(),
+            'objective': raced._objective,
+            'winner': portfolio_solver.report().winner,
+            'configurations': [{'name': r.name, 'status': cp_model.CpSolver().StatusName(r.status), 'objective': r.objective, 'wall_time_s': r.wall_time} for r in portfolio_solver.report().results]
+        }
+
+    return result
+
+def run(sizes: list[tuple[int, int, int]], seed: int, max_time: float, overlap_mode: str, recurring_absence_density: float, decompose: bool = False, rolling: tuple[int, int] | None = None, objective_mode: str = 'weighted', symmetry_breaking: bool = False, portfolio: bool = False) -> list[dict]:
+    results = []
+
+    for (num_days, lines_per_day, num_personnel) in sizes:
+        # a fresh process per case so peak RSS belongs to that case alone
+        with ProcessPoolExecutor(max_workers = 1) as pool:
+            result = pool.submit(run_case, num_days, lines_per_day, num_personnel, seed, max_time, overlap_mode, recurring_absence_density, decompose, rolling, objective_mode, symmetry_breaking, portfolio).result()
+
+        print_result(result)
+        results.append(result)
+
+    return results
+
+def print_header():
+    print('%5s %6s %6s %8s %9s %9s %9s %9s %10s  %s' % ('days', 'lines', 'ppl', 'commits', 'vars', 'cons', 'build(s)', 'solve(s)', 'rss(MB)', 'status'))
+
+def print_result(r: dict):
+    rss = '-' if r['peak_rss_kb'] == None else '%.1f' % (r['peak_rss_kb'] / 1024.0)
+    print('%5i %6i %6i %8i %9i %9i %9.3f %9.3f %10s  %s' % (r['num_days'], r['lines_per_day'], r['num_personnel'], r['num_commitments'], r['num_variables'], r['num_constraints'], r['build_time_s'], r['solve_time_s'], rss, r['status']))
+
+    for phase in r.get('phases', []):
+        print('%5s phase %s: %s in %.3fs' % ('', phase['name'], phase['status'], phase['wall_time_s']))
+
+    d = r.get('decomposed')
+    if (d != None):
+        objectives = ' '.join('-' if o == None else '%.4f' % o for o in (d['objective'], r['objective']))
+        print('%5s decomposed: %s, objective %s (vs monolithic), solve %.3fs vs %.3fs, %i rounds%s' % ('', d['status'], objectives, d['solve_time_s'], r['solve_time_s'], d['rounds'], ', converged' if d['converged'] else ''))
+
+    w = r.get('rolling')
+    if (w != None):
+        objectives = ' '.join('-' if o == None else '%.4f' % o for o in (w['objective'], r['objective']))
+        print('%5s rolling: %s, objective %s (vs monolithic), solve %.3fs vs %.3fs, max window %i vars / %.3fs' % ('', w['status'], objectives, w['solve_time_s'], r['solve_time_s'], w['max_window_variables'], w['max_window_solve_time_s']))
+
+    f = r.get('portfolio')
+    if (f != None):
+        objectives = ' '.join('-' if o == None else '%.4f' % o for o in (f['objective'], r['objective']))
+        print('%5s portfolio: %s, objective %s (vs monolithic), solve %.3fs vs %.3fs, won by %s' % ('', f['status'], objectives, f['solve_time_s'], r['solve_time_s'], f['winner']))
+
+def find_regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    regressions = []
+    keyed = {(b['num_days'], b['lines_per_day'], b['num_personnel']): b for b in baseline}
+
+    for r in results:
+        b = keyed.get((r['num_days'], r['lines_per_day'], r['num_personnel']))
+        if (b == None):
+            continue
+
+        for metric in ('build_time_s', 'num_variables', 'num_constraints'):
+            if (r[metric] > tolerance * b[metric]):
+                regressions.append('%i days/%i lines/%i people: %s %.3f vs baseline %.3f' % (r['num_days'], r['lines_per_day'], r['num_personnel'], metric, r[metric], b[metric]))
+
+    return regressions
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description = 'Scaling benchmark for ScheduleModel/ScheduleSolver on synthetic shells.')
+    parser.add_argument('--sizes', choices = SIZES.keys(), default = 'default')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--max-time', type = float, default = 30.0, help = 'solver time limit per case in seconds')
+    parser.add_argument('--overlap-mode', choices = ScheduleModel.OVERLAP_MODES, default = 'pairwise')
+    parser.add_argument('--objective-mode', choices = ScheduleModel.OBJECTIVE_MODES, default = 'weighted')
+    parser.add_argument('--symmetry-breaking', action = 'store_true')
+    parser.add_argument('--recurring-absence-density', type = float, default = 0.1)
+    parser.add_argument('--decompose', action = 'store_true', help = 'also solve each case with DecompositionSolver and compare it to the monolithic solve')
+    parser.add_argument('--rolling', nargs = 2, type = int, metavar = ('WINDOW_DAYS', 'COMMIT_DAYS'), help = 'also solve each case with RollingHorizonSolver and compare it to the monolithic solve')
+    parser.add_argument('--portfolio', action = 'store_true', help = 'also race the default portfolio of configurations and compare it to the monolithic solve')
+    parser.add_argument('--json', help = 'write results to this file')
+    parser.add_argument('--compare', help = 'baseline results file to check for regressions')
+    parser.add_argument('--tolerance', type = float, default = 1.5, help = 'allowed ratio to the baseline before a metric counts as a regression')
+    args = parser.parse_args(argv)
+
+    print_header()
+    results = run(SIZES[args.sizes], args.seed, args.max_time, args.overlap_mode, args.recurring_absence_density, args.decompose, tuple(args.rolling) if args.rolling else None, args.objective_mode, args.symmetry_breaking, args.portfolio)
+
+    if (args.json):
+        with open(args.json, 'w') as out_file:
+            json.dump(results, out_file, indent=2)
+
+    if (args.compare):
+        with open(args.compare) as in_file:
+            regressions = find_regressions(results, json.load(in_file), args.tolerance)
+
+        for r in regressions:
+            print('REGRESSION: ' + r)
+
+        if (len(regressions) > 0):
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
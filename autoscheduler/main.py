@@ -1,7 +1,17 @@
+import argparse
 import configparser
+import os
+from datetime import date, timedelta
 from repository import AutoschedulerRepository, CSVRepository, DatabaseRepository 
-from scheduler.solver import ScheduleModel, ScheduleSolution, ScheduleSolver, ShellSchedule
-from printers import ConsoleSolutionPrinter, DatabaseSolutionPrinter, ExcelSolutionPrinter, HtmlSolutionPrinter, SolutionPrinter
+from scheduler.cache import ModelCache
+from scheduler.decomposition import DecompositionSolver
+from scheduler.diagnosis import diagnose_infeasibility
+from scheduler.incremental import IncrementalSolver
+from scheduler.parameters import SolverParameters
+from scheduler.portfolio import PortfolioSolver
+from scheduler.rolling import RollingHorizonSolver
+from scheduler.solver import ScheduleSolution, ScheduleSolver, build_model
+from printers import ConsoleSolutionPrinter, DatabaseSolutionPrinter, ExcelSolutionPrinter, HtmlSolutionPrinter, ProgressPrinter, SolutionPrinter
 
 from ortools.sat.python import cp_model
 
@@ -9,7 +19,7 @@ def get_repo(repo_type: str, config: configparser.ConfigParser) -> Autoscheduler
     if (repo_type.lower() == 'database'):
         return DatabaseRepository()
     else:
-        return CSVRepository(config['FILES'])
+        return CSVRepository(config['FILES'], parallel_parse=config['FILES'].getboolean('parallel-parse', fallback=False))
 
 def get_printer(printer_type: str, config: configparser.ConfigParser, solution: ScheduleSolution) -> SolutionPrinter:
     if (printer_type.lower() == 'html'):
@@ -25,7 +35,19 @@ def get_printer(printer_type: str, config: configparser.ConfigParser, solution:
     
     return ConsoleSolutionPrinter(solution)
 
-def run():
+def schedule_window(config: configparser.SectionProxy, start: date | None = None, end: date | None = None) -> tuple[date, date]:
+    # the command line wins over config.ini; with neither, the week starting tomorrow is built
+    if (start == None):
+        start_date = config.get('start_date', '')
+        start = date.fromisoformat(start_date) if start_date != '' else date.today() + timedelta(days = 1)
+
+    if (end == None):
+        end_date = config.get('end_date', '')
+        end = date.fromisoformat(end_date) if end_date != '' else start + timedelta(days = config.getint('num_days', 7) - 1)
+
+    return (start, end)
+
+def run(start: date | None = None, end: date | None = None, solver_overrides: dict | None = None):
     print("Entering Run")
 
     REPO_TYPE = 'Database'
@@ -36,23 +58,108 @@ def run():
 
     repo = get_repo(REPO_TYPE, config)
 
-    personnel = repo.get_personnel()
-    lines = repo.get_lines()
-    duties = repo.get_duties()
-    absences = repo.get_absences()
+    (start, end) = schedule_window(config['SCHEDULE'], start, end)
+    print('Building %s to %s' % (start, end))
+
+    inputs = repo.load_input(start, end)
+    print('Loaded %s' % inputs)
+
+    personnel = inputs.personnel()
+    absences = inputs.absences()
    
-    shell = ShellSchedule(lines, duties)
-    model = ScheduleModel(shell, personnel, absences)
-    model.add_all_contraints()
+    model_config = config['MODEL']
+    overlap_mode = model_config.get('overlap_mode', 'pairwise')
+    write_build_stats = model_config.getboolean('write_build_stats', fallback=False)
+    solver_params = SolverParameters.from_config(config['SOLVER']).override(**(solver_overrides or {}))
+
+    shell = inputs.shell()
+
+    # the last schedule published for the same dates seeds the solver with hints
+    published = None
+    if (len(shell.days()) > 0):
+        (start, end) = shell.date_range()
+        published = repo.get_published_schedule(start, end)
+
+    solve_mode = model_config.get('solve_mode', 'monolithic').lower()
+    incremental = published != None and model_config.getboolean('incremental', fallback=False)
+
+    objective_mode = model_config.get('objective_mode', 'weighted')
+    symmetry_breaking = model_config.getboolean('symmetry_breaking', fallback=False)
+    cache_dir = model_config.get('model_cache_dir', '')
+
+    # the other solve modes build their own subproblem models, so these settings only reach a monolithic build;
+    # refuse them rather than solve something other than what was configured
+    if (incremental or solve_mode in ('rolling', 'portfolio', 'decomposed')):
+        mode = 'incremental' if incremental else solve_mode
+        if (objective_mode.lower() != 'weighted'):
+            raise ValueError('objective_mode %s is not supported by the %s solve mode' % (objective_mode, mode))
+        if (symmetry_breaking):
+            raise ValueError('symmetry_breaking is not supported by the %s solve mode' % mode)
+        if (cache_dir != ''):
+            raise ValueError('model_cache_dir is not supported by the %s solve mode' % mode)
 
-    solver = ScheduleSolver(model, personnel, shell)
-    #solution = solver.solve()
-    solution = ScheduleSolution(cp_model.OPTIMAL, ShellSchedule([], [])) # TODO: make sure to remove this after testing!
+    if (incremental):
+        solver = IncrementalSolver(shell, personnel, absences, published, overlap_mode=overlap_mode, parameters=solver_params)
+        print('Incremental: re-optimizing %i of %i days' % (len(solver.affected_dates()), len(shell.days())))
+    elif (solve_mode == 'rolling'):
+        solver = RollingHorizonSolver(shell, personnel, absences, window_days=model_config.getint('window_days', 14), commit_days=model_config.getint('commit_days', 7),
+                                      overlap_mode=overlap_mode, parameters=solver_params)
+    elif (solve_mode == 'portfolio'):
+        solver = PortfolioSolver(shell, personnel, absences, parameters=solver_params)
+    elif (solve_mode == 'decomposed'):
+        solver = DecompositionSolver(shell, personnel, absences, overlap_mode=overlap_mode, parameters=solver_params)
+    else:
+        # an empty cache directory turns the model cache off
+        cache = ModelCache(cache_dir, model_config.getint('model_cache_max_mb', 256) * 1024 * 1024) if cache_dir != '' else None
+
+        model = build_model(shell, personnel, absences, cache=cache, overlap_mode=overlap_mode, instrument=write_build_stats, objective_mode=objective_mode,
+                            symmetry_breaking=symmetry_breaking)
+
+        if (write_build_stats):
+            model.stats().write_json(os.path.join(config['FILES']['output_dir'], 'build_stats.json'))
+
+        solver = ScheduleSolver(model, personnel, shell, solver_params, sinks=[ProgressPrinter()])
+        if (published != None):
+            print('Warm start: %s' % solver.warm_start(published))
+
+    solution = solver.solve()
+
+    # a feasibility check that names the conflicting constraint families, so nobody has to switch them off one at a time
+    if (solution._status == cp_model.INFEASIBLE and model_config.getboolean('diagnose_infeasibility', fallback=True)):
+        # a time limit of its own: the build's may be minutes, and the point is to say why it failed in seconds
+        diagnosis_params = solver_params.override(max_time_s=model_config.getfloat('diagnosis_max_time_s', fallback=10.0))
+        solution._diagnosis = diagnose_infeasibility(shell, personnel, absences, parameters=diagnosis_params)
+        print('Infeasible: %s' % solution._diagnosis)
 
     printer = get_printer(PRINTER_TYPE, config, solution)
     printer.print()
 
+    for phase in solution._phases:
+        print('Phase %s' % phase)
+
+    if (solution._warm_start != None):
+        print('Warm start: %s' % solution._warm_start)
+
+    if (isinstance(solver, PortfolioSolver)):
+        # which configuration wins, and by how much, is what the defaults get tuned from
+        print('Portfolio: %s' % solver.report())
+        for result in solver.report().results:
+            print('  %s' % result)
+
     print("Exiting Run")
 
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser(description = 'Build a schedule; dates override the [SCHEDULE] section of config.ini and solver options the [SOLVER] section.')
+    parser.add_argument('--start', type = date.fromisoformat)
+    parser.add_argument('--end', type = date.fromisoformat)
+    parser.add_argument('--num-workers', type = int)
+    parser.add_argument('--max-time', dest = 'max_time_s', type = float)
+    parser.add_argument('--relative-gap', type = float)
+    parser.add_argument('--absolute-gap', type = float)
+    parser.add_argument('--random-seed', type = int)
+    parser.add_argument('--log-search', action = 'store_true', default = None)
+    return vars(parser.parse_args())
+
 if __name__ == "__main__":
-    run()
+    args = parse_args()
+    run(args.pop('start'), args.pop('end'), args)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String 
+from sqlalchemy import Column, DateTime, Float, Integer, String 
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy import ForeignKey, Table
@@ -129,3 +129,23 @@ class Schedule(Base):
     submission_date_time = Column(DateTime)
 
     status = Column(String)
+
+    solve_wall_time = Column(Float)
+
+    assignments = relationship('ScheduleAssignment', back_populates='schedule')
+
+class ScheduleAssignment(Base):
+    __tablename__ = 'schedule_assignment'
+
+    id = Column(Integer, primary_key=True)
+
+    schedule_id = Column(Integer, ForeignKey('schedule.id'))
+    schedule = relationship('Schedule', back_populates='assignments')
+
+    commitment_key = Column(String)
+
+    # when the commitment ran as published, so a later build can tell it has moved within its day
+    start_date_time = Column(DateTime)
+    end_date_time = Column(DateTime)
+
+    person_line_id = Column(Integer, ForeignKey('person_line.id'))
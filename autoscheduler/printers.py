@@ -1,10 +1,14 @@
 
 from abc import ABC, abstractmethod
 from repository import DatabaseRepository
+from scheduler.callbacks import IntermediateSolution, SolutionSink
 from scheduler.models import Duty, Line, Person
-from scheduler.solver import ScheduleSolution, time_between
+from scheduler.solver import ScheduleSolution, ShellSchedule, time_between
+from scheduler.warmstart import PublishedSchedule
+import html
 import xlsxwriter
 import os
+import time
 from datetime import datetime, timedelta
 from ortools.sat.python import cp_model
 
@@ -17,7 +21,7 @@ def compute_sorties_for_schedule(solution: ScheduleSolution, person: Person) ->
     ct = 0
     for day in solution._schedule.days():
         for commit in day.commitments():
-            p = commit.assigned_to()
+            p = solution.assigned_to(commit)
             if (p != None and p.id() == person.id()):
                 ct += 1 
     return ct
@@ -26,7 +30,7 @@ def compute_duties_for_schedule(solution: ScheduleSolution, person: Person) -> i
     ct = 0
     for day in solution._schedule.days():
         for commit in day.commitments(Duty):
-            p = commit.assigned_to()
+            p = solution.assigned_to(commit)
             if (p != None and p.id() == person.id()):
                 ct += 1 
     return ct
@@ -37,7 +41,7 @@ def compute_max_turn_time_for(solution: ScheduleSolution, person: Person) -> tim
     for day in solution._schedule.days():
         prev_commit = None
         for commit in day.commitments():
-            if commit.assigned_to() == person:
+            if solution.assigned_to(commit) == person:
                 if prev_commit != None:
                     turn_time = time_between(prev_commit, commit)
 
@@ -48,21 +52,62 @@ def compute_max_turn_time_for(solution: ScheduleSolution, person: Person) -> tim
 
     return max_turn
 
+def diagnosis_lines(solution: ScheduleSolution) -> list[str]:
+    if (solution._diagnosis == None):
+        return []
+
+    return [str(solution._diagnosis)] + [str(conflict) for conflict in solution._diagnosis.conflicts]
+
+class ProgressPrinter(SolutionSink):
+
+    def on_solution(self, solution: IntermediateSolution) -> bool:
+        if (solution.phase != None):
+            print('solution %i (phase %s): value %.4f, bound %.4f, gap %.2f%%, %.1fs' % (solution.index, solution.phase, solution.objective, solution.best_bound, 100.0 * solution.gap(), solution.wall_time))
+        else:
+            print('solution %i: objective %.4f, bound %.4f, gap %.2f%%, %.1fs' % (solution.index, solution.objective, solution.best_bound, 100.0 * solution.gap(), solution.wall_time))
+        return False
+
+class BestSoFarPrinter(SolutionSink):
+
+    def __init__(self, shell: ShellSchedule, personnel: list[Person], make_printer, min_interval_s: float = 30.0):
+        # make_printer: ScheduleSolution -> SolutionPrinter, e.g. a get_printer partial
+        self._shell = shell
+        self._personnel = personnel
+        self._make_printer = make_printer
+        self._min_interval_s = min_interval_s
+        self._last_published = None
+
+    def on_solution(self, solution: IntermediateSolution) -> bool:
+        now = time.monotonic()
+        if (self._last_published != None and now - self._last_published < self._min_interval_s):
+            return False
+
+        # a lexicographic phase's values are not the schedule's objective, so only its assignments are passed on
+        (objective, best_bound) = (solution.objective, solution.best_bound) if solution.phase == None else (None, None)
+        best_so_far = ScheduleSolution(cp_model.FEASIBLE, self._shell, objective = objective, best_bound = best_bound, wall_time = solution.wall_time,
+                                       assignments = solution.assignments, personnel = self._personnel)
+        self._make_printer(best_so_far).print()
+        self._last_published = now
+
+        return False
+
 class ConsoleSolutionPrinter(SolutionPrinter):
 
     def __init__(self, solution: ScheduleSolution) -> None:
         self._solution = solution
 
     def print(self):
-        if (self._solution._status != cp_model.OPTIMAL):
+        if (not self._solution.has_schedule()):
             print("Solution is infeasible")
+            for line in diagnosis_lines(self._solution):
+                print('  ' + line)
             return
             
         for day in self._solution._schedule.days():
             for duty in day.commitments(Duty):
                 print(duty.name + ': ', end='')
 
-                person = duty.assigned_to()
+                person = self._solution.assigned_to(duty)
                 if person != None:
                     print("%s, %s" % (person._last_name, person._first_name), end='')
                 
@@ -71,7 +116,7 @@ class ConsoleSolutionPrinter(SolutionPrinter):
             for line in day.commitments(Line):
                 print('[%i][%s] brief: %s, takeoff: %s, debrief end: %s -- ' % (line.number, line.flight_org, line.time_brief.strftime('%H%M'), line.time_takeoff.strftime('%H%M'), line.time_debrief_end.strftime('%H%M')), end='')
 
-                person = line.assigned_to() 
+                person = self._solution.assigned_to(line)
                 if person != None:
                     print("%s, %s" % (person._last_name, person._first_name), end='')
                     
@@ -105,8 +150,15 @@ class HtmlSolutionPrinter(SolutionPrinter):
             self._print_header(out_file)
             self._print_menu(out_file)
 
-            if (self._solution._status != cp_model.OPTIMAL):
+            if (not self._solution.has_schedule()):
                 print("Solution is infeasible", file=out_file)
+
+                lines = diagnosis_lines(self._solution)
+                if (len(lines) > 0):
+                    print('    <ul>', file=out_file)
+                    for line in lines:
+                        print(f'      <li>{html.escape(line)}</li>', file=out_file)
+                    print('    </ul>', file=out_file)
             else:
                 for day in self._solution._schedule.days():
                     print(f"    <h3>{day.date().strftime('%a, %-m/%-d/%Y')}</h3>", file=out_file)
@@ -120,7 +172,7 @@ class HtmlSolutionPrinter(SolutionPrinter):
                         print(f'        <td>{line.flight_org}</td>', file=out_file)
                         print(f'        <td>{line.time_takeoff.strftime("%H%M")}</td>', file=out_file)
 
-                        person = line.assigned_to()
+                        person = self._solution.assigned_to(line)
                         if person != None:
                             print("        <td>%s, %s</td>" % (person._last_name, person._first_name), file=out_file)
                         print("      </tr>", file=out_file)
@@ -129,7 +181,7 @@ class HtmlSolutionPrinter(SolutionPrinter):
                         print("      <tr>", file=out_file)
                         print("        <td>", duty.name + ': ', "</td>", file=out_file)
 
-                        person = duty.assigned_to()
+                        person = self._solution.assigned_to(duty)
                         if person != None:
                             print("        <td>%s, %s</td>" % (person._last_name, person._first_name), file=out_file)
                         
@@ -148,7 +200,7 @@ class HtmlSolutionPrinter(SolutionPrinter):
             print('      <th># of Events</th>', file=out_file)
             print('      <th># of Duties</th>', file=out_file)
             print('      <th>Max Turn Time</th>', file=out_file)
-            for person in self._personnel:
+            for person in self._solution.personnel():
                 print('      <tr>', file=out_file)
                 print(f'        <td>{person._last_name}, {person._first_name}</td>', file=out_file)
 
@@ -188,9 +240,9 @@ class ExcelSolutionPrinter():
                     worksheet.write(row, col + 1, line.flight_org)
                     worksheet.write(row, col + 2, line.time_takeoff.strftime("%H%M"))
                     
-                    person = line.assigned_to()
+                    person = self._solution.assigned_to(line)
                     if person != None:
-                        worksheet.write(row, col + 3, line._person._last_name + ', ' + line._person._first_name)
+                        worksheet.write(row, col + 3, person._last_name + ', ' + person._first_name)
                     
                     row = row + 1
 
@@ -200,5 +252,8 @@ class DatabaseSolutionPrinter():
         self._repo = repo
 
     def print(self):
-        print('printing.......')
-        self._repo.insert_schedule()
+        if (not self._solution.has_schedule() or len(self._solution._schedule.days()) == 0):
+            return
+
+        (start, end) = self._solution._schedule.date_range()
+        self._repo.publish_schedule(start, end, PublishedSchedule.from_solution(self._solution))
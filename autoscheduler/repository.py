@@ -1,13 +1,21 @@
 from abc import  ABC, abstractmethod
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache, partial
+from time import perf_counter
 
 import csv
 from enum import IntEnum
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.orm import joinedload, selectinload
 
 from data import Session
-from models import AbsenceRequestDto, PersonLine, ShellDuty, ShellLine
+from models import AbsenceRequestDto, PersonLine, Schedule, ScheduleAssignment, ShellDuty, ShellLine
+from models import Duty as DutyDto, Qualification as QualificationDto
+from scheduler.inputs import ScheduleInput
 from scheduler.models import AbsenceRequest, Duty, Line, Person, Qualification
+from scheduler.recurrence import RecurringAbsence, overlaps
+from scheduler.warmstart import JsonScheduleStore, PublishedSchedule
 
 class AutoschedulerRepository(ABC):
 
@@ -16,100 +24,233 @@ class AutoschedulerRepository(ABC):
         pass
 
     @abstractmethod
-    def get_duties(self) -> list[Duty]:
+    def get_duties(self, start: date, end: date) -> list[Duty]:
         pass
 
     @abstractmethod
-    def get_lines(self) -> list[Line]:
+    def get_lines(self, start: date, end: date) -> list[Line]:
         pass
 
     @abstractmethod
-    def get_absences(self) -> list[AbsenceRequest]:
+    def get_absences(self, start: date, end: date) -> list[AbsenceRequest]:
         pass
 
+    @abstractmethod
+    def get_published_schedule(self, start: date, end: date) -> PublishedSchedule | None:
+        pass
+
+    @abstractmethod
+    def publish_schedule(self, start: date, end: date, published: PublishedSchedule) -> None:
+        pass
+
+    def load_input(self, start: date, end: date) -> ScheduleInput:
+        # the four datasets are independent reads, so they are fetched side by side rather than one after another
+        return load_concurrently(start, end, {
+            'personnel': self.get_personnel,
+            'lines': lambda: self.get_lines(start, end),
+            'duties': lambda: self.get_duties(start, end),
+            'absences': lambda: self.get_absences(start, end)
+        })
+
+def timed(load):
+    started = perf_counter()
+    result = load()
+    return (result, perf_counter() - started)
+
+def load_concurrently(start: date, end: date, loaders: dict, max_workers: int | None = None) -> ScheduleInput:
+    started = perf_counter()
+
+    if (max_workers == 1):
+        # loaders sharing one session stay on the thread that owns it
+        results = {name: timed(load) for (name, load) in loaders.items()}
+    else:
+        with ThreadPoolExecutor(max_workers = max_workers or len(loaders)) as pool:
+            futures = {name: pool.submit(timed, load) for (name, load) in loaders.items()}
+            results = {name: future.result() for (name, future) in futures.items()}
+
+    return timed_input(start, end, results, started)
+
+def timed_input(start: date, end: date, results: dict, started: float) -> ScheduleInput:
+    # results are dataset name -> (dataset, seconds its load took), as timed returns them
+    datasets = {name: result for (name, (result, _)) in results.items()}
+    timings = {name: seconds for (name, (_, seconds)) in results.items()}
+
+    return ScheduleInput(start, end, timings = timings, wall_time = perf_counter() - started, **datasets)
 
-def daterange(start_date, end_date):
-    for n in range(int((end_date - start_date).days + 1)):
-        yield start_date + timedelta(n)
+
+def window_bounds(start: date, end: date) -> tuple[datetime, datetime]:
+    # [midnight starting the first day, midnight ending the last day)
+    return (datetime.combine(start, time.min), datetime.combine(end + timedelta(days = 1), time.min))
 
 class DatabaseRepository(AutoschedulerRepository):
 
+    def __init__(self, session_factory = Session):
+        self._session_factory = session_factory
+
     def get_personnel(self) -> list[Person]:
-        with Session() as session:
-            result = session.scalars(select(PersonLine))
-            
-            personnel: list[Person] = []
-
-            for user in result:
-                person = Person(user.id, user.person.last_name, user.person.first_name, user.ausm_tier)
-
-                if (len(user.assigned_org) > 0):
-                    org = user.assigned_org[0].name
-                    person.assign_to(org)
-                for qual in user.quals:
-                    person.qual(Qualification(qual.type.name, qual.name))
-
-                personnel.append(person)
-        
+        with self._session_factory() as session:
+            return self._select_personnel(session)
+
+    def get_duties(self, start: date, end: date) -> list[Duty]:
+        with self._session_factory() as session:
+            return self._select_duties(session, start, end)
+
+    def get_lines(self, start: date, end: date) -> list[Line]:
+        with self._session_factory() as session:
+            return self._select_lines(session, start, end)
+
+    def get_absences(self, start: date, end: date) -> list[AbsenceRequest]:
+        with self._session_factory() as session:
+            return self._select_absences(session, start, end)
+
+    def load_input(self, start: date, end: date) -> ScheduleInput:
+        selects = {
+            'personnel': lambda session: self._select_personnel(session),
+            'lines': lambda session: self._select_lines(session, start, end),
+            'duties': lambda session: self._select_duties(session, start, end),
+            'absences': lambda session: self._select_absences(session, start, end)
+        }
+
+        with self._session_factory() as session:
+            if (session.get_bind().dialect.name != 'postgresql'):
+                # without exportable snapshots the datasets are read one after another inside a single transaction instead
+                return load_concurrently(start, end, {name: (lambda load = load: load(session)) for (name, load) in selects.items()}, max_workers = 1)
+
+            # every worker's transaction imports this one's snapshot, so all four see the database as of the same instant;
+            # the exporting transaction has to stay open until they all have
+            session.connection(execution_options = {'isolation_level': 'REPEATABLE READ'})
+            snapshot = session.scalar(text('SELECT pg_export_snapshot()'))
+
+            return load_concurrently(start, end, {name: (lambda load = load: self._select_in_snapshot(snapshot, load)) for (name, load) in selects.items()})
+
+    def _select_in_snapshot(self, snapshot: str, load):
+        with self._session_factory() as session:
+            session.connection(execution_options = {'isolation_level': 'REPEATABLE READ'})
+            session.execute(text("SET TRANSACTION SNAPSHOT '%s'" % snapshot))
+            return load(session)
+
+    def _select_personnel(self, session) -> list[Person]:
+        # one query per relationship rather than one per person: the person row is joined in, orgs and quals (with their types) come in a batch each
+        stmt = select(PersonLine).options(joinedload(PersonLine.person), selectinload(PersonLine.assigned_org),
+                                          selectinload(PersonLine.quals).joinedload(QualificationDto.type)).order_by(PersonLine.id)
+        personnel: list[Person] = []
+
+        for user in session.scalars(stmt):
+            person = Person(user.id, user.person.last_name, user.person.first_name, user.ausm_tier)
+
+            if (len(user.assigned_org) > 0):
+                org = user.assigned_org[0].name
+                person.assign_to(org)
+            for qual in user.quals:
+                person.qual(Qualification(qual.type.name, qual.name))
+
+            personnel.append(person)
+
         return personnel
 
-    def get_duties(self) -> list[Duty]:
-        with Session() as session:
-            result = session.scalars(select(ShellDuty))
+    def _select_duties(self, session, start: date, end: date) -> list[Duty]:
+        (window_start, window_end) = window_bounds(start, end)
 
-            duties = [Duty(duty_dto.duty.name, duty_dto.duty.duty_type.name, duty_dto.start_date_time, duty_dto.end_date_time) for duty_dto in result]
-            return duties
+        stmt = select(ShellDuty).options(joinedload(ShellDuty.duty).joinedload(DutyDto.duty_type)).where(ShellDuty.start_date_time >= window_start, ShellDuty.start_date_time < window_end).order_by(ShellDuty.start_date_time, ShellDuty.id)
+        return [Duty(duty_dto.duty.name, duty_dto.duty.duty_type.name, duty_dto.start_date_time, duty_dto.end_date_time) for duty_dto in session.scalars(stmt)]
 
-    def get_lines(self) -> list[Line]:
-        with Session() as session:
-            result = session.scalars(select(ShellLine))
+    def _select_lines(self, session, start: date, end: date) -> list[Line]:
+        (window_start, window_end) = window_bounds(start, end)
 
-            lines = [Line(line_dto.num, line_dto.org.name, line_dto.start_date_time) for line_dto in result]
-            return lines
+        stmt = select(ShellLine).options(joinedload(ShellLine.org)).where(ShellLine.start_date_time >= window_start, ShellLine.start_date_time < window_end).order_by(ShellLine.start_date_time, ShellLine.num)
+        return [Line(line_dto.num, line_dto.org.name, line_dto.start_date_time) for line_dto in session.scalars(stmt)]
 
-    def get_absences(self) -> list[AbsenceRequest]:
+    def _select_absences(self, session, start: date, end: date) -> list[AbsenceRequest]:
+        (window_start, window_end) = window_bounds(start, end)
         ars = []
 
-        with Session() as session:
-            result = session.scalars(select(AbsenceRequestDto))
+        single = or_(AbsenceRequestDto.day_of_week_ptn == None, AbsenceRequestDto.day_of_week_ptn == 0)
 
-            for ar_dto in result:
-                if (ar_dto.day_of_week_ptn == None or ar_dto.day_of_week_ptn == 0):
-                    ars.append(AbsenceRequest(ar_dto.person_id, ar_dto.start_date_time, ar_dto.end_date_time))
-                else:
-                    init_dt = True
-                    for single_dt in daterange(ar_dto.start_date_time, ar_dto.occur_end_date_time):
+        # a recurring request's last occurrence starts on its occurrence end date, so it is given a day to run into the window
+        stmt = select(AbsenceRequestDto).where(AbsenceRequestDto.start_date_time < window_end, or_(
+            AbsenceRequestDto.end_date_time > window_start,
+            and_(~single, AbsenceRequestDto.occur_end_date_time >= window_start - timedelta(days = 1))))
 
-                        if (init_dt == True):
-                            ars.append(AbsenceRequest(ar_dto.person_id, single_dt, ar_dto.end_date_time))
-                            init_dt = False
-                        elif ((1 << single_dt.isoweekday()) & ar_dto.day_of_week_ptn):
-                            new_end_dt = ar_dto.end_date_time + timedelta(days = (single_dt - ar_dto.start_date_time).days)
-                            ars.append(AbsenceRequest(ar_dto.person_id, single_dt, new_end_dt))
+        for ar_dto in session.scalars(stmt):
+            if (ar_dto.day_of_week_ptn == None or ar_dto.day_of_week_ptn == 0):
+                ars.append(AbsenceRequest(ar_dto.person_id, ar_dto.start_date_time, ar_dto.end_date_time))
+            else:
+                rule = RecurringAbsence(ar_dto.person_id, ar_dto.start_date_time, ar_dto.end_date_time, ar_dto.occur_end_date_time, ar_dto.day_of_week_ptn)
+                ars.extend(rule.occurrences(window_start, window_end))
 
         return ars
-    
-    def insert_schedule(self) -> None:
-        print('insert schedule here')
 
+    def get_published_schedule(self, start: date, end: date) -> PublishedSchedule | None:
+        with self._session_factory() as session:
+            stmt = select(Schedule).options(selectinload(Schedule.assignments)).where(Schedule.start_date == start, Schedule.end_date == end, Schedule.status == 'Completed').order_by(Schedule.submission_date_time.desc())
+            schedule = session.scalars(stmt).first()
+
+            if (schedule == None):
+                return None
+
+            assignments = {a.commitment_key: a.person_line_id for a in schedule.assignments}
+            times = {a.commitment_key: (a.start_date_time, a.end_date_time) for a in schedule.assignments if a.start_date_time != None and a.end_date_time != None}
+            return PublishedSchedule(assignments, schedule.solve_wall_time, times)
+
+    def publish_schedule(self, start: date, end: date, published: PublishedSchedule) -> None:
+        with self._session_factory() as session:
+            schedule = Schedule(name='Schedule_%s_%s' % (start.strftime('%Y%m%d'), end.strftime('%Y%m%d')), start_date=start, end_date=end,
+                                submission_date_time=datetime.now(), status='Completed', solve_wall_time=published.wall_time)
+            for (key, person_id) in published.assignments.items():
+                (start_dt, end_dt) = published.times.get(key, (None, None))
+                schedule.assignments.append(ScheduleAssignment(commitment_key=key, start_date_time=start_dt, end_date_time=end_dt, person_line_id=person_id))
+
+            session.add(schedule)
+            session.commit()
 
-def parse_csv(file: str, parse_fn):
-    all_objs = []
 
+def validate_columns(file: str, header: list[str] | None, columns: type[IntEnum]) -> None:
+    # checked once against the header so a short export fails by name instead of with an IndexError partway through
+    needed = max(columns) + 1
+    found = 0 if header == None else len(header)
+
+    if (found < needed):
+        missing = [column.name for column in columns if column >= found]
+        raise ValueError('%s has %i columns but %i are needed (missing %s)' % (file, found, needed, ', '.join(missing)))
+
+def iter_csv(file: str, parse_fn, columns: type[IntEnum] | None = None):
+    # streams one domain object at a time rather than building the file's worth up front
     with open(file, newline='') as csvfile:
         reader = csv.reader(csvfile, delimiter=',')
-        next(reader, None)
+        header = next(reader, None)
+
+        if (columns != None):
+            validate_columns(file, header, columns)
 
         for row in reader:
             obj = parse_fn(row)
 
             # need to flatten a list if it's returned from the parsing function
             if type(obj) is list:
-                all_objs = all_objs + obj
+                yield from obj
             else:
-                all_objs.append(obj)
+                yield obj
+
+def parse_csv(file: str, parse_fn, columns: type[IntEnum] | None = None):
+    return list(iter_csv(file, parse_fn, columns))
+
+@lru_cache(maxsize = 65536)
+def parse_timestamp(text: str) -> datetime:
+    # exports stamp every row as '%m/%d/%Y %I:%M:%S %p'; splitting it by hand is several times faster than strptime,
+    # and shell exports repeat the same stamps row after row, which the cache absorbs
+    try:
+        (day_part, time_part, meridiem) = text.split(' ')
+        (month, day, year) = day_part.split('/')
+        (hour, minute, second) = time_part.split(':')
+        hour = int(hour)
+        meridiem = meridiem.upper()
 
-    return all_objs
+        if (not 1 <= hour <= 12 or meridiem not in ('AM', 'PM')):
+            raise ValueError()
+
+        return datetime(int(year), int(month), int(day), hour % 12 + (12 if meridiem == 'PM' else 0), int(minute), int(second))
+    except ValueError:
+        raise ValueError("time data '%s' does not match format '%%m/%%d/%%Y %%I:%%M:%%S %%p'" % text) from None
 
 class LOX_COL(IntEnum):
     LAST_NAME = 0
@@ -140,19 +281,19 @@ def parse_personnel(str: str):
         p.assign_to(assigned_flight.upper())
     
     if is_qualified(str, LOX_COL.CONTROLLER) == True:
-        p.qual('Duty', 'RSU Controller')
+        p.qual(Qualification('Duty', 'RSU Controller'))
 
     if is_qualified(str, LOX_COL.OBSERVER) == True:
-        p.qual('Duty', 'RSU Observer')
+        p.qual(Qualification('Duty', 'RSU Observer'))
 
     if is_qualified(str, LOX_COL.OPS_SUP) == True:
-        p.qual('Duty', 'Operations Supervisor')
+        p.qual(Qualification('Duty', 'Operations Supervisor'))
 
     if is_qualified(str, LOX_COL.SOF) == True:
-        p.qual('Duty', 'SOF')
+        p.qual(Qualification('Duty', 'SOF'))
 
     if is_qualified(str, LOX_COL.PIT_IP) == True:
-        p.qual_for_flight('PIT IP')
+        p.qual(Qualification('Flight', 'PIT IP'))
 
     return p
 
@@ -174,58 +315,105 @@ def str_to_duty_type(str_type: str) -> str:
     else:
         return 'Operations Supervisor'
 
+class DUTY_COL(IntEnum):
+    NAME = 3
+    SIGN_IN = 6
+    SIGN_OUT = 7
+
 def parse_duties(str: str):
-    return Duty(str[3], str_to_duty_type(str[3]), datetime.strptime(str[6], '%m/%d/%Y %I:%M:%S %p'), datetime.strptime(str[7], '%m/%d/%Y %I:%M:%S %p'))
+    return Duty(str[DUTY_COL.NAME], str_to_duty_type(str[DUTY_COL.NAME]), parse_timestamp(str[DUTY_COL.SIGN_IN]), parse_timestamp(str[DUTY_COL.SIGN_OUT]))
+
+class LINE_COL(IntEnum):
+    NUM = 0
+    TAKEOFF = 1
+    ORG = 2
 
 def parse_shell_lines(str: str):
-    flight_designator = str[2].split(sep=' - ')[1][0]
+    flight_designator = str[LINE_COL.ORG].split(sep=' - ')[1][0]
     org = flight_designator
-    return Line(int(str[0]), org, datetime.strptime(str[1], '%m/%d/%Y %I:%M:%S %p'))
+    return Line(int(str[LINE_COL.NUM]), org, parse_timestamp(str[LINE_COL.TAKEOFF]))
 
-#TODO: needs refactoring!    
-def parse_absence_requests(str: str):
-    prsn_id = int(str[2])
-    start_dt = datetime.strptime(str[8], '%m/%d/%Y %I:%M:%S %p')
-    end_dt = datetime.strptime(str[9], '%m/%d/%Y %I:%M:%S %p')
-    recur_end_dt = datetime.strptime(str[11], '%m/%d/%Y %I:%M:%S %p')
-    weekday_ptn = str[12]
+class ABSENCE_COL(IntEnum):
+    PRSN_ID = 2
+    START = 8
+    END = 9
+    RECUR_END = 11
+    WEEKDAY_PTN = 12
+
+def parse_absence_rule(str: str) -> AbsenceRequest | RecurringAbsence:
+    prsn_id = int(str[ABSENCE_COL.PRSN_ID])
+    start_dt = parse_timestamp(str[ABSENCE_COL.START])
+    end_dt = parse_timestamp(str[ABSENCE_COL.END])
+    recur_end_dt = parse_timestamp(str[ABSENCE_COL.RECUR_END])
+    weekday_ptn = str[ABSENCE_COL.WEEKDAY_PTN]
 
-    # TODO: moving this to database as well -- encapsulate
     if (weekday_ptn == ""):
         return AbsenceRequest(prsn_id, start_dt, end_dt)
 
-    weekday_bit_ptn = int(weekday_ptn)
+    return RecurringAbsence(prsn_id, start_dt, end_dt, recur_end_dt, int(weekday_ptn))
 
-    init_dt = True
-    ars = []
-    for single_dt in daterange(start_dt, recur_end_dt):
+def parse_absence_requests(str: str):
+    # every occurrence of a recurring request, however far it runs; CSVRepository expands rules only within its window
+    rule = parse_absence_rule(str)
+    if (isinstance(rule, RecurringAbsence)):
+        return list(rule.occurrences())
 
-        if (init_dt == True):
-            ars.append(AbsenceRequest(prsn_id, single_dt, end_dt))
-            init_dt = False
-        elif ((1 << single_dt.isoweekday()) & weekday_bit_ptn):
-            new_end_dt = end_dt + timedelta(days = (single_dt - start_dt).days)
-            ars.append(AbsenceRequest(prsn_id, single_dt, new_end_dt))
+    return rule
 
-    return ars
+def load_csv_dataset(filepaths: dict, name: str, start: date, end: date) -> list:
+    # the unit of work a parse process runs; module level so it can be sent to one
+    repo = CSVRepository(filepaths)
+    return repo.get_personnel() if name == 'personnel' else getattr(repo, 'get_' + name)(start, end)
 
 class CSVRepository(AutoschedulerRepository):
 
-    def __init__(self, filepaths):
-        self._filepaths = filepaths
+    def __init__(self, filepaths, parallel_parse: bool = False):
+        # a plain dict, so the repository's settings can be handed to parse processes
+        self._filepaths = dict(filepaths)
+        self._parallel_parse = parallel_parse
+        self._published = JsonScheduleStore(self._filepaths["published-dir"])
+
+    def load_input(self, start: date, end: date) -> ScheduleInput:
+        if (not self._parallel_parse):
+            return super().load_input(start, end)
+
+        # parsing is CPU bound, so the four files only go faster side by side in separate processes
+        names = ['personnel', 'lines', 'duties', 'absences']
+        started = perf_counter()
+
+        with ProcessPoolExecutor(max_workers = len(names)) as pool:
+            # timed in the parse process, so each timing is its file's parse rather than how long its result was waited on
+            futures = {name: pool.submit(timed, partial(load_csv_dataset, self._filepaths, name, start, end)) for name in names}
+            results = {name: future.result() for (name, future) in futures.items()}
+
+        return timed_input(start, end, results, started)
 
     def get_personnel(self) -> list[Person]:
-        personnel: list[Person] = parse_csv(self._filepaths["lox"], parse_personnel)
+        personnel: list[Person] = parse_csv(self._filepaths["lox"], parse_personnel, LOX_COL)
         return personnel
 
-    def get_duties(self) -> list[Duty]:
-        duties: list[Duty] = parse_csv(self._filepaths["duty-schedule"], parse_duties)
-        return duties
+    def get_duties(self, start: date, end: date) -> list[Duty]:
+        (window_start, window_end) = window_bounds(start, end)
+        return [duty for duty in iter_csv(self._filepaths["duty-schedule"], parse_duties, DUTY_COL) if window_start <= duty.start_dt() < window_end]
 
-    def get_lines(self) -> list[Line]:
-        lines: list[Line] = parse_csv(self._filepaths["flying-schedule"], parse_shell_lines)
-        return lines
+    def get_lines(self, start: date, end: date) -> list[Line]:
+        (window_start, window_end) = window_bounds(start, end)
+        return [line for line in iter_csv(self._filepaths["flying-schedule"], parse_shell_lines, LINE_COL) if window_start <= line.time_takeoff < window_end]
+
+    def get_absences(self, start: date, end: date) -> list[AbsenceRequest]:
+        (window_start, window_end) = window_bounds(start, end)
+        absences: list[AbsenceRequest] = []
+
+        for rule in iter_csv(self._filepaths["absence-requests"], parse_absence_rule, ABSENCE_COL):
+            if (isinstance(rule, RecurringAbsence)):
+                absences.extend(rule.occurrences(window_start, window_end))
+            elif (overlaps(rule.start_dt(), rule.end_dt(), window_start, window_end)):
+                absences.append(rule)
 
-    def get_absences(self) -> list[AbsenceRequest]:
-        absences: list[AbsenceRequest] = parse_csv(self._filepaths["absence-requests"], parse_absence_requests)
         return absences
+
+    def get_published_schedule(self, start: date, end: date) -> PublishedSchedule | None:
+        return self._published.load(start, end)
+
+    def publish_schedule(self, start: date, end: date, published: PublishedSchedule) -> None:
+        self._published.save(start, end, published)
@@ -0,0 +1,40 @@
+from datetime import date, datetime, timedelta
+from scheduler.models import AbsenceRequest, Commitment
+
+def dates_spanned(start_dt: datetime, end_dt: datetime):
+    for n in range((end_dt.date() - start_dt.date()).days + 1):
+        yield start_dt.date() + timedelta(days = n)
+
+class AbsenceIndex:
+
+    def __init__(self, absences: list[AbsenceRequest]):
+        # person id -> date -> absences touching that date
+        self._buckets = {}
+
+        for ar in absences:
+            person_buckets = self._buckets.setdefault(ar.person_id(), {})
+
+            for d in dates_spanned(ar.start_dt(), ar.end_dt()):
+                person_buckets.setdefault(d, []).append(ar)
+
+    def absences_on(self, person_id: int, d: date) -> list[AbsenceRequest]:
+        return self._buckets.get(person_id, {}).get(d, [])
+
+    def absences_during(self, person_id: int, start_dt: datetime, end_dt: datetime) -> list[AbsenceRequest]:
+        person_buckets = self._buckets.get(person_id)
+        if (person_buckets == None):
+            return []
+
+        found = {}
+        for d in dates_spanned(start_dt, end_dt):
+            for ar in person_buckets.get(d, []):
+                if (ar.end_dt() > start_dt and ar.start_dt() < end_dt):
+                    found[id(ar)] = ar
+
+        return list(found.values())
+
+    def is_available(self, person_id: int, start_dt: datetime, end_dt: datetime) -> bool:
+        return len(self.absences_during(person_id, start_dt, end_dt)) == 0
+
+    def conflicts_with(self, person_id: int, commitment: Commitment) -> bool:
+        return not self.is_available(person_id, commitment.start_dt(), commitment.end_dt())
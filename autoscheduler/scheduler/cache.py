@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from scheduler.absences import AbsenceIndex
+from scheduler.models import Commitment, Duty, Line, Person
+
+# bump whenever ScheduleModel's formulation changes so entries built by older code stop matching
+MODEL_CACHE_VERSION = 2
+
+def describe_commitment(commitment: Commitment) -> list:
+    if (isinstance(commitment, Line)):
+        return ['Line', commitment.number, commitment.flight_org, commitment.time_takeoff.isoformat()]
+
+    if (isinstance(commitment, Duty)):
+        return ['Duty', commitment.name, commitment.type, commitment.start_dt().isoformat(), commitment.end_dt().isoformat()]
+
+    return [type(commitment).__name__, commitment.start_dt().isoformat(), commitment.end_dt().isoformat()]
+
+def describe_person(person: Person) -> list:
+    return [person.id(), sorted(person._quals['Duty']), sorted(person._quals['Flight']), person._ausm_tier, person._assigned_org]
+
+def model_key(shell, personnel: list[Person], absences: AbsenceIndex, constraint_names: list[str], options: dict) -> str:
+    # everything a built model depends on, in the order that decides its variable and constraint layout
+    dates = [day.date() for day in shell.days()]
+
+    person_absences = []
+    for person in personnel:
+        spans = set((ar.start_dt().isoformat(), ar.end_dt().isoformat()) for d in dates for ar in absences.absences_on(person.id(), d))
+        person_absences.append(sorted(spans))
+
+    normalized = {}
+    for (name, value) in options.items():
+        if (name == 'carried' and value != None):
+            value = [[value.commitments(person.id()), sorted((value._duty_tours.get(person.id()) or {}).items())] for person in personnel]
+        elif (name == 'prices' and value != None):
+            value = [value.get(person.id()) for person in personnel]
+        normalized[name] = value
+
+    inputs = {
+        'version': MODEL_CACHE_VERSION,
+        'commitments': [describe_commitment(c) for c in shell.commitments()],
+        'personnel': [describe_person(person) for person in personnel],
+        'absences': person_absences,
+        'constraints': constraint_names,
+        'options': normalized
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys = True, default = str).encode()).hexdigest()
+
+class CachedModel:
+
+    def __init__(self, proto_text: str, index: dict):
+        # CP-SAT's python proto only round-trips through text format, so that is what is stored (compressed)
+        self.proto_text = proto_text
+
+        # how ScheduleModel's python-side state maps onto proto variable indices
+        self.index = index
+
+class ModelCache:
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self._directory = directory
+        self._max_bytes = max_bytes
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        return (os.path.join(self._directory, key + '.txtpb.gz'), os.path.join(self._directory, key + '.json'))
+
+    def load(self, key: str) -> CachedModel | None:
+        (proto_path, index_path) = self._paths(key)
+        if (not os.path.exists(proto_path) or not os.path.exists(index_path)):
+            return None
+
+        with gzip.open(proto_path, 'rt') as in_file:
+            proto_text = in_file.read()
+        with open(index_path) as in_file:
+            index = json.load(in_file)
+
+        # a hit counts as a use for eviction
+        self._touch(key)
+
+        return CachedModel(proto_text, index)
+
+    def store(self, key: str, cached: CachedModel) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        (proto_path, index_path) = self._paths(key)
+
+        # written under temporary names first so a concurrent load never sees half an entry
+        with gzip.open(proto_path + '.tmp', 'wt', compresslevel=1) as out_file:
+            out_file.write(cached.proto_text)
+        with open(index_path + '.tmp', 'w') as out_file:
+            json.dump(cached.index, out_file)
+
+        os.replace(index_path + '.tmp', index_path)
+        os.replace(proto_path + '.tmp', proto_path)
+
+        self._touch(key)
+        self._evict()
+
+    def _touch(self, key: str) -> None:
+        # stamped from the clock rather than left to the filesystem, whose timestamps can be too coarse to order uses
+        now = time.time_ns()
+        for path in self._paths(key):
+            os.utime(path, ns=(now, now))
+
+    def _entries(self) -> list[tuple[int, int, str]]:
+        entries = {}
+
+        for name in os.listdir(self._directory):
+            if (name.endswith('.tmp')):
+                continue
+
+            path = os.path.join(self._directory, name)
+            key = name.split('.')[0]
+            (mtime, size) = entries.get(key, (0, 0))
+            entries[key] = (max(mtime, os.stat(path).st_mtime_ns), size + os.path.getsize(path))
+
+        return sorted((mtime, size, key) for (key, (mtime, size)) in entries.items())
+
+    def size(self) -> int:
+        if (not os.path.isdir(self._directory)):
+            return 0
+
+        return sum(size for (_, size, _) in self._entries())
+
+    def _evict(self) -> None:
+        # least recently used entries go first, until the cache fits
+        entries = self._entries()
+        total = sum(size for (_, size, _) in entries)
+
+        for (_, size, key) in entries:
+            if (total <= self._max_bytes):
+                break
+
+            for path in self._paths(key):
+                if (os.path.exists(path)):
+                    os.remove(path)
+            total -= size
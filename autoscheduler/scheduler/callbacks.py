@@ -0,0 +1,82 @@
+from abc import ABC, abstractmethod
+from ortools.sat.python import cp_model
+from scheduler.variables import AssignmentMap, AssignmentVariables
+
+class IntermediateSolution:
+
+    def __init__(self, index: int, objective: float, best_bound: float, wall_time: float, assignments: AssignmentMap, phase: str | None = None):
+        self.index = index
+        self.objective = objective
+        self.best_bound = best_bound
+        self.wall_time = wall_time
+
+        # set by a lexicographic solve to the objective term being optimized; objective and bound are then that
+        # term's raw value, which cannot be compared with the weighted objective or with other phases
+        self.phase = phase
+
+        # commitment index -> person index, as laid out by ShellSchedule.commitments() and the model's personnel
+        self.assignments = assignments
+
+    def gap(self) -> float:
+        if (self.best_bound == self.objective):
+            return 0.0
+
+        return abs(self.best_bound - self.objective) / max(abs(self.best_bound), 1e-9)
+
+class SolutionSink(ABC):
+
+    @abstractmethod
+    def on_solution(self, solution: IntermediateSolution) -> bool:
+        # return True to stop the search with this solution
+        pass
+
+class StopAtGap(SolutionSink):
+
+    def __init__(self, gap: float):
+        self._gap = gap
+
+    def on_solution(self, solution: IntermediateSolution) -> bool:
+        return solution.gap() <= self._gap
+
+class StopAtObjective(SolutionSink):
+
+    def __init__(self, objective: float):
+        self._objective = objective
+
+    def on_solution(self, solution: IntermediateSolution) -> bool:
+        # the target is a weighted objective, which a single phase's term says nothing about
+        if (solution.phase != None):
+            return False
+
+        return solution.objective >= self._objective
+
+class SinkCallback(cp_model.CpSolverSolutionCallback):
+
+    def __init__(self, variables: AssignmentVariables, sinks: list[SolutionSink], objective_scale: int = 1):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self._variables = variables
+        self._sinks = sinks
+        self._objective_scale = objective_scale
+        self._phase = None
+        self._count = 0
+
+    def count(self) -> int:
+        return self._count
+
+    def set_phase(self, phase: str | None) -> None:
+        self._phase = phase
+
+    def on_solution_callback(self):
+        assignments = AssignmentMap.from_values(self._variables, self.response_proto.solution)
+        scale = self._objective_scale if self._phase == None else 1
+        solution = IntermediateSolution(self._count, self.ObjectiveValue() / scale, self.BestObjectiveBound() / scale, self.WallTime(), assignments, self._phase)
+        self._count += 1
+
+        # every sink sees every solution, even once one of them has asked to stop
+        stop = False
+        for sink in self._sinks:
+            if (sink.on_solution(solution)):
+                stop = True
+
+        if (stop):
+            self.StopSearch()
@@ -0,0 +1,41 @@
+from datetime import timedelta
+import numpy as np
+from scheduler.models import Commitment
+
+MAX_DUTY_DAY = timedelta(hours = 12)
+MAX_TURN_TIME = timedelta(hours = 4, minutes = 15)
+
+def to_datetime64(commitments: list[Commitment]) -> tuple[np.ndarray, np.ndarray]:
+    starts = np.array([c.start_dt() for c in commitments], dtype='datetime64[s]')
+    ends = np.array([c.end_dt() for c in commitments], dtype='datetime64[s]')
+    return (starts, ends)
+
+def build_compatibility(starts: np.ndarray, ends: np.ndarray, max_duty_day: timedelta = MAX_DUTY_DAY, max_turn_time: timedelta = MAX_TURN_TIME) -> tuple[np.ndarray, np.ndarray]:
+    # element [i, j] of each matrix answers the pairwise question for commitments i and j, matching
+    # duty_day_exceeded and has_turn_time respectively. overlaps are left to IntervalIndex.overlap_groups,
+    # whose cliques make one at-most-one constraint where a matrix would give one per pair
+    s_row, s_col = starts[:, None], starts[None, :]
+    e_row, e_col = ends[:, None], ends[None, :]
+
+    duty_day_exceeded = ((e_row - s_col) > np.timedelta64(max_duty_day)) | ((e_col - s_row) > np.timedelta64(max_duty_day))
+    turn_time_exceeded = np.abs(s_row - s_col) > np.timedelta64(max_turn_time)
+
+    return (duty_day_exceeded, turn_time_exceeded)
+
+class DayCompatibility:
+
+    def __init__(self, commitments: list[Commitment]):
+        self._commitments = commitments
+
+        (starts, ends) = to_datetime64(commitments)
+        (self.duty_day_exceeded, self.turn_time_exceeded) = build_compatibility(starts, ends)
+
+    def commitments(self) -> list[Commitment]:
+        return self._commitments
+
+    def forbidden_groups(self, matrix: np.ndarray) -> list[tuple[int, list[int]]]:
+        # the matrices are symmetric, so only pairs (i, j) with i <= j are needed; a set diagonal
+        # means the commitment is incompatible with itself. positions index into commitments()
+        upper = np.triu(matrix)
+
+        return [(int(i), np.flatnonzero(upper[i]).tolist()) for i in np.flatnonzero(upper.any(axis = 1))]
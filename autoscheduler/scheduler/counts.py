@@ -0,0 +1,50 @@
+from scheduler.models import Commitment, Duty
+
+class PersonCounts:
+
+    def __init__(self):
+        # person id -> commitments / duty tours by duty type, made outside the model being built
+        self._commitments = {}
+        self._duty_tours = {}
+
+    @classmethod
+    def from_assignments(cls, assignments: list[tuple[int, Commitment]]) -> 'PersonCounts':
+        counts = cls()
+        for (person_id, commitment) in assignments:
+            counts.add(person_id, commitment)
+
+        return counts
+
+    def add(self, person_id: int, commitment: Commitment) -> None:
+        self.add_commitments(person_id, 1)
+
+        if (isinstance(commitment, Duty)):
+            tours = self._duty_tours.setdefault(person_id, {})
+            tours[commitment.type] = tours.get(commitment.type, 0) + 1
+
+    def add_commitments(self, person_id: int, n: int) -> None:
+        self._commitments[person_id] = self._commitments.get(person_id, 0) + n
+
+    def merge(self, other: 'PersonCounts') -> 'PersonCounts':
+        merged = PersonCounts()
+
+        for counts in (self, other):
+            for (person_id, n) in counts._commitments.items():
+                merged._commitments[person_id] = merged._commitments.get(person_id, 0) + n
+
+            for (person_id, tours) in counts._duty_tours.items():
+                merged_tours = merged._duty_tours.setdefault(person_id, {})
+                for (duty_type, n) in tours.items():
+                    merged_tours[duty_type] = merged_tours.get(duty_type, 0) + n
+
+        return merged
+
+    def commitments(self, person_id: int) -> int:
+        return self._commitments.get(person_id, 0)
+
+    def duty_tours(self, person_id: int, duty_types: str | list[str]) -> int:
+        if (not isinstance(duty_types, list)):
+            duty_types = [duty_types]
+
+        tours = self._duty_tours.get(person_id, {})
+        return sum(tours.get(duty_type, 0) for duty_type in duty_types)
@@ -0,0 +1,192 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from ortools.sat.python import cp_model
+from scheduler.absences import AbsenceIndex
+from scheduler.counts import PersonCounts
+from scheduler.models import AbsenceRequest, Duty, Line, Person
+from scheduler.parameters import SolverParameters
+from scheduler.solver import ScheduleModel, ScheduleSolution, ScheduleSolver, ShellSchedule, evaluate_objective, get_commitments_for_ausm_tier, prorated_counts, DUTY_OBJECTIVE_QUALS
+from scheduler.variables import AssignmentMap
+from scheduler.warmstart import PublishedSchedule
+
+# scales a person's cross-day overload into an objective penalty well below one step of any objective term
+PRICE_STEP = 1e-3
+
+def _solve_day(lines: list[Line], duties: list[Duty], personnel: list[Person], absences: list[AbsenceRequest], carried: PersonCounts,
+               prices: dict[int, tuple[float, float]], hints: PublishedSchedule | None, overlap_mode: str, parameters: SolverParameters) -> tuple[int, dict[int, int], float]:
+    # runs in a worker process; the shell is rebuilt from the same lists so local indices match the parent's
+    shell = ShellSchedule(lines, duties)
+    model = ScheduleModel(shell, personnel, absences, overlap_mode = overlap_mode, carried = carried, prices = prices)
+    model.add_all_contraints()
+
+    solver = ScheduleSolver(model, personnel, shell, parameters)
+    if (hints != None):
+        solver.warm_start(hints)
+    solution = solver.solve()
+
+    return (solution._status, dict(solution.assignments()), solution._wall_time)
+
+class DecompositionReport:
+
+    def __init__(self):
+        self.rounds = 0
+        self.converged = False
+        self.objectives = []
+        self.day_wall_times = []
+        self.wall_time = 0.0
+
+    def __str__(self) -> str:
+        best = max([o for o in self.objectives if o != None], default = None)
+        return '%i rounds (%s), best objective %s, %.1fs' % (self.rounds, 'converged' if self.converged else 'not converged', '-' if best == None else '%.4f' % best, self.wall_time)
+
+class DecompositionSolver:
+
+    def __init__(self, shell: ShellSchedule, personnel: list[Person], absences: list[AbsenceRequest] | AbsenceIndex, overlap_mode: str = 'pairwise',
+                 parameters: SolverParameters | None = None, max_rounds: int = 5, max_workers: int | None = None):
+        self._shell = shell
+        self._personnel = personnel
+        self._absences = absences if isinstance(absences, AbsenceIndex) else AbsenceIndex(absences)
+        self._overlap_mode = overlap_mode
+
+        # max_time_s is the deadline for the whole decomposition, and num_workers the search workers shared by the days
+        # solved at once. each day is small, so without a worker count one search worker per subproblem leaves the
+        # cores to the pool
+        self._parameters = parameters if parameters != None else SolverParameters(max_time_s = 60.0)
+        self._max_rounds = max_rounds
+        self._max_workers = max_workers
+
+        self._report = DecompositionReport()
+
+    def report(self) -> DecompositionReport:
+        return self._report
+
+    def _day_absences(self, day_shell: ShellSchedule) -> list[AbsenceRequest]:
+        d = day_shell.days()[0].date()
+        found = {}
+
+        for person in self._personnel:
+            for ar in self._absences.absences_on(person.id(), d):
+                found[id(ar)] = ar
+
+        return list(found.values())
+
+    def _prices(self, carried: PersonCounts, num_days: int) -> dict[int, tuple[float, float]]:
+        # min-max objective terms give a single day no gradient while another day sets the maximum, so each
+        # person is priced by how far the other days already push them past their share
+        mean_tours = sum(carried.duty_tours(person.id(), DUTY_OBJECTIVE_QUALS[0]) for person in self._personnel) / max(1, len(self._personnel))
+
+        prices = {}
+        for person in self._personnel:
+            share = get_commitments_for_ausm_tier(person._ausm_tier) * (num_days - 1) / num_days
+            prices[person.id()] = (PRICE_STEP * (carried.commitments(person.id()) - share), PRICE_STEP * (carried.duty_tours(person.id(), DUTY_OBJECTIVE_QUALS[0]) - mean_tours))
+
+        return prices
+
+    def _carried(self, day_shells: list[ShellSchedule], assignments: list[dict[int, int]], skip: int) -> PersonCounts:
+        # what every other day currently commits each person to
+        made = []
+
+        for (d, day_shell) in enumerate(day_shells):
+            if (d == skip):
+                continue
+
+            commits = day_shell.commitments()
+            made.extend((self._personnel[p].id(), commits[c]) for (c, p) in assignments[d].items())
+
+        return PersonCounts.from_assignments(made)
+
+    def _combine(self, day_shells: list[ShellSchedule], assignments: list[dict[int, int]]) -> dict[int, int]:
+        global_idxs = {id(commit): c for (c, commit) in enumerate(self._shell.commitments())}
+
+        combined = {}
+        for (d, day_shell) in enumerate(day_shells):
+            commits = day_shell.commitments()
+            for (c, p) in assignments[d].items():
+                combined[global_idxs[id(commits[c])]] = p
+
+        return combined
+
+    def solve(self) -> ScheduleSolution:
+        start = time.perf_counter()
+
+        day_shells = [self._shell.subset({day.date()}) for day in self._shell.days()]
+        day_inputs = [([c for c in s.commitments() if isinstance(c, Line)], [c for c in s.commitments() if isinstance(c, Duty)], self._day_absences(s)) for s in day_shells]
+
+        assignments = [{} for _ in day_shells]
+        best_objective = None
+        status = cp_model.UNKNOWN
+
+        running = max(1, min(self._max_workers or os.cpu_count() or 1, len(day_shells)))
+        waves = max(1, math.ceil(len(day_shells) / running))
+        num_workers = max(1, self._parameters.num_workers // running) if self._parameters.num_workers != None else 1
+        deadline = start + self._parameters.max_time_s if self._parameters.max_time_s != None else None
+
+        with ProcessPoolExecutor(max_workers = self._max_workers) as pool:
+            for r in range(self._max_rounds):
+                # a round may use whatever time is left, split over the waves of days the pool runs one after another;
+                # the first has to find a schedule at all, and later rounds only refine it
+                day_time = None
+                if (deadline != None):
+                    remaining = deadline - time.perf_counter()
+                    if (remaining <= 0.0):
+                        break
+                    day_time = remaining / waves
+
+                parameters = self._parameters.override(num_workers = num_workers, max_time_s = day_time)
+
+                # every day proposes a new assignment in parallel: the first round against prorated estimates
+                # of the other days, later rounds against their current assignments and prices
+                futures = []
+                for (d, (lines, duties, absences)) in enumerate(day_inputs):
+                    commits = day_shells[d].commitments()
+                    carried = prorated_counts(self._personnel, (len(day_shells) - 1) / len(day_shells)) if r == 0 else self._carried(day_shells, assignments, d)
+                    prices = self._prices(carried, len(day_shells)) if r > 0 else {}
+                    hints = PublishedSchedule({commits[c].id(): self._personnel[p].id() for (c, p) in assignments[d].items()}) if r > 0 else None
+                    futures.append(pool.submit(_solve_day, lines, duties, self._personnel, absences, carried, prices, hints, self._overlap_mode, parameters))
+
+                results = [f.result() for f in futures]
+                self._report.rounds += 1
+                self._report.day_wall_times.append([wall_time for (_, _, wall_time) in results])
+
+                failed = [s for (s, _, _) in results if s != cp_model.OPTIMAL and s != cp_model.FEASIBLE]
+                if (len(failed) > 0):
+                    status = failed[0]
+                    break
+
+                if (r == 0):
+                    assignments = [a for (_, a, _) in results]
+                    best_objective = evaluate_objective(self._shell, self._personnel, self._combine(day_shells, assignments))
+                    self._report.objectives.append(best_objective)
+                    continue
+
+                # proposals were made against the same stale counts, so taking them all at once oscillates;
+                # each is accepted in turn only if the combined schedule does not get worse
+                accepted = 0
+                for (d, (_, proposal, _)) in enumerate(results):
+                    if (proposal == assignments[d]):
+                        continue
+
+                    candidate = assignments[:d] + [proposal] + assignments[d + 1:]
+                    objective = evaluate_objective(self._shell, self._personnel, self._combine(day_shells, candidate))
+                    if (objective != None and (best_objective == None or objective >= best_objective)):
+                        assignments = candidate
+                        best_objective = objective
+                        accepted += 1
+
+                self._report.objectives.append(best_objective)
+
+                if (accepted == 0):
+                    self._report.converged = True
+                    break
+
+        # no bound is proven across days, so even a converged decomposition is only reported feasible
+        best = self._combine(day_shells, assignments) if best_objective != None else {}
+        if (best_objective != None):
+            status = cp_model.FEASIBLE
+
+        self._report.wall_time = time.perf_counter() - start
+
+        return ScheduleSolution(status, self._shell, parameters = self._parameters, objective = best_objective, wall_time = self._report.wall_time, num_solutions = self._report.rounds,
+                                assignments = AssignmentMap.from_dict(len(self._shell.commitments()), best), personnel = self._personnel)
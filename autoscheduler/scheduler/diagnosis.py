@@ -0,0 +1,145 @@
+import time
+from datetime import date
+from ortools.sat.python import cp_model
+from scheduler.absences import AbsenceIndex
+from scheduler.counts import PersonCounts
+from scheduler.instrumentation import LITERAL_FIELDS, has_field
+from scheduler.models import AbsenceRequest, Commitment, Person
+from scheduler.parameters import SolverParameters
+from scheduler.solver import ScheduleModel, ShellSchedule
+
+class Conflict:
+
+    def __init__(self, family: str, day: date | None, commitment: Commitment | None, person: Person | None):
+        # the narrowest scope the guarded constraints share: one commitment, or a day and/or a person
+        self.family = family
+        self.day = day
+        self.commitment = commitment
+        self.person = person
+
+    def __str__(self) -> str:
+        scope = []
+        if (self.commitment != None):
+            scope.append(self.commitment.id())
+        elif (self.day != None):
+            scope.append(self.day.strftime('%a, %-m/%-d/%Y'))
+        if (self.person != None):
+            scope.append('%s, %s' % (self.person._last_name, self.person._first_name))
+
+        return '%s (%s)' % (self.family, '; '.join(scope)) if len(scope) > 0 else self.family
+
+class InfeasibilityReport:
+
+    def __init__(self, status: int, conflicts: list[Conflict], num_solves: int, wall_time: float):
+        # status is that of the feasibility check: INFEASIBLE with the conflicts that cause it, FEASIBLE when the
+        # constraints can all be met (the objective's limits included), UNKNOWN when the check ran out of time
+        self.status = status
+        self.conflicts = conflicts
+        self.num_solves = num_solves
+        self.wall_time = wall_time
+
+    def families(self) -> list[str]:
+        return sorted(set(conflict.family for conflict in self.conflicts))
+
+    def __str__(self) -> str:
+        if (self.status != cp_model.INFEASIBLE):
+            return 'no conflict found (%s) in %.1fs' % (cp_model.CpSolver().StatusName(self.status), self.wall_time)
+
+        if (len(self.conflicts) == 0):
+            return 'infeasible before any constraint family applies, found in %.1fs' % self.wall_time
+
+        return '%i conflicting constraint groups in %s, found in %.1fs' % (len(self.conflicts), ', '.join(self.families()), self.wall_time)
+
+def _variables(ct) -> list[int]:
+    # the variable indices a constraint mentions, through negated literals too
+    refs = list(ct.enforcement_literal)
+    for (field, repeated) in LITERAL_FIELDS:
+        if (field != 'no_overlap' and has_field(ct, field)):
+            refs.extend(getattr(getattr(ct, field), repeated))
+
+    return [ref if ref >= 0 else -ref - 1 for ref in refs]
+
+def diagnose_infeasibility(shell: ShellSchedule, personnel: list[Person], absences: list[AbsenceRequest] | AbsenceIndex, carried: PersonCounts | None = None,
+                           parameters: SolverParameters | None = None) -> InfeasibilityReport:
+    # a feasibility-only copy of the model with every constraint family guarded per scope by an assumption literal;
+    # CP-SAT answers with the assumptions it needed, which are then shrunk one by one to a minimal conflict.
+    # interval no-overlap constraints cannot be guarded, so the pairwise formulation of the same rules is used; nobody is
+    # filtered out up front either, so an absence or a missing qualification is a guarded constraint like any other.
+    # max_time_s bounds the whole diagnosis, not each solve
+    start = time.perf_counter()
+    parameters = parameters if parameters != None else SolverParameters(max_time_s = 10.0)
+    deadline = start + parameters.max_time_s if parameters.max_time_s != None else None
+
+    model = ScheduleModel(shell, personnel, absences, overlap_mode = 'pairwise', carried = carried, eligibility_filter = False)
+    model.add_all_contraints()
+
+    working = model._handle()
+    working.ClearObjective()
+    proto = working.Proto()
+
+    owners = {}
+    (cs, ps, idxs) = model.variables().proto_indices()
+    for (c, p, i) in zip(cs, ps, idxs):
+        owners[int(i)] = (int(c), int(p))
+
+    commits = shell.commitments()
+    named = {commitment.id(): c for (c, commitment) in enumerate(commits)}
+    guards = {}
+    for (family, first, stop) in model.constraint_families():
+        for k in range(first, stop):
+            ct = proto.constraints[k]
+            pairs = [owners[i] for i in _variables(ct) if i in owners]
+            commit_idxs = set(c for (c, _) in pairs)
+            if (ct.name in named):
+                commit_idxs.add(named[ct.name])
+            days = set(commits[c].start_dt().date() for c in commit_idxs)
+            person_idxs = set(p for (_, p) in pairs)
+
+            # a constraint on one commitment is about that commitment, and about a person only when it names just one
+            if (len(commit_idxs) == 1):
+                scope = (family, next(iter(days)), next(iter(commit_idxs)), next(iter(person_idxs)) if len(person_idxs) == 1 else None)
+            else:
+                scope = (family, next(iter(days)) if len(days) == 1 else None, None, next(iter(person_idxs)) if len(person_idxs) == 1 else None)
+            if (scope not in guards):
+                guards[scope] = working.NewBoolVar('guard_%i' % len(guards))
+
+            ct.enforcement_literal.append(guards[scope].index)
+
+    scopes = {guard.index: scope for (scope, guard) in guards.items()}
+    solver = cp_model.CpSolver()
+    parameters.override(num_workers = 1).apply(solver)
+
+    def solve(assumptions: list[int]) -> tuple[int, list[int]]:
+        if (deadline != None):
+            solver.parameters.max_time_in_seconds = max(deadline - time.perf_counter(), 0.0)
+
+        working.ClearAssumptions()
+        working.AddAssumptions([working.get_bool_var_from_proto_index(i) for i in assumptions])
+        status = solver.Solve(working)
+        return (status, list(solver.SufficientAssumptionsForInfeasibility()) if status == cp_model.INFEASIBLE else [])
+
+    (status, core) = solve(list(scopes.keys()))
+    num_solves = 1
+
+    # every guard the conflict still holds without is dropped; out of time, the core found so far is reported unshrunk
+    i = 0
+    while (status == cp_model.INFEASIBLE and i < len(core) and (deadline == None or time.perf_counter() < deadline)):
+        (trial_status, trial_core) = solve(core[:i] + core[i + 1:])
+        num_solves += 1
+
+        if (trial_status == cp_model.INFEASIBLE):
+            core = [g for g in core if g in trial_core] if len(trial_core) > 0 else core[:i] + core[i + 1:]
+        elif (trial_status == cp_model.UNKNOWN):
+            break
+        else:
+            i += 1
+
+    conflicts = []
+    for g in core:
+        (family, day, c, p) = scopes[g]
+        conflicts.append(Conflict(family, day, commits[c] if c != None else None, personnel[p] if p != None else None))
+
+    families = [family for (family, _, _) in model.constraint_families()]
+    conflicts.sort(key = lambda conflict: (families.index(conflict.family), conflict.day or date.min))
+
+    return InfeasibilityReport(status, conflicts, num_solves, time.perf_counter() - start)
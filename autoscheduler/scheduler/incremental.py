@@ -0,0 +1,120 @@
+from datetime import date, datetime
+from ortools.sat.python import cp_model
+from scheduler.absences import AbsenceIndex
+from scheduler.counts import PersonCounts
+from scheduler.models import AbsenceRequest, Person
+from scheduler.parameters import SolverParameters
+from scheduler.solver import ScheduleModel, ScheduleSolution, ScheduleSolver, ShellSchedule, evaluate_objective, is_eligible
+from scheduler.variables import AssignmentMap
+from scheduler.warmstart import PublishedSchedule
+
+def commitment_date(commitment_id: str) -> date:
+    # Line and Duty ids both end with their start date
+    return datetime.strptime(commitment_id[-10:], '%m/%d/%Y').date()
+
+def changed_dates(shell: ShellSchedule, personnel: list[Person], absences: AbsenceIndex, published: PublishedSchedule) -> set[date]:
+    # a day is affected when its commitments differ from the published ones, one of them has moved within the day, or a
+    # published assignment on it can no longer stand: the person left, lost a qualification it needs or has since asked
+    # for the time off. frozen days never reach the model, so this is the only place their assignments are checked.
+    # a schedule published without times can only be compared by id
+    people = {person.id(): person for person in personnel}
+    commit_ids = set(c.id() for c in shell.commitments())
+
+    dates = set(commitment_date(key) for key in published.assignments.keys() if key not in commit_ids)
+
+    for day in shell.days():
+        for commitment in day.commitments():
+            if (commitment.id() not in published.assignments):
+                dates.add(day.date())
+                break
+
+            times = published.times.get(commitment.id())
+            if (times != None and times != (commitment.start_dt(), commitment.end_dt())):
+                dates.add(day.date())
+                break
+
+            person_id = published.assignments[commitment.id()]
+            if (person_id != None and (person_id not in people or not is_eligible(commitment, people[person_id], absences))):
+                dates.add(day.date())
+                break
+
+    return dates & set(day.date() for day in shell.days())
+
+class IncrementalSolver:
+
+    def __init__(self, shell: ShellSchedule, personnel: list[Person], absences: list[AbsenceRequest] | AbsenceIndex, published: PublishedSchedule,
+                 dates: set[date] | None = None, overlap_mode: str = 'pairwise', parameters: SolverParameters | None = None):
+        self._shell = shell
+        self._personnel = personnel
+        self._absences = absences if isinstance(absences, AbsenceIndex) else AbsenceIndex(absences)
+        self._published = published
+        self._overlap_mode = overlap_mode
+        self._parameters = parameters
+
+        self._dates = dates if dates != None else changed_dates(shell, personnel, self._absences, published)
+        self._model = None
+
+    def affected_dates(self) -> set[date]:
+        return self._dates
+
+    def model(self) -> ScheduleModel | None:
+        return self._model
+
+    def _freeze(self) -> dict[int, int]:
+        # unaffected days keep their published assignments (commitment index -> person index)
+        person_idxs = {person.id(): p for (p, person) in enumerate(self._personnel)}
+        frozen = {}
+
+        for day in self._shell.days():
+            if (day.date() in self._dates):
+                continue
+
+            for (c, commitment) in self._shell.indexed_commitments(day):
+                p = person_idxs.get(self._published.assignments.get(commitment.id()))
+                if (p != None):
+                    frozen[c] = p
+
+        return frozen
+
+    def solve(self) -> ScheduleSolution:
+        frozen = self._freeze()
+        num_commitments = len(self._shell.commitments())
+
+        if (len(self._dates) == 0):
+            return ScheduleSolution(cp_model.FEASIBLE, self._shell, parameters = self._parameters, objective = evaluate_objective(self._shell, self._personnel, frozen), wall_time = 0.0,
+                                    assignments = AssignmentMap.from_dict(num_commitments, frozen), personnel = self._personnel)
+
+        # what the frozen days contribute to the cross-day objectives is handed to the affected-day model as constants
+        commits = self._shell.commitments()
+        carried = PersonCounts.from_assignments([(self._personnel[p].id(), commits[c]) for (c, p) in frozen.items()])
+
+        sub_shell = self._shell.subset(self._dates)
+        self._model = ScheduleModel(sub_shell, self._personnel, self._absences, overlap_mode = self._overlap_mode, carried = carried)
+        self._model.add_all_contraints()
+
+        solver = ScheduleSolver(self._model, self._personnel, sub_shell, self._parameters)
+        hints = {key: person_id for (key, person_id) in self._published.assignments.items() if commitment_date(key) in self._dates}
+        solver.warm_start(PublishedSchedule(hints, self._published.wall_time))
+        sub_solution = solver.solve()
+
+        assignments = dict(frozen)
+        for (c, p) in sub_solution.assignments().items():
+            assignments[self._shell.index(sub_shell.commitments()[c])] = p
+
+        # the sub-model's objective and bound only cover the affected days, so the combined schedule is scored over the
+        # whole shell, and optimal for those days is not optimal over the shell
+        status = sub_solution._status
+        objective = None
+        if (sub_solution.has_schedule()):
+            status = cp_model.FEASIBLE
+            objective = evaluate_objective(self._shell, self._personnel, assignments)
+
+        return ScheduleSolution(status, self._shell,
+            parameters = sub_solution._parameters,
+            objective = objective,
+            wall_time = sub_solution._wall_time,
+            log = sub_solution._log,
+            num_solutions = sub_solution._num_solutions,
+            warm_start = sub_solution._warm_start,
+            assignments = AssignmentMap.from_dict(num_commitments, assignments) if sub_solution.has_schedule() else None,
+            personnel = self._personnel)
@@ -0,0 +1,58 @@
+from datetime import date
+from scheduler.models import AbsenceRequest, Duty, Line, Person
+from scheduler.solver import ShellSchedule
+
+class ScheduleInput:
+
+    def __init__(self, start: date, end: date, personnel: list[Person], lines: list[Line], duties: list[Duty], absences: list[AbsenceRequest],
+                 timings: dict[str, float] | None = None, wall_time: float | None = None):
+        # everything one build reads, loaded together so the datasets agree with each other; held as tuples so the
+        # bundle can be handed to concurrent solves without any of them changing what the others see
+        self._start = start
+        self._end = end
+        self._personnel = tuple(personnel)
+        self._lines = tuple(lines)
+        self._duties = tuple(duties)
+        self._absences = tuple(absences)
+
+        # seconds each dataset took to load, and the whole load end to end
+        self._timings = dict(timings or {})
+        self._wall_time = wall_time
+
+        self._shell = None
+
+    def date_range(self) -> tuple[date, date]:
+        return (self._start, self._end)
+
+    def personnel(self) -> tuple[Person, ...]:
+        return self._personnel
+
+    def lines(self) -> tuple[Line, ...]:
+        return self._lines
+
+    def duties(self) -> tuple[Duty, ...]:
+        return self._duties
+
+    def absences(self) -> tuple[AbsenceRequest, ...]:
+        return self._absences
+
+    def shell(self) -> ShellSchedule:
+        if (self._shell == None):
+            self._shell = ShellSchedule(list(self._lines), list(self._duties))
+
+        return self._shell
+
+    def timings(self) -> dict[str, float]:
+        return dict(self._timings)
+
+    def wall_time(self) -> float | None:
+        return self._wall_time
+
+    def __str__(self) -> str:
+        counts = '%i personnel, %i lines, %i duties, %i absences' % (len(self._personnel), len(self._lines), len(self._duties), len(self._absences))
+        timings = ', '.join('%s %.3fs' % (name, seconds) for (name, seconds) in self._timings.items())
+
+        if (self._wall_time == None):
+            return '%s to %s: %s' % (self._start, self._end, counts)
+
+        return '%s to %s: %s in %.3fs (%s)' % (self._start, self._end, counts, self._wall_time, timings)
@@ -0,0 +1,142 @@
+from contextlib import contextmanager
+import json
+import time
+import tracemalloc
+from ortools.sat.python import cp_model
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# (constraint field, repeated field holding its literals/variables) for every constraint type the model posts
+LITERAL_FIELDS = (
+    ('linear', 'vars'),
+    ('bool_or', 'literals'),
+    ('bool_and', 'literals'),
+    ('at_most_one', 'literals'),
+    ('exactly_one', 'literals'),
+    ('no_overlap', 'intervals')
+)
+
+def has_field(message, field: str) -> bool:
+    # only read sub-messages that are set; touching an unset one can set it (and clear the rest of its
+    # oneof) on the C++-backed protos newer OR-Tools releases return from CpModel.Proto()
+    if (hasattr(message, 'HasField')):
+        return message.HasField(field)
+
+    return getattr(message, 'has_' + field)()
+
+def referenced_literals(constraint) -> int:
+    count = len(constraint.enforcement_literal)
+
+    for (field, repeated) in LITERAL_FIELDS:
+        if (has_field(constraint, field)):
+            count += len(getattr(getattr(constraint, field), repeated))
+
+    return count
+
+def objective_literals(proto) -> int:
+    count = 0
+
+    for field in ('objective', 'floating_point_objective'):
+        if (has_field(proto, field)):
+            count += len(getattr(proto, field).vars)
+
+    return count
+
+def max_rss_kb() -> int | None:
+    if (resource == None):
+        return None
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class StageStats:
+
+    def __init__(self, name: str, wall_time_s: float, variables_added: int, constraints_added: int, literals_referenced: int, peak_memory_kb: float, max_rss_delta_kb: int | None):
+        self.name = name
+        self.wall_time_s = wall_time_s
+        self.variables_added = variables_added
+        self.constraints_added = constraints_added
+        self.literals_referenced = literals_referenced
+        self.peak_memory_kb = peak_memory_kb
+        self.max_rss_delta_kb = max_rss_delta_kb
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'wall_time_s': self.wall_time_s,
+            'variables_added': self.variables_added,
+            'constraints_added': self.constraints_added,
+            'literals_referenced': self.literals_referenced,
+            'peak_memory_kb': self.peak_memory_kb,
+            'max_rss_delta_kb': self.max_rss_delta_kb
+        }
+
+class BuildStats:
+
+    def __init__(self):
+        self._stages = []
+
+    def stages(self) -> list[StageStats]:
+        return self._stages
+
+    def stage(self, name: str) -> StageStats | None:
+        for s in self._stages:
+            if s.name == name:
+                return s
+
+        return None
+
+    def total_wall_time(self) -> float:
+        return sum(s.wall_time_s for s in self._stages)
+
+    @contextmanager
+    def measure(self, name: str, model: cp_model.CpModel):
+        proto = model.Proto()
+        num_vars = len(proto.variables)
+        num_constraints = len(proto.constraints)
+        num_objective_literals = objective_literals(proto)
+
+        # peak memory is the high-water mark of Python allocations made while the stage ran
+        started_tracing = not tracemalloc.is_tracing()
+        if (started_tracing):
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        (mem_before, _) = tracemalloc.get_traced_memory()
+        rss_before = max_rss_kb()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+
+            (_, mem_peak) = tracemalloc.get_traced_memory()
+            if (started_tracing):
+                tracemalloc.stop()
+            rss_after = max_rss_kb()
+
+            proto = model.Proto()
+            literals = sum(referenced_literals(proto.constraints[i]) for i in range(num_constraints, len(proto.constraints)))
+            literals += objective_literals(proto) - num_objective_literals
+
+            self._stages.append(StageStats(
+                name,
+                wall_time,
+                len(proto.variables) - num_vars,
+                len(proto.constraints) - num_constraints,
+                literals,
+                (mem_peak - mem_before) / 1024.0,
+                None if rss_before == None else rss_after - rss_before
+            ))
+
+    def to_dict(self) -> dict:
+        return {
+            'total_wall_time_s': self.total_wall_time(),
+            'stages': [s.to_dict() for s in self._stages]
+        }
+
+    def write_json(self, filename: str) -> None:
+        with open(filename, 'w') as out_file:
+            json.dump(self.to_dict(), out_file, indent=2)
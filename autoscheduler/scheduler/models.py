@@ -58,12 +58,6 @@ class Commitment(ABC):
     def end_dt(self) -> datetime:
         pass
 
-    def assign(self, person: Person) -> None:
-        self._person = person
-
-    def assigned_to(self) -> Person:
-        return self._person
-
     def is_conflict(self, other) -> bool:
         return other.end_dt() > self.start_dt() and other.start_dt() < self.end_dt()
 
@@ -139,16 +133,63 @@ class AbsenceRequest(Commitment):
     def end_dt(self) -> datetime:
         return self._end_dt
 
+    def person_id(self) -> int:
+        return self._prsn_id
+
     def assigned_to(self, prsn: Person) -> bool:
-        return self._prsn_id == prsn.id
+        return self._prsn_id == prsn.id()
+
+class IntervalIndex:
+
+    def __init__(self, commitments: list[Commitment]):
+        self._commitments = sorted(commitments, key=lambda c: (c.start_dt(), c.end_dt()))
+
+    def commitments(self) -> list[Commitment]:
+        return self._commitments
+
+    def overlap_groups(self) -> list[list[int]]:
+        # sweep over start/end events (ends first on ties, since touching commitments don't conflict);
+        # the active set right before an end that follows a start is a maximal overlap set.
+        # groups are returned as positions into commitments()
+        START, INSTANT, END = 2, 1, 0
+
+        events = []
+        for (i, c) in enumerate(self._commitments):
+            if (c.start_dt() == c.end_dt()):
+                events.append((c.start_dt(), INSTANT, i))
+            else:
+                events.append((c.start_dt(), START, i))
+                events.append((c.end_dt(), END, i))
+        events.sort()
+
+        groups = []
+        active = {}
+        grown = False
+
+        for (_, kind, i) in events:
+            if (kind == START):
+                active[i] = None
+                grown = True
+            elif (kind == INSTANT):
+                if (len(active) > 0):
+                    groups.append(list(active) + [i])
+            else:
+                if (grown and len(active) > 1):
+                    groups.append(list(active))
+                grown = False
+                del active[i]
+
+        return groups
 
 class Day:
 
     def __init__(self, date: datetime.date):
         self._date = date
         self._commitments = {}
+        self._intervals = None
 
     def insert(self, commitment: Commitment) -> None:
+        self._intervals = None
         commit_type = type(commitment)
 
         if (commit_type not in self._commitments):
@@ -165,5 +206,11 @@ class Day:
         
         return self._commitments[commit_type]
 
+    def intervals(self) -> IntervalIndex:
+        if (self._intervals == None):
+            self._intervals = IntervalIndex(self.commitments())
+
+        return self._intervals
+
     def date(self) -> datetime.date:
         return self._date
\ No newline at end of file
@@ -0,0 +1,85 @@
+from ortools.sat.python import cp_model
+
+class SolverParameters:
+
+    # config.ini key -> (attribute, parser)
+    CONFIG_KEYS = {
+        'num_workers': ('num_workers', int),
+        'max_time_s': ('max_time_s', float),
+        'relative_gap': ('relative_gap', float),
+        'absolute_gap': ('absolute_gap', float),
+        'random_seed': ('random_seed', int),
+        'log_search': ('log_search', lambda v: v.strip().lower() in ('1', 'yes', 'true', 'on')),
+        'search_branching': ('search_branching', str),
+        'linearization_level': ('linearization_level', int)
+    }
+
+    def __init__(self, num_workers: int | None = None, max_time_s: float | None = None, relative_gap: float | None = None, absolute_gap: float | None = None, random_seed: int | None = None, log_search: bool = False,
+                 search_branching: str | None = None, linearization_level: int | None = None):
+        # None leaves the CP-SAT default in place
+        self.num_workers = num_workers
+        self.max_time_s = max_time_s
+        self.relative_gap = relative_gap
+        self.absolute_gap = absolute_gap
+        self.random_seed = random_seed
+        self.log_search = log_search
+
+        # a SatParameters.SearchBranching name, e.g. FIXED_SEARCH or PORTFOLIO_WITH_QUICK_RESTART_SEARCH
+        self.search_branching = search_branching
+        self.linearization_level = linearization_level
+
+    @classmethod
+    def from_config(cls, section) -> 'SolverParameters':
+        params = cls()
+
+        for (key, (attr, parse)) in cls.CONFIG_KEYS.items():
+            value = section.get(key, None)
+            if (value != None and value.strip() != ''):
+                setattr(params, attr, parse(value))
+
+        return params
+
+    def override(self, **overrides) -> 'SolverParameters':
+        values = self.to_dict()
+
+        for (key, value) in overrides.items():
+            if (key not in values):
+                raise ValueError('unknown solver parameter: %s' % key)
+            if (value != None):
+                values[key] = value
+
+        return SolverParameters(**values)
+
+    def apply(self, solver: cp_model.CpSolver) -> None:
+        p = solver.parameters
+
+        if (self.num_workers != None):
+            p.num_search_workers = self.num_workers
+        if (self.max_time_s != None):
+            p.max_time_in_seconds = self.max_time_s
+        if (self.relative_gap != None):
+            p.relative_gap_limit = self.relative_gap
+        if (self.absolute_gap != None):
+            p.absolute_gap_limit = self.absolute_gap
+        if (self.random_seed != None):
+            p.random_seed = self.random_seed
+        if (self.search_branching != None):
+            p.search_branching = getattr(type(p.search_branching), self.search_branching.upper())
+        if (self.linearization_level != None):
+            p.linearization_level = self.linearization_level
+
+        # search logs are captured through the solver's log callback rather than printed
+        p.log_search_progress = self.log_search
+        p.log_to_stdout = False
+
+    def to_dict(self) -> dict:
+        return {
+            'num_workers': self.num_workers,
+            'max_time_s': self.max_time_s,
+            'relative_gap': self.relative_gap,
+            'absolute_gap': self.absolute_gap,
+            'random_seed': self.random_seed,
+            'log_search': self.log_search,
+            'search_branching': self.search_branching,
+            'linearization_level': self.linearization_level
+        }
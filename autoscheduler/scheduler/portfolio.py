@@ -0,0 +1,201 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from ortools.sat.python import cp_model
+from scheduler.absences import AbsenceIndex
+from scheduler.callbacks import IntermediateSolution, SolutionSink
+from scheduler.models import AbsenceRequest, Duty, Line, Person
+from scheduler.parameters import SolverParameters
+from scheduler.solver import ScheduleModel, ScheduleSolution, ScheduleSolver, ShellSchedule
+from scheduler.variables import AssignmentMap
+
+class PortfolioConfig:
+
+    def __init__(self, name: str, parameters: dict | None = None, model_options: dict | None = None):
+        # parameters override the portfolio's SolverParameters; model_options are ScheduleModel keyword arguments.
+        # every configuration has to optimize the same weighted objective for the race to be fair, so the
+        # lexicographic objective mode has no place in a portfolio
+        self.name = name
+        self.parameters = parameters if parameters != None else {}
+        self.model_options = model_options if model_options != None else {}
+
+DEFAULT_PORTFOLIO = [
+    PortfolioConfig('default'),
+    PortfolioConfig('seed-1', parameters = {'random_seed': 1}),
+    PortfolioConfig('fixed-search', parameters = {'search_branching': 'FIXED_SEARCH'}),
+    PortfolioConfig('linearization-2', parameters = {'linearization_level': 2}),
+    PortfolioConfig('interval-overlap', model_options = {'overlap_mode': 'interval'}),
+    PortfolioConfig('integer-objective', model_options = {'objective_mode': 'integer'}),
+    PortfolioConfig('symmetry-breaking', model_options = {'symmetry_breaking': True})
+]
+
+# shared by every worker of one race, set up by _init_worker
+_stop = None
+_incumbent = None
+
+def _init_worker(stop, incumbent) -> None:
+    global _stop, _incumbent
+    _stop = stop
+    _incumbent = incumbent
+
+class IncumbentSink(SolutionSink):
+
+    def __init__(self):
+        self.gave_up = False
+
+    def on_solution(self, solution: IntermediateSolution) -> bool:
+        # every configuration publishes its incumbent and stops once its own bound says it cannot beat the best one
+        with _incumbent.get_lock():
+            if (solution.objective > _incumbent.value):
+                _incumbent.value = solution.objective
+            best = _incumbent.value
+
+        self.gave_up = solution.objective < best and solution.best_bound <= best
+        return self.gave_up
+
+class PortfolioResult:
+
+    def __init__(self, name: str, status: int, assignments: dict[int, int], objective: float | None, best_bound: float | None, wall_time: float, gave_up: bool):
+        self.name = name
+        self.status = status
+        self.assignments = assignments
+        self.objective = objective
+        self.best_bound = best_bound
+        self.wall_time = wall_time
+        self.gave_up = gave_up
+
+    def has_schedule(self) -> bool:
+        return self.status == cp_model.OPTIMAL or self.status == cp_model.FEASIBLE
+
+    def __str__(self) -> str:
+        return '%s: %s, objective %s, %.1fs%s' % (self.name, cp_model.CpSolver().StatusName(self.status), '-' if self.objective == None else '%.4f' % self.objective, self.wall_time, ' (outpaced)' if self.gave_up else '')
+
+def _run_config(config: PortfolioConfig, lines: list[Line], duties: list[Duty], personnel: list[Person], absences: list[AbsenceRequest] | AbsenceIndex, parameters: SolverParameters) -> PortfolioResult:
+    # runs in a worker process; the shell is rebuilt from the same lists so indices match the parent's
+    start = time.perf_counter()
+
+    # a worker that only gets a process once the race is over has nothing left to contribute
+    if (_stop.is_set()):
+        return PortfolioResult(config.name, cp_model.UNKNOWN, {}, None, None, time.perf_counter() - start, False)
+
+    shell = ShellSchedule(lines, duties)
+    model = ScheduleModel(shell, personnel, absences, **config.model_options)
+    model.add_all_contraints()
+
+    sink = IncumbentSink()
+    solver = ScheduleSolver(model, personnel, shell, parameters.override(**config.parameters), sinks = [sink])
+
+    # another configuration proving optimality, or the deadline, ends this one too. a stop only reaches a search that
+    # has already started, so it is repeated until the solve returns rather than lost while the model is still loading
+    finished = threading.Event()
+    def watch():
+        while (not finished.is_set()):
+            if (_stop.wait(0.05)):
+                solver.stop()
+                finished.wait(0.05)
+
+    watcher = threading.Thread(target = watch, daemon = True)
+    watcher.start()
+    try:
+        solution = solver.solve()
+    finally:
+        finished.set()
+        watcher.join()
+
+    return PortfolioResult(config.name, solution._status, dict(solution.assignments()), solution._objective, solution._best_bound, time.perf_counter() - start, sink.gave_up)
+
+class PortfolioReport:
+
+    def __init__(self):
+        self.results = []
+        self.winner = None
+        self.wall_time = 0.0
+
+    def __str__(self) -> str:
+        if (self.winner == None):
+            return 'no configuration found a schedule in %.1fs' % self.wall_time
+
+        return '%s won against %i other configurations in %.1fs' % (self.winner, len(self.results) - 1, self.wall_time)
+
+class PortfolioSolver:
+
+    def __init__(self, shell: ShellSchedule, personnel: list[Person], absences: list[AbsenceRequest] | AbsenceIndex, configs: list[PortfolioConfig] | None = None,
+                 parameters: SolverParameters | None = None):
+        self._shell = shell
+        self._personnel = personnel
+        self._absences = absences
+        self._configs = configs if configs != None else DEFAULT_PORTFOLIO
+
+        # max_time_s is the deadline for the whole race; the cores are split between the configurations
+        # unless a worker count is given
+        parameters = parameters if parameters != None else SolverParameters()
+        if (parameters.num_workers == None):
+            parameters = parameters.override(num_workers = max(1, (os.cpu_count() or 1) // len(self._configs)))
+        self._parameters = parameters
+
+        self._report = PortfolioReport()
+
+    def report(self) -> PortfolioReport:
+        return self._report
+
+    def _winner(self) -> PortfolioResult | None:
+        # a proof beats a better-looking incumbent only in name, so optimal wins, then the best objective, then the fastest
+        found = [r for r in self._report.results if r.has_schedule()]
+        if (len(found) == 0):
+            return None
+
+        return min(found, key = lambda r: (r.status != cp_model.OPTIMAL, -r.objective, r.wall_time))
+
+    def solve(self) -> ScheduleSolution:
+        start = time.perf_counter()
+        lines = [c for c in self._shell.commitments() if isinstance(c, Line)]
+        duties = [c for c in self._shell.commitments() if isinstance(c, Duty)]
+
+        stop = multiprocessing.Event()
+        incumbent = multiprocessing.Value('d', -math.inf)
+        deadline = start + self._parameters.max_time_s if self._parameters.max_time_s != None else None
+
+        with ProcessPoolExecutor(max_workers = len(self._configs), initializer = _init_worker, initargs = (stop, incumbent)) as pool:
+            pending = set(pool.submit(_run_config, config, lines, duties, self._personnel, self._absences, self._parameters) for config in self._configs)
+
+            while (len(pending) > 0):
+                timeout = max(0.0, deadline - time.perf_counter()) if deadline != None else None
+                (done, pending) = wait(pending, timeout = timeout, return_when = FIRST_COMPLETED)
+
+                if (len(done) == 0):
+                    # out of time: every configuration returns what it has
+                    stop.set()
+                    deadline = None
+                    continue
+
+                for future in done:
+                    result = future.result()
+                    self._report.results.append(result)
+
+                    if (result.status == cp_model.OPTIMAL or result.status == cp_model.INFEASIBLE or result.status == cp_model.MODEL_INVALID):
+                        stop.set()
+
+        self._report.wall_time = time.perf_counter() - start
+
+        winner = self._winner()
+        if (winner == None):
+            statuses = [r.status for r in self._report.results]
+            status = cp_model.INFEASIBLE if cp_model.INFEASIBLE in statuses else statuses[0]
+            return ScheduleSolution(status, self._shell, parameters = self._parameters, wall_time = self._report.wall_time, personnel = self._personnel)
+
+        self._report.winner = winner.name
+
+        # every configuration bounds the same optimum, so the tightest bound holds for the winner too
+        bounds = [r.best_bound for r in self._report.results if r.best_bound != None]
+
+        return ScheduleSolution(winner.status, self._shell,
+            parameters = self._parameters,
+            objective = winner.objective,
+            best_bound = min(bounds) if len(bounds) > 0 else None,
+            wall_time = self._report.wall_time,
+            num_solutions = len(self._report.results),
+            assignments = AssignmentMap.from_dict(len(self._shell.commitments()), winner.assignments),
+            personnel = self._personnel)
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from scheduler.models import AbsenceRequest
+
+def overlaps(start_dt: datetime, end_dt: datetime, window_start: datetime | None, window_end: datetime | None) -> bool:
+    # a missing bound leaves that side of the window open
+    return (window_end == None or start_dt < window_end) and (window_start == None or end_dt > window_start)
+
+class RecurringAbsence:
+
+    def __init__(self, prsn_id: int, start_dt: datetime, end_dt: datetime, until_dt: datetime, weekday_bit_ptn: int):
+        # the first occurrence is [start_dt, end_dt); later ones repeat it on every day up to until_dt whose (1 << isoweekday)
+        # bit is set in the pattern, the same encoding as absence_request.day_of_week_ptn
+        self._prsn_id = prsn_id
+        self._start_dt = start_dt
+        self._end_dt = end_dt
+        self._until_dt = until_dt
+        self._weekday_bit_ptn = weekday_bit_ptn
+
+    def person_id(self) -> int:
+        return self._prsn_id
+
+    def occurrences(self, window_start: datetime | None = None, window_end: datetime | None = None):
+        # lazily, and only for the days whose occurrence can reach into the window, so the work is bounded by the window
+        # rather than by how far the rule runs
+        first = 1
+        last = (self._until_dt - self._start_dt).days
+
+        if (window_start != None):
+            first = max(first, (window_start - self._end_dt).days)
+        if (window_end != None):
+            last = min(last, (window_end - self._start_dt).days)
+
+        # the first occurrence always counts, whatever weekday it falls on
+        if (overlaps(self._start_dt, self._end_dt, window_start, window_end)):
+            yield AbsenceRequest(self._prsn_id, self._start_dt, self._end_dt)
+
+        for n in range(first, last + 1):
+            start_dt = self._start_dt + timedelta(days = n)
+            if (not (1 << start_dt.isoweekday()) & self._weekday_bit_ptn):
+                continue
+
+            end_dt = self._end_dt + timedelta(days = n)
+            if (overlaps(start_dt, end_dt, window_start, window_end)):
+                yield AbsenceRequest(self._prsn_id, start_dt, end_dt)
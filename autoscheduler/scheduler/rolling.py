@@ -0,0 +1,109 @@
+from datetime import date
+from ortools.sat.python import cp_model
+from scheduler.absences import AbsenceIndex
+from scheduler.counts import PersonCounts
+from scheduler.instrumentation import max_rss_kb
+from scheduler.models import AbsenceRequest, Person
+from scheduler.parameters import SolverParameters
+from scheduler.solver import ScheduleModel, ScheduleSolution, ScheduleSolver, ShellSchedule, evaluate_objective, prorated_counts
+from scheduler.variables import AssignmentMap
+from scheduler.warmstart import PublishedSchedule
+
+class WindowReport:
+
+    def __init__(self, start: date, end: date, committed_through: date, num_variables: int, status: int, wall_time: float, max_rss_kb: int | None):
+        self.start = start
+        self.end = end
+        self.committed_through = committed_through
+        self.num_variables = num_variables
+        self.status = status
+        self.wall_time = wall_time
+        self.max_rss_kb = max_rss_kb
+
+    def __str__(self) -> str:
+        return '%s..%s (committed through %s): %i vars, %s, %.1fs' % (self.start, self.end, self.committed_through, self.num_variables, cp_model.CpSolver().StatusName(self.status), self.wall_time)
+
+class RollingHorizonSolver:
+
+    def __init__(self, shell: ShellSchedule, personnel: list[Person], absences: list[AbsenceRequest] | AbsenceIndex, window_days: int = 14, commit_days: int = 7,
+                 overlap_mode: str = 'pairwise', parameters: SolverParameters | None = None):
+        if (commit_days < 1 or commit_days > window_days):
+            raise ValueError('commit_days must be between 1 and window_days')
+
+        self._shell = shell
+        self._personnel = personnel
+        self._absences = absences if isinstance(absences, AbsenceIndex) else AbsenceIndex(absences)
+        self._window_days = window_days
+        self._commit_days = commit_days
+        self._overlap_mode = overlap_mode
+        self._parameters = parameters
+
+        self._windows = []
+
+    def windows(self) -> list[WindowReport]:
+        return self._windows
+
+    def solve(self) -> ScheduleSolution:
+        days = self._shell.days()
+
+        # commitment index in the full shell -> person index, for the days committed so far
+        assignments = {}
+        committed = PersonCounts()
+        hints = None
+        status = cp_model.OPTIMAL
+        wall_time = 0.0
+
+        i = 0
+        while (i < len(days)):
+            window = days[i:i + self._window_days]
+            last = i + len(window) == len(days)
+            to_commit = window if last else window[:self._commit_days]
+
+            # days already committed are constants; days beyond the window are assumed to meet AUSM evenly
+            carried = committed.merge(prorated_counts(self._personnel, (len(days) - i - len(window)) / len(days)))
+
+            # only this window's model is alive at a time, so memory follows the window, not the horizon
+            sub_shell = self._shell.subset(set(day.date() for day in window))
+            model = ScheduleModel(sub_shell, self._personnel, self._absences, overlap_mode = self._overlap_mode, carried = carried)
+            model.add_all_contraints()
+
+            solver = ScheduleSolver(model, self._personnel, sub_shell, self._parameters)
+            if (hints != None):
+                solver.warm_start(hints)
+            solution = solver.solve()
+
+            self._windows.append(WindowReport(window[0].date(), window[-1].date(), to_commit[-1].date(), len(model.variables()), solution._status, solution._wall_time, max_rss_kb()))
+            wall_time += solution._wall_time
+
+            if (not solution.has_schedule()):
+                status = solution._status
+                break
+
+            if (solution._status != cp_model.OPTIMAL):
+                status = cp_model.FEASIBLE
+
+            # committed days keep this window's assignments; the rest of the window only seeds the next one
+            commit_dates = set(day.date() for day in to_commit)
+            for (c, commitment) in enumerate(sub_shell.commitments()):
+                p = solution.assignments().get(c)
+                if (p != None and commitment.start_dt().date() in commit_dates):
+                    assignments[self._shell.index(commitment)] = p
+                    committed.add(self._personnel[p].id(), commitment)
+
+            uncommitted = {}
+            for commitment in sub_shell.commitments():
+                if (commitment.start_dt().date() not in commit_dates):
+                    person = solution.assigned_to(commitment)
+                    uncommitted[commitment.id()] = person.id() if person != None else None
+
+            hints = PublishedSchedule(uncommitted)
+            i += len(to_commit)
+
+        objective = None
+        if (status == cp_model.OPTIMAL or status == cp_model.FEASIBLE):
+            # optimal per window is not optimal over the horizon
+            status = cp_model.FEASIBLE
+            objective = evaluate_objective(self._shell, self._personnel, assignments)
+
+        return ScheduleSolution(status, self._shell, parameters = self._parameters, objective = objective, wall_time = wall_time, num_solutions = len(self._windows),
+                                assignments = AssignmentMap.from_dict(len(self._shell.commitments()), assignments), personnel = self._personnel)
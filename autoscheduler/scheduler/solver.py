@@ -1,6 +1,25 @@
-from datetime import timedelta
+from contextlib import contextmanager
+from datetime import date, timedelta
+from fractions import Fraction
+import math
+import numpy as np
 from ortools.sat.python import cp_model
+from scheduler.absences import AbsenceIndex
+from scheduler.cache import CachedModel, ModelCache, model_key
+from scheduler.callbacks import SinkCallback, SolutionSink
+from scheduler.compatibility import DayCompatibility
+from scheduler.counts import PersonCounts
+from scheduler.instrumentation import BuildStats
 from scheduler.models import AbsenceRequest, Commitment, Day, Duty, Line, Person, Qualification
+from scheduler.parameters import SolverParameters
+from scheduler.variables import AssignmentMap, AssignmentVariables
+from scheduler.warmstart import PublishedSchedule, WarmStartReport
+
+# duty types sharing the duty-tour limit in the objective
+DUTY_OBJECTIVE_QUALS = [['Operations Supervisor', 'SOF', 'RSU Controller', 'RSU Observer']]
+
+# percent of the weighted objective each term carries
+OBJECTIVE_WEIGHTS = {'Filled Lines': 60, 'Org Alignment': 5, 'AUSM': 15, 'Duty Fairness': 20}
 
 def get_commitments_for_ausm_tier(tier: int):
     if (tier == 1):
@@ -30,9 +49,54 @@ class ShellSchedule:
 
             self._dates_used[date].insert(c)
 
+        # in date order, not the order days were first seen: lines come before duties, so a day with only duties
+        # would otherwise land after the later days that have lines
+        self._days.sort(key = lambda day: day.date())
+
+        # every commitment gets a stable integer index; a day's commitments occupy a contiguous
+        # range in interval-index order so per-day work can slice instead of look up
+        self._commitments = []
+        self._indices = {}
+        self._day_ranges = {}
+        self._compatibility = {}
+
+        for day in self._days:
+            day_commits = day.intervals().commitments()
+            start = len(self._commitments)
+            self._commitments.extend(day_commits)
+            self._indices.update((id(commit), i) for (i, commit) in enumerate(day_commits, start))
+
+            self._day_ranges[day.date()] = (start, len(self._commitments))
+            self._compatibility[day.date()] = DayCompatibility(day_commits)
+
     def days(self) -> list[Day]:
         return self._days
 
+    def commitments(self) -> list[Commitment]:
+        return self._commitments
+
+    def index(self, commitment: Commitment) -> int:
+        return self._indices[id(commitment)]
+
+    def day_range(self, day: Day) -> tuple[int, int]:
+        return self._day_ranges[day.date()]
+
+    def indexed_commitments(self, day: Day, commit_type: None | Commitment = None) -> list[tuple[int, Commitment]]:
+        (start, stop) = self.day_range(day)
+        return [(i, self._commitments[i]) for i in range(start, stop) if commit_type == None or isinstance(self._commitments[i], commit_type)]
+
+    def compatibility(self, day: Day) -> DayCompatibility:
+        return self._compatibility[day.date()]
+
+    def subset(self, dates: set[date]) -> 'ShellSchedule':
+        # a shell over some of this shell's days, sharing the same commitment objects
+        commits = [c for day in self._days if day.date() in dates for c in day.commitments()]
+        return ShellSchedule([c for c in commits if isinstance(c, Line)], [c for c in commits if isinstance(c, Duty)])
+
+    def date_range(self) -> tuple[date, date]:
+        dates = [day.date() for day in self._days]
+        return (min(dates), max(dates))
+
 def duty_day_exceeded(c1: Commitment, c2: Commitment) -> bool:
     td1:timedelta = c1.end_dt() - c2.start_dt()
     td1_hrs = td1.total_seconds() / 3600.0
@@ -57,104 +121,311 @@ def has_turn_time(c1: Commitment, c2: Commitment, td: timedelta) -> bool:
 
     return td1 > td or td2 > td
 
-def get_absence_requests_for_person(absence_requests: list[AbsenceRequest], person: Person):
-    return [ar for ar in absence_requests if ar.assigned_to(person)]
+def is_eligible(commitment: Commitment, person: Person, absences: AbsenceIndex) -> bool:
+    # qualified for the duty, a PIT IP for a PIT line, and not away at the time
+    if (isinstance(commitment, Duty) and not person.is_qualified_for(Qualification('Duty', commitment.type))):
+        return False
+
+    if (isinstance(commitment, Line) and commitment.flight_org == 'X' and not person.is_qualified_for(Qualification('Flight', 'PIT IP'))):
+        return False
+
+    return not absences.conflicts_with(person.id(), commitment)
 
 # TODO: DESIGN: possibly a builder??????????
 class ScheduleModel:
 
-    def __init__(self, shell: ShellSchedule, personnel: list[Person], absences: list[AbsenceRequest]):
-        self._commit_vars = {}
+    OVERLAP_MODES = ('pairwise', 'interval')
+    OBJECTIVE_MODES = ('weighted', 'integer', 'lexicographic')
+
+    def __init__(self, shell: ShellSchedule, personnel: list[Person], absences: list[AbsenceRequest] | AbsenceIndex, overlap_mode: str = 'pairwise', instrument: bool = False, carried: PersonCounts | None = None, prices: dict[int, tuple[float, float]] | None = None, objective_mode: str = 'weighted', symmetry_breaking: bool = False, cached: CachedModel | None = None, eligibility_filter: bool = True):
+        if (overlap_mode.lower() not in self.OVERLAP_MODES):
+            raise ValueError('unknown overlap mode: %s' % overlap_mode)
+
+        if (objective_mode.lower() not in self.OBJECTIVE_MODES):
+            raise ValueError('unknown objective mode: %s' % objective_mode)
+
+        if (prices != None and objective_mode.lower() != 'weighted'):
+            raise ValueError('prices need the weighted objective mode')
+
         self._model = cp_model.CpModel()
+        self._overlap_mode = overlap_mode.lower()
+        self._objective_mode = objective_mode.lower()
+        self._objective_scale = 1
+        self._objective_terms = []
+        self._objective_term_vars = []
+        self._added_constraints = []
+        self._families = []
 
         self._shell = shell
         self._personnel = personnel
-        self._absences = absences
+        self._absences = absences if isinstance(absences, AbsenceIndex) else AbsenceIndex(absences)
+
+        # commitments made on days outside this model, folded into the cross-day objectives as constants
+        self._carried = carried if carried != None else PersonCounts()
+
+        # person id -> (price per commitment, extra price per duty); small penalties a decomposition uses to steer
+        # subproblems away from people the rest of the horizon already loads
+        self._prices = prices
+
+        self._vars = AssignmentVariables(len(shell.commitments()), len(personnel))
+
+        # off, every pair gets a variable and the qualification and absence constraints do the excluding, so they
+        # can show up in an infeasibility diagnosis
+        self._eligibility_filter = eligibility_filter
 
-        self._add_variables()
-        self._add_objective()
+        self._instrument = instrument
+        self._stats = BuildStats()
+
+        self._equivalence_classes = []
+
+        if (cached != None):
+            self._run_stage('_restore', lambda: self._restore(cached))
+            return
+
+        self._run_stage('_add_variables', self._add_variables)
+        self._run_stage('_add_objective', self._add_objective)
+
+        if (symmetry_breaking):
+            self._run_stage('_add_symmetry_breaking', self._add_symmetry_breaking)
 
     def _handle(self) -> cp_model.CpModel:
         return self._model
 
-    def _variable(self, var: tuple) -> str:
-        return self._commit_vars[var]
-        
+    def _run_stage(self, name: str, fn) -> None:
+        if (not self._instrument):
+            fn()
+            return
+
+        with self._stats.measure(name, self._model):
+            fn()
+
+    def stats(self) -> BuildStats:
+        return self._stats
+
+    def objective_mode(self) -> str:
+        return self._objective_mode
+
+    def objective_scale(self) -> int:
+        # what the CP-SAT objective is multiplied by relative to the weighted objective
+        return self._objective_scale
+
+    def objective_terms(self) -> list[tuple[str, cp_model.LinearExpr, Fraction]]:
+        return self._objective_terms
+
+    def variables(self) -> AssignmentVariables:
+        return self._vars
+
+    def personnel(self) -> list[Person]:
+        return self._personnel
+
+    def shell(self) -> ShellSchedule:
+        return self._shell
+
+    def absences(self) -> AbsenceIndex:
+        return self._absences
+
+    def carried(self) -> PersonCounts:
+        return self._carried
+
+    def equivalence_classes(self) -> list[list[int]]:
+        return self._equivalence_classes
+
+    def added_constraints(self) -> list[str]:
+        return self._added_constraints
+
+    def constraint_families(self) -> list[tuple[str, int, int]]:
+        # (family name, first proto constraint, one past the last) for every constraint family added so far
+        return self._families
+
+    @contextmanager
+    def _family(self, name: str):
+        start = len(self._model.Proto().constraints)
+        yield
+        self._families.append((name, start, len(self._model.Proto().constraints)))
+
+    def to_cached(self) -> CachedModel:
+        index = {
+            'pairs': [[c, p, var.index] for (c, p, var) in self._vars.pairs()],
+            'objective_scale': self._objective_scale,
+            'objective_terms': [[name, [var.index for var in term_vars], weight.numerator, weight.denominator] for ((name, _, weight), term_vars) in zip(self._objective_terms, self._objective_term_vars)],
+            'equivalence_classes': self._equivalence_classes,
+            'constraints': self._added_constraints,
+            'families': self._families
+        }
+
+        return CachedModel(str(self._model.Proto()), index)
+
+    def _restore(self, cached: CachedModel):
+        # the proto already holds every variable, constraint and the objective; only the python-side
+        # handles onto it are rebuilt
+        self._model.Proto().parse_text_format(cached.proto_text)
+
+        for (c, p, i) in cached.index['pairs']:
+            self._vars.set(c, p, self._model.get_bool_var_from_proto_index(i))
+
+        self._objective_scale = cached.index['objective_scale']
+        for (name, idxs, numerator, denominator) in cached.index['objective_terms']:
+            term_vars = [self._model.get_int_var_from_proto_index(i) for i in idxs]
+            self._objective_term_vars.append(term_vars)
+            self._objective_terms.append((name, sum(term_vars), Fraction(numerator, denominator)))
+
+        self._equivalence_classes = cached.index['equivalence_classes']
+        self._added_constraints = list(cached.index['constraints'])
+        self._families = [tuple(family) for family in cached.index['families']]
+
+    def _person_profile(self, person: Person) -> tuple:
+        # everything the model can tell people apart by: eligibility, the objective's per-person terms
+        # and whatever a decomposition carries or prices for them
+        absences = tuple(sorted(set((ar.start_dt(), ar.end_dt()) for day in self._shell.days() for ar in self._absences.absences_on(person.id(), day.date()))))
+        carried = (self._carried.commitments(person.id()),) + tuple(self._carried.duty_tours(person.id(), qual) for qual in DUTY_OBJECTIVE_QUALS)
+        price = self._prices.get(person.id()) if self._prices != None else None
+
+        return (frozenset(person._quals['Duty']), frozenset(person._quals['Flight']), person._ausm_tier, person._assigned_org, absences, carried, price)
+
+    def _add_symmetry_breaking(self):
+        classes = {}
+        for (p, person) in enumerate(self._personnel):
+            classes.setdefault(self._person_profile(person), []).append(p)
+
+        self._equivalence_classes = [members for members in classes.values() if len(members) > 1]
+
+        # any schedule can be permuted within a class without changing feasibility or objective, so only
+        # the permutation with non-increasing commitment counts (in personnel order) is kept
+        for members in self._equivalence_classes:
+            if (len(self._vars.column(members[0])) == 0):
+                continue
+
+            counts = [sum(self._vars.column(p)) for p in members]
+            for (first, second) in zip(counts, counts[1:]):
+                self._model.Add(first >= second)
+
+    def _candidates(self, commitment_idx: int) -> list[tuple[Person, cp_model.IntVar]]:
+        return [(self._personnel[p], var) for (p, var) in self._vars.row(commitment_idx)]
+
+    def _is_eligible(self, commitment: Commitment, person: Person) -> bool:
+        return is_eligible(commitment, person, self._absences)
+
     def _add_variables(self):
-        for day in self._shell.days():
-            for commitment in day.commitments():
-                for person in self._personnel:
-                    self._commit_vars[(day.date, commitment.id(), person.id())] = self._model.NewBoolVar('day_%s_commit_%s_pilot_%i' % (day.date, commitment.id(), person.id()))
+        # only assignments that could ever be made get a variable; everything downstream iterates existing pairs
+        for (c, commitment) in enumerate(self._shell.commitments()):
+            for (p, person) in enumerate(self._personnel):
+                if (not self._eligibility_filter or self._is_eligible(commitment, person)):
+                    self._vars.set(c, p, self._model.NewBoolVar('commit_%i_person_%i' % (c, p)))
 
     def _constraint_absence_requests(self):
         for day in self._shell.days():
-            commits = day.commitments()
+            (start, stop) = self._shell.day_range(day)
+            commits = self._shell.commitments()
+            day_start = commits[start].start_dt()
+            day_end = max(commits[c].end_dt() for c in range(start, stop))
 
-            for person in self._personnel:
-                persons_absence_requests = get_absence_requests_for_person(self._absences, person)
-        
-                for ar in persons_absence_requests:
-                    csp_conflicts = [self._commit_vars[(day.date, c.id(), person.id())] for c in commits if c.is_conflict(ar)]
+            for (p, person) in enumerate(self._personnel):
+                if (self._absences.is_available(person.id(), day_start, day_end)):
+                    continue
+
+                csp_conflicts = self._vars.select([c for c in range(start, stop) if self._absences.conflicts_with(person.id(), commits[c])], p)
+                if (len(csp_conflicts) > 0):
                     self._model.Add(sum(csp_conflicts) == 0)
 
     def _constraint_max_num_events(self):
         MAX_NUM_EVENTS_PER_PERSON = 3
         for day in self._shell.days():
-            for person in self._personnel:
-                events_per_person = [self._commit_vars[(day.date, commitment.id(), person.id())] for commitment in day.commitments()]
-                self._model.Add(sum(events_per_person) <= MAX_NUM_EVENTS_PER_PERSON)
+            (start, stop) = self._shell.day_range(day)
+
+            for p in range(len(self._personnel)):
+                events_per_person = self._vars.column(p, start, stop)
+                if (len(events_per_person) > MAX_NUM_EVENTS_PER_PERSON):
+                    self._model.Add(sum(events_per_person) <= MAX_NUM_EVENTS_PER_PERSON)
+
+    def _add_forbidden_groups(self, day: Day, matrix: np.ndarray):
+        (start, _) = self._shell.day_range(day)
+        forbidden_groups = [(start + first, [start + c for c in forbidden]) for (first, forbidden) in self._shell.compatibility(day).forbidden_groups(matrix)]
+
+        for p in range(len(self._personnel)):
+            for (first, forbidden) in forbidden_groups:
+                first_var = self._vars.get(first, p)
+                if (first_var is None):
+                    continue
+
+                csp_conflicts = self._vars.select(forbidden, p)
+                if (len(csp_conflicts) > 0):
+                    self._model.Add(sum(csp_conflicts) == 0).OnlyEnforceIf(first_var)
 
     def _constraint_max_duty_day(self):
-        #TODO: test this!
         for day in self._shell.days():
-            commits = day.commitments()
-
-            for person in self._personnel:
-                for outer in commits:
-                    csp_conflicts = [self._commit_vars[(day.date, inner.id(), person.id())] for inner in commits if duty_day_exceeded(outer, inner)]
-                    self._model.Add(sum(csp_conflicts) == 0).OnlyEnforceIf(self._commit_vars[(day.date, outer.id(), person.id())])
+            self._add_forbidden_groups(day, self._shell.compatibility(day).duty_day_exceeded)
 
     def _constraint_duty_filled_with_single_person(self):
         for day in self._shell.days():
-            for duty in day.commitments(Duty):
-                self._model.AddExactlyOne(self._commit_vars[(day.date, duty.id(), person.id())] for person in self._personnel)
+            for (c, duty) in self._shell.indexed_commitments(day, Duty):
+                # named after the duty so an empty row can still be traced back to it
+                self._model.AddExactlyOne(var for (_, var) in self._vars.row(c)).WithName(duty.id())
 
     def _constraint_flight_filled_with_at_most_single_person(self):
         for day in self._shell.days():
-            for curr_line in day.commitments(Line):
-                pilots_in_line = [self._commit_vars[(day.date, curr_line.id(), person.id())] for person in self._personnel]
+            for (c, _) in self._shell.indexed_commitments(day, Line):
+                pilots_in_line = [var for (_, var) in self._vars.row(c)]
                 self._model.Add(sum(pilots_in_line) <= 1)
             
     def _constraint_min_turn_time_between_commitments(self):
-        #TODO: test this!!!
+        if (self._overlap_mode == 'interval'):
+            self._constraint_no_overlap_intervals()
+            return
+
+        for day in self._shell.days():
+            (start, _) = self._shell.day_range(day)
+            overlap_groups = [[start + c for c in group] for group in day.intervals().overlap_groups()]
+
+            for p in range(len(self._personnel)):
+                for group in overlap_groups:
+                    conflicts = self._vars.select(group, p)
+                    if (len(conflicts) > 1):
+                        self._model.AddAtMostOne(conflicts)
+
+    def _constraint_no_overlap_intervals(self):
+        # each eligible assignment becomes an optional interval (in seconds from the day's first start)
+        # present iff the assignment is made; one NoOverlap per person per day lets CP-SAT's scheduling
+        # propagators handle conflicts instead of the pairwise clique formulation
         for day in self._shell.days():
-            commits = day.commitments()
+            (start, stop) = self._shell.day_range(day)
+            commits = self._shell.commitments()
+            origin = commits[start].start_dt()
 
-            for person in self._personnel:
-                for outer in commits:
-                    conflicts = [self._commit_vars[(day.date, inner.id(), person.id())] for inner in commits if inner.is_conflict(outer)]
-                    self._model.Add(sum(conflicts) <= 1).OnlyEnforceIf(self._commit_vars[(day.date, outer.id(), person.id())])
+            offsets = [(int((commits[c].start_dt() - origin).total_seconds()), int((commits[c].end_dt() - commits[c].start_dt()).total_seconds())) for c in range(start, stop)]
+
+            for p in range(len(self._personnel)):
+                intervals = []
+
+                for c in range(start, stop):
+                    var = self._vars.get(c, p)
+                    if (var is None):
+                        continue
+
+                    (offset, size) = offsets[c - start]
+                    intervals.append(self._model.NewOptionalFixedSizeIntervalVar(offset, size, var, 'interval_%i_%i' % (c, p)))
+
+                if (len(intervals) > 1):
+                    self._model.AddNoOverlap(intervals)
 
     def _constraint_max_turn_time_between_commitments(self):
-        #TODO: write unit tests for this
         for day in self._shell.days():
-            for person in self._personnel:
-                for commit in day.commitments():
-                    csp_forbidden_commits = [self._commit_vars[(day.date, c.id(), person.id())] for c in day.commitments() if has_turn_time(commit, c, timedelta(hours = 4, minutes = 15))]
-                    self._model.Add(sum(csp_forbidden_commits) == 0).OnlyEnforceIf(self._commit_vars[(day.date, commit.id(), person.id())])
-
+            self._add_forbidden_groups(day, self._shell.compatibility(day).turn_time_exceeded)
 
     def _constraint_personnel_qualified_for_duty(self):
         for day in self._shell.days():
-            for duty in day.commitments(Duty):
-                duties_to_be_scheduled = [self._commit_vars[(day.date, duty.id(), person.id())] for person in self._personnel if person.is_qualified_for(Qualification('Duty', duty.type))]
-                self._model.Add(sum(duties_to_be_scheduled) == 1)
+            for (c, duty) in self._shell.indexed_commitments(day, Duty):
+                duties_to_be_scheduled = [var for (p, var) in self._vars.row(c) if self._personnel[p].is_qualified_for(Qualification('Duty', duty.type))]
+                self._model.Add(sum(duties_to_be_scheduled) == 1).WithName(duty.id())
 
     def _constraint_personnel_qualified_for_PIT(self):
         for day in self._shell.days():
-            for person in self._personnel:
-                forbidden_flights = [self._commit_vars[(day.date, l.id(), person.id())] for l in day.commitments(Line) if (l.flight_org == 'X' and not person.is_qualified_for(Qualification('Flight', 'PIT IP')))]
-                self._model.Add(sum(forbidden_flights) == 0)
+            for (c, line) in self._shell.indexed_commitments(day, Line):
+                if (line.flight_org != 'X'):
+                    continue
+
+                forbidden_flights = [var for (p, var) in self._vars.row(c) if not self._personnel[p].is_qualified_for(Qualification('Flight', 'PIT IP'))]
+                if (len(forbidden_flights) > 0):
+                    self._model.Add(sum(forbidden_flights) == 0)
 
     def _add_duty_objective(self, duty_quals: str | list[str]):
         # TODO: this needs to be tested with list of duties now!
@@ -162,59 +433,86 @@ class ScheduleModel:
         for duty_qual_list in duty_quals:
             epsilon = self._model.NewIntVar(0, 10, duty_qual_list + "_eps")
 
-        for person in self._personnel:
-            duty_tours = []
-            for day in self._shell.days():
-                for d in day.commitments(Duty):
-                    if (d.is_type(duty_quals)):
-                        duty_tours.append(self._commit_vars[(day.date, d.id(), person.id())])
+        duty_idxs = [c for (c, commit) in enumerate(self._shell.commitments()) if isinstance(commit, Duty) and commit.is_type(duty_quals)]
 
-            self._model.Add(sum(duty_tours) <= 10 - epsilon)
+        for (p, person) in enumerate(self._personnel):
+            duty_tours = self._vars.select(duty_idxs, p)
+            self._model.Add(sum(duty_tours) + self._carried.duty_tours(person.id(), duty_quals) <= 10 - epsilon)
         
-        return (1/10)*epsilon
+        return epsilon
 
     def _add_objective(self):
-        num_total_lines = len([l for d in self._shell.days() for l in d.commitments(Line)])
+        line_idxs = [c for (c, commit) in enumerate(self._shell.commitments()) if isinstance(commit, Line)]
+        num_total_lines = max(1, len(line_idxs))
 
         # maximize the filled lines
         lines_filled = []
-        for day in self._shell.days():
-            for line in day.commitments(Line):
-                for person in self._personnel:
-                    lines_filled.append(self._commit_vars[(day.date, line.id(), person.id())])
+        for c in line_idxs:
+            for (_, var) in self._vars.row(c):
+                lines_filled.append(var)
         normalized_filled_lines = (1/num_total_lines)*sum(lines_filled)
 
         ## maximize assigned IPs by flight org
         lines_with_correctly_assigned = []
-        for day in self._shell.days():
-            for line in day.commitments(Line):
-                for person in self._personnel:
-                    if (person._assigned_org != None and person._assigned_org == line.flight_org):
-                        lines_with_correctly_assigned.append(self._commit_vars[(day.date, line.id(), person.id())])
+        for c in line_idxs:
+            line = self._shell.commitments()[c]
+            for (p, var) in self._vars.row(c):
+                person = self._personnel[p]
+                if (person._assigned_org != None and person._assigned_org == line.flight_org):
+                    lines_with_correctly_assigned.append(var)
         normalized_correctly_assigned_lines = (1/num_total_lines)*sum(lines_with_correctly_assigned)
 
         # optimize for AUSM tiers
         MAX_AUSM_EPSILON = 9
         ausm_epsilon = self._model.NewIntVar(0, MAX_AUSM_EPSILON, "ausm_eps")
-        for person in self._personnel:
-            scheduled_commitments = []
-            for day in self._shell.days():
-                commitments = day.commitments()
-                for c in commitments:
-                    scheduled_commitments.append(self._commit_vars[(day.date, c.id(), person.id())])
-
-            commitment_requirement = get_commitments_for_ausm_tier(person._ausm_tier)
-            normalized_ausm_epsilon = (1/MAX_AUSM_EPSILON)*ausm_epsilon
-            self._model.Add(sum(scheduled_commitments)  <= commitment_requirement + (MAX_AUSM_EPSILON - ausm_epsilon))
-            self._model.Add(sum(scheduled_commitments)  >= commitment_requirement - (MAX_AUSM_EPSILON - ausm_epsilon))
+        normalized_ausm_epsilon = (1/MAX_AUSM_EPSILON)*ausm_epsilon
+        with self._family('AUSM Balance'):
+            for (p, person) in enumerate(self._personnel):
+                scheduled_commitments = sum(self._vars.column(p)) + self._carried.commitments(person.id())
+
+                commitment_requirement = get_commitments_for_ausm_tier(person._ausm_tier)
+                self._model.Add(scheduled_commitments  <= commitment_requirement + (MAX_AUSM_EPSILON - ausm_epsilon))
+                self._model.Add(scheduled_commitments  >= commitment_requirement - (MAX_AUSM_EPSILON - ausm_epsilon))
 
         # optimize for duties
-        quals = [['Operations Supervisor', 'SOF', 'RSU Controller', 'RSU Observer']]
+        with self._family('Duty Tour Limit'):
+            duty_epsilon_vars = [self._add_duty_objective(qual) for qual in DUTY_OBJECTIVE_QUALS]
         duty_epsilons = 0
-        for qual in quals:
-            duty_epsilons += self._add_duty_objective(qual)
-
-        self._model.Maximize(.6*normalized_filled_lines + .05*normalized_correctly_assigned_lines + .15*normalized_ausm_epsilon + .2*duty_epsilons)
+        for epsilon in duty_epsilon_vars:
+            duty_epsilons += (1/10)*epsilon
+
+        # the same four terms as integer expressions, each with its exact weight per unit, in priority order
+        self._objective_term_vars = [lines_filled, lines_with_correctly_assigned, [ausm_epsilon], duty_epsilon_vars]
+        self._objective_terms = [
+            ('Filled Lines', sum(lines_filled), Fraction(OBJECTIVE_WEIGHTS['Filled Lines'], 100*num_total_lines)),
+            ('Org Alignment', sum(lines_with_correctly_assigned), Fraction(OBJECTIVE_WEIGHTS['Org Alignment'], 100*num_total_lines)),
+            ('AUSM', ausm_epsilon, Fraction(OBJECTIVE_WEIGHTS['AUSM'], 100*MAX_AUSM_EPSILON)),
+            ('Duty Fairness', sum(duty_epsilon_vars), Fraction(OBJECTIVE_WEIGHTS['Duty Fairness'], 100*10))
+        ]
+
+        if (self._objective_mode == 'integer'):
+            # scaled by the common denominator so CP-SAT sees exact integer coefficients
+            self._objective_scale = math.lcm(*[weight.denominator for (_, _, weight) in self._objective_terms])
+            self._model.Maximize(sum(int(weight*self._objective_scale)*expr for (_, expr, weight) in self._objective_terms))
+            return
+
+        if (self._objective_mode == 'lexicographic'):
+            # ScheduleSolver replaces this with each phase's term in turn
+            self._model.Maximize(self._objective_terms[0][1])
+            return
+
+        objective = (OBJECTIVE_WEIGHTS['Filled Lines']/100)*normalized_filled_lines + (OBJECTIVE_WEIGHTS['Org Alignment']/100)*normalized_correctly_assigned_lines + (OBJECTIVE_WEIGHTS['AUSM']/100)*normalized_ausm_epsilon + (OBJECTIVE_WEIGHTS['Duty Fairness']/100)*duty_epsilons
+
+        if (self._prices != None):
+            priced = []
+            for (c, p, var) in self._vars.pairs():
+                (commitment_price, duty_price) = self._prices.get(self._personnel[p].id(), (0.0, 0.0))
+                price = commitment_price + (duty_price if isinstance(self._shell.commitments()[c], Duty) else 0.0)
+                if (price != 0.0):
+                    priced.append(price*var)
+            objective -= sum(priced)
+
+        self._model.Maximize(objective)
 
     constraints = {
         "Absence Request": _constraint_absence_requests,
@@ -228,49 +526,270 @@ class ScheduleModel:
         "PIT Qualified Personnel": _constraint_personnel_qualified_for_PIT
     }
 
+    def add_hints(self, published: PublishedSchedule) -> WarmStartReport:
+        # a published assignment survives if its commitment is still in the shell and the person is still
+        # eligible for it; surviving commitments hint their whole row so CP-SAT starts from the old schedule
+        self._model.ClearHints()
+
+        commit_idxs = {commitment.id(): c for (c, commitment) in enumerate(self._shell.commitments())}
+        person_idxs = {person.id(): p for (p, person) in enumerate(self._personnel)}
+
+        survived = 0
+        for (commit_id, person_id) in published.assignments.items():
+            c = commit_idxs.get(commit_id)
+            if (c == None):
+                continue
+
+            p = person_idxs.get(person_id) if person_id != None else None
+            if (person_id != None and (p == None or self._vars.get(c, p) is None)):
+                continue
+
+            for (q, var) in self._vars.row(c):
+                self._model.AddHint(var, 1 if q == p else 0)
+            survived += 1
+
+        return WarmStartReport(len(published.assignments), survived, published.wall_time)
+
     def add_all_contraints(self):
         for con in self.constraints.keys():
             self.add_constraint(con)
 
     def add_constraint(self, constraint_nm: str):
         fn = self.constraints[constraint_nm]
-        fn(self)
+
+        # a model restored from the cache already carries the constraints it was built with
+        if (constraint_nm in self._added_constraints):
+            return
+
+        with self._family(constraint_nm):
+            self._run_stage(constraint_nm, lambda: fn(self))
+        self._added_constraints.append(constraint_nm)
+
+def build_model(shell: ShellSchedule, personnel: list[Person], absences: list[AbsenceRequest] | AbsenceIndex, cache: ModelCache | None = None, constraint_names: list[str] | None = None, **options) -> ScheduleModel:
+    # a model with the given constraints (all of them by default), loaded from the cache when one was already built from identical inputs
+    absences = absences if isinstance(absences, AbsenceIndex) else AbsenceIndex(absences)
+    constraint_names = constraint_names if constraint_names != None else list(ScheduleModel.constraints.keys())
+
+    key = None
+    if (cache != None):
+        key_options = {name: value for (name, value) in options.items() if name != 'instrument'}
+        key_options['objective_weights'] = OBJECTIVE_WEIGHTS
+        key = model_key(shell, personnel, absences, constraint_names, key_options)
+
+        cached = cache.load(key)
+        if (cached != None):
+            return ScheduleModel(shell, personnel, absences, cached = cached, **options)
+
+    model = ScheduleModel(shell, personnel, absences, **options)
+    for name in constraint_names:
+        model.add_constraint(name)
+
+    if (cache != None):
+        cache.store(key, model.to_cached())
+
+    return model
+
+def evaluate_objective(shell: ShellSchedule, personnel: list[Person], assignments: dict[int, int], carried: PersonCounts | None = None) -> float | None:
+    # the value ScheduleModel's objective takes for a complete assignment (commitment index -> person index),
+    # or None when the assignment breaks one of the cross-day limits the objective's epsilons enforce
+    carried = carried if carried != None else PersonCounts()
+    commits = shell.commitments()
+
+    line_idxs = [c for (c, commit) in enumerate(commits) if isinstance(commit, Line)]
+    num_total_lines = max(1, len(line_idxs))
+    lines_filled = sum(1 for c in line_idxs if c in assignments)
+    lines_correctly_assigned = sum(1 for c in line_idxs if c in assignments and personnel[assignments[c]]._assigned_org != None and personnel[assignments[c]]._assigned_org == commits[c].flight_org)
+
+    counts = PersonCounts.from_assignments([(personnel[p].id(), commits[c]) for (c, p) in assignments.items()]).merge(carried)
+
+    MAX_AUSM_EPSILON = 9
+    ausm_epsilon = MAX_AUSM_EPSILON
+    for person in personnel:
+        commitment_requirement = get_commitments_for_ausm_tier(person._ausm_tier)
+        ausm_epsilon = min(ausm_epsilon, MAX_AUSM_EPSILON - abs(counts.commitments(person.id()) - commitment_requirement))
+
+    duty_epsilons = 0
+    for qual in DUTY_OBJECTIVE_QUALS:
+        duty_epsilon = min([10] + [10 - counts.duty_tours(person.id(), qual) for person in personnel])
+        if (duty_epsilon < 0):
+            return None
+        duty_epsilons += (1/10)*duty_epsilon
+
+    if (ausm_epsilon < 0):
+        return None
+
+    return (OBJECTIVE_WEIGHTS['Filled Lines']/100)*(lines_filled/num_total_lines) + (OBJECTIVE_WEIGHTS['Org Alignment']/100)*(lines_correctly_assigned/num_total_lines) + (OBJECTIVE_WEIGHTS['AUSM']/100)*(ausm_epsilon/MAX_AUSM_EPSILON) + (OBJECTIVE_WEIGHTS['Duty Fairness']/100)*duty_epsilons
+
+def prorated_counts(personnel: list[Person], fraction: float) -> PersonCounts:
+    # an estimate of the commitments each person makes over the part of the horizon outside a model,
+    # assuming their AUSM requirement is met evenly across it
+    counts = PersonCounts()
+    for person in personnel:
+        counts.add_commitments(person.id(), round(get_commitments_for_ausm_tier(person._ausm_tier) * fraction))
+
+    return counts
+
+class PhaseReport:
+
+    def __init__(self, name: str, status: int, value: int | None, bound: int | None, wall_time: float):
+        self.name = name
+        self.status = status
+        self.value = value
+        self.bound = bound
+        self.wall_time = wall_time
+
+    def __str__(self) -> str:
+        return '%s: %s %s in %.3fs' % (self.name, cp_model.CpSolver().StatusName(self.status), '-' if self.value == None else '%i (bound %i)' % (self.value, self.bound), self.wall_time)
 
 class ScheduleSolution:
-    def __init__(self, status: str, schedule: ShellSchedule):
+    def __init__(self, status: str, schedule: ShellSchedule, parameters: SolverParameters | None = None, objective: float | None = None, best_bound: float | None = None, wall_time: float | None = None, log: list[str] | None = None, num_solutions: int = 0, warm_start: WarmStartReport | None = None, phases: list[PhaseReport] | None = None,
+                 assignments: AssignmentMap | None = None, personnel: list[Person] | None = None):
         self._status = status
         self._schedule = schedule
+        self._assignments = assignments if assignments != None else AssignmentMap.from_dict(len(schedule.commitments()), {})
+        self._personnel = personnel if personnel != None else []
+        self._num_solutions = num_solutions
+
+        self._parameters = parameters
+        self._objective = objective
+        self._best_bound = best_bound
+        self._wall_time = wall_time
+        self._log = log if log != None else []
+        self._warm_start = warm_start
+        self._phases = phases if phases != None else []
+
+        # why an infeasible shell is infeasible, when it has been diagnosed
+        self._diagnosis = None
+
+    def has_schedule(self) -> bool:
+        return self._status == cp_model.OPTIMAL or self._status == cp_model.FEASIBLE
+
+    def status_name(self) -> str:
+        return cp_model.CpSolver().StatusName(self._status)
+
+    def assignments(self) -> AssignmentMap:
+        return self._assignments
+
+    def personnel(self) -> list[Person]:
+        return self._personnel
+
+    def assigned_to(self, commitment: Commitment) -> Person | None:
+        p = self._assignments.get(self._schedule.index(commitment))
+        return self._personnel[p] if p != None else None
 
 class ScheduleSolver:
     
-    def __init__(self, model:ScheduleModel, personnel: list[Person], shell: ShellSchedule):
+    def __init__(self, model:ScheduleModel, personnel: list[Person], shell: ShellSchedule, parameters: SolverParameters | None = None, sinks: list[SolutionSink] | None = None):
         self._model = model
         self._personnel = personnel
         self._shell = shell
         self._solver = cp_model.CpSolver()
+        self._parameters = parameters if parameters != None else SolverParameters()
+        self._sinks = list(sinks) if sinks != None else []
+        self._warm_start = None
+
+    def warm_start(self, published: PublishedSchedule) -> WarmStartReport:
+        self._warm_start = self._model.add_hints(published)
+        return self._warm_start
+
+    def add_sink(self, sink: SolutionSink) -> None:
+        self._sinks.append(sink)
+
+    def stop(self) -> None:
+        # asks a running solve to return its incumbent; safe to call from another thread
+        self._solver.StopSearch()
 
     def solve(self) -> ScheduleSolution:
+        log = []
+        self._parameters.apply(self._solver)
+        if (self._parameters.log_search):
+            self._solver.log_callback = log.append
 
-        status = self._solver.Solve(self._model._handle())
-        print(self._solver.ObjectiveValue())
+        # improving solutions are streamed to the sinks while the search continues
+        scale = self._model.objective_scale()
+        callback = SinkCallback(self._model.variables(), self._sinks, scale) if len(self._sinks) > 0 else None
 
-        self._parse_solution()
-        solution = ScheduleSolution(status, self._shell)
+        if (self._model.objective_mode() == 'lexicographic'):
+            return self._solve_lexicographic(callback, log)
 
-        return solution
+        status = self._solver.Solve(self._model._handle(), callback)
 
-    def _parse_solution(self) -> None:
-        for day in self._shell.days():
-            for d in day.commitments(Duty):
-                d.assign(None)
+        has_solution = status == cp_model.OPTIMAL or status == cp_model.FEASIBLE
+
+        solution = ScheduleSolution(status, self._shell,
+            parameters = self._parameters,
+            objective = self._solver.ObjectiveValue() / scale if has_solution else None,
+            best_bound = self._solver.BestObjectiveBound() / scale if has_solution else None,
+            wall_time = self._solver.WallTime(),
+            log = log,
+            num_solutions = callback.count() if callback != None else 0,
+            warm_start = self._warm_start,
+            assignments = self._assignments() if has_solution else None,
+            personnel = self._model.personnel())
 
-                for person in self._personnel:
-                    if self._solver.Value(self._model._variable((day.date, d.id(), person.id()))):
-                        d.assign(person)
+        if (self._warm_start != None):
+            self._warm_start.wall_time = self._solver.WallTime()
 
-            for l in day.commitments(Line):
-                l.assign(None)
+        return solution
 
-                for person in self._personnel:
-                    if self._solver.Value(self._model._variable((day.date, l.id(), person.id()))):
-                        l.assign(person)
\ No newline at end of file
+    def _solve_lexicographic(self, callback: SinkCallback | None, log: list[str]) -> ScheduleSolution:
+        # one solve per objective term in priority order, on a copy of the model so the built model is left as is;
+        # each phase holds the previous terms at the level they reached and starts from the previous solution.
+        # max_time_s bounds all the phases together: each gets whatever the earlier ones left
+        working = self._model._handle().clone()
+        phases = []
+        status = cp_model.UNKNOWN
+        assignments = None
+        max_time_s = self._parameters.max_time_s
+
+        for (name, expr, _) in self._model.objective_terms():
+            if (max_time_s != None):
+                remaining = max_time_s - sum(phase.wall_time for phase in phases)
+                if (remaining <= 0 and assignments != None):
+                    # out of time with a solution in hand: the remaining terms stay as the last phase left them
+                    status = cp_model.FEASIBLE
+                    break
+
+                self._solver.parameters.max_time_in_seconds = max(remaining, 0.0)
+
+            if (callback != None):
+                callback.set_phase(name)
+
+            working.Maximize(expr)
+            phase_status = self._solver.Solve(working, callback)
+
+            if (phase_status != cp_model.OPTIMAL and phase_status != cp_model.FEASIBLE):
+                phases.append(PhaseReport(name, phase_status, None, None, self._solver.WallTime()))
+                # a phase cut short by the time limit leaves the earlier phases' schedule, no longer proven optimal
+                status = phase_status if assignments == None else cp_model.FEASIBLE
+                break
+
+            value = int(round(self._solver.ObjectiveValue()))
+            phases.append(PhaseReport(name, phase_status, value, int(round(self._solver.BestObjectiveBound())), self._solver.WallTime()))
+            status = cp_model.FEASIBLE if (phase_status == cp_model.FEASIBLE or status == cp_model.FEASIBLE) else cp_model.OPTIMAL
+            assignments = self._assignments()
+
+            working.Add(expr >= value)
+            working.ClearHints()
+            for i in range(len(working.Proto().variables)):
+                var = working.get_int_var_from_proto_index(i)
+                working.AddHint(var, self._solver.Value(var))
+
+        wall_time = sum(phase.wall_time for phase in phases)
+        if (self._warm_start != None):
+            self._warm_start.wall_time = wall_time
+
+        return ScheduleSolution(status, self._shell,
+            parameters = self._parameters,
+            objective = evaluate_objective(self._shell, self._model.personnel(), assignments, self._model.carried()) if assignments != None else None,
+            wall_time = wall_time,
+            log = log,
+            num_solutions = callback.count() if callback != None else 0,
+            warm_start = self._warm_start,
+            phases = phases,
+            assignments = assignments,
+            personnel = self._model.personnel())
+
+    def _assignments(self) -> AssignmentMap:
+        # one read of the whole response instead of a solver call per decision variable
+        return AssignmentMap.from_values(self._model.variables(), self._solver.response_proto.solution)
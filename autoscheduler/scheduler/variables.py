@@ -0,0 +1,91 @@
+from collections.abc import Mapping
+import numpy as np
+from ortools.sat.python import cp_model
+
+class AssignmentVariables:
+
+    def __init__(self, num_commitments: int, num_personnel: int):
+        # rows are commitment indices, columns are person indices; ineligible pairs hold None
+        self._vars = np.full((num_commitments, num_personnel), None, dtype=object)
+        self._eligible = np.zeros((num_commitments, num_personnel), dtype=bool)
+        self._proto_indices = None
+
+    def shape(self) -> tuple[int, int]:
+        return self._vars.shape
+
+    def set(self, commitment_idx: int, person_idx: int, var: cp_model.IntVar) -> None:
+        self._vars[commitment_idx, person_idx] = var
+        self._eligible[commitment_idx, person_idx] = True
+        self._proto_indices = None
+
+    def get(self, commitment_idx: int, person_idx: int) -> cp_model.IntVar | None:
+        return self._vars[commitment_idx, person_idx]
+
+    def row(self, commitment_idx: int) -> list[tuple[int, cp_model.IntVar]]:
+        row = self._vars[commitment_idx]
+        return [(int(p), row[p]) for p in np.flatnonzero(self._eligible[commitment_idx])]
+
+    def column(self, person_idx: int, start: int = 0, stop: int | None = None) -> list[cp_model.IntVar]:
+        col = self._vars[start:stop, person_idx]
+        return col[self._eligible[start:stop, person_idx]].tolist()
+
+    def select(self, commitment_idxs: list[int], person_idx: int) -> list[cp_model.IntVar]:
+        return [v for v in self._vars[commitment_idxs, person_idx] if v is not None]
+
+    def pairs(self):
+        for (c, p) in zip(*np.nonzero(self._eligible)):
+            yield (int(c), int(p), self._vars[c, p])
+
+    def proto_indices(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (commitment indices, person indices, proto variable indices) of every pair, for reading a whole solution at once
+        if (self._proto_indices == None):
+            (cs, ps) = np.nonzero(self._eligible)
+            idxs = np.array([var.index for var in self._vars[cs, ps]], dtype=np.int64)
+            self._proto_indices = (cs, ps, idxs)
+
+        return self._proto_indices
+
+    def __len__(self) -> int:
+        return int(self._eligible.sum())
+
+class AssignmentMap(Mapping):
+
+    def __init__(self, person_idxs: np.ndarray):
+        # commitment index -> person index, -1 where the commitment is unfilled; read-only, so one map can be
+        # handed to printers, writers and concurrent runs while the shell it indexes stays untouched
+        self._person_idxs = np.array(person_idxs, dtype=np.int32)
+        self._person_idxs.setflags(write=False)
+
+    @classmethod
+    def from_values(cls, variables: AssignmentVariables, values) -> 'AssignmentMap':
+        # values: every proto variable's value in index order, as in CpSolverResponse.solution
+        (cs, ps, idxs) = variables.proto_indices()
+        chosen = np.asarray(values, dtype=np.int64)[idxs] > 0
+
+        person_idxs = np.full(variables.shape()[0], -1, dtype=np.int32)
+        person_idxs[cs[chosen]] = ps[chosen]
+
+        return cls(person_idxs)
+
+    @classmethod
+    def from_dict(cls, num_commitments: int, assignments: dict[int, int]) -> 'AssignmentMap':
+        person_idxs = np.full(num_commitments, -1, dtype=np.int32)
+        for (c, p) in assignments.items():
+            person_idxs[c] = p
+
+        return cls(person_idxs)
+
+    def num_commitments(self) -> int:
+        return len(self._person_idxs)
+
+    def __getitem__(self, commitment_idx: int) -> int:
+        if (commitment_idx < 0 or commitment_idx >= len(self._person_idxs) or self._person_idxs[commitment_idx] < 0):
+            raise KeyError(commitment_idx)
+
+        return int(self._person_idxs[commitment_idx])
+
+    def __iter__(self):
+        return (int(c) for c in np.flatnonzero(self._person_idxs >= 0))
+
+    def __len__(self) -> int:
+        return int((self._person_idxs >= 0).sum())
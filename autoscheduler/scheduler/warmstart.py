@@ -0,0 +1,75 @@
+from datetime import date, datetime
+import json
+import os
+
+class PublishedSchedule:
+
+    def __init__(self, assignments: dict[str, int | None], wall_time: float | None = None, times: dict[str, tuple[datetime, datetime]] | None = None):
+        # commitment id() -> person id, None for commitments that were published unfilled
+        self.assignments = assignments
+        self.wall_time = wall_time
+
+        # commitment id() -> the (start, end) it was published with; ids only carry the number or name and the date, so
+        # this is what tells a commitment that moved within its day from one that did not
+        self.times = times if times != None else {}
+
+    @classmethod
+    def from_solution(cls, solution) -> 'PublishedSchedule':
+        assignments = {}
+        times = {}
+
+        for commitment in solution._schedule.commitments():
+            person = solution.assigned_to(commitment)
+            assignments[commitment.id()] = person.id() if person != None else None
+            times[commitment.id()] = (commitment.start_dt(), commitment.end_dt())
+
+        return cls(assignments, solution._wall_time, times)
+
+    def to_dict(self) -> dict:
+        times = {key: [start.isoformat(), end.isoformat()] for (key, (start, end)) in self.times.items()}
+        return {'wall_time': self.wall_time, 'assignments': self.assignments, 'times': times}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'PublishedSchedule':
+        times = {key: (datetime.fromisoformat(start), datetime.fromisoformat(end)) for (key, (start, end)) in d.get('times', {}).items()}
+        return cls(d['assignments'], d.get('wall_time'), times)
+
+class JsonScheduleStore:
+
+    def __init__(self, directory: str):
+        self._directory = directory
+
+    def _filename(self, start: date, end: date) -> str:
+        return os.path.join(self._directory, 'published_%s_%s.json' % (start.strftime('%Y%m%d'), end.strftime('%Y%m%d')))
+
+    def load(self, start: date, end: date) -> PublishedSchedule | None:
+        filename = self._filename(start, end)
+        if (not os.path.exists(filename)):
+            return None
+
+        with open(filename) as in_file:
+            return PublishedSchedule.from_dict(json.load(in_file))
+
+    def save(self, start: date, end: date, published: PublishedSchedule) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+
+        with open(self._filename(start, end), 'w') as out_file:
+            json.dump(published.to_dict(), out_file)
+
+class WarmStartReport:
+
+    def __init__(self, hints_total: int, hints_survived: int, previous_wall_time: float | None):
+        self.hints_total = hints_total
+        self.hints_survived = hints_survived
+        self.previous_wall_time = previous_wall_time
+        self.wall_time = None
+
+    def speedup(self) -> float | None:
+        if (self.previous_wall_time == None or self.wall_time == None or self.wall_time <= 0.0):
+            return None
+
+        return self.previous_wall_time / self.wall_time
+
+    def __str__(self) -> str:
+        speedup = self.speedup()
+        return '%i of %i hints survived%s' % (self.hints_survived, self.hints_total, '' if speedup == None else ', re-solve %.1fx faster than the published build' % speedup)
@@ -0,0 +1,101 @@
+import random
+from datetime import date, datetime, timedelta
+from scheduler.models import AbsenceRequest, Duty, Line, Person, Qualification
+
+# fraction of personnel holding each qualification
+DEFAULT_QUAL_MIX = {
+    ('Duty', 'Operations Supervisor'): 0.10,
+    ('Duty', 'SOF'): 0.20,
+    ('Duty', 'RSU Controller'): 0.35,
+    ('Duty', 'RSU Observer'): 0.45,
+    ('Flight', 'PIT IP'): 0.15
+}
+
+# (name, type, sign in hour, hours) -- mirrors the duty roster loaded by data/tables.sql
+DUTY_TEMPLATE = [
+    ('OPS SUP 1', 'Operations Supervisor', 6, 6),
+    ('OPS SUP 2', 'Operations Supervisor', 12, 6),
+    ('SOF 1', 'SOF', 6, 4),
+    ('SOF 2', 'SOF', 10, 4),
+    ('SOF 3', 'SOF', 14, 4),
+    ('Tinder 1 CONTROLLER', 'RSU Controller', 7, 3),
+    ('Tinder 1 OBSERVER', 'RSU Observer', 7, 3),
+    ('Tinder 2 CONTROLLER', 'RSU Controller', 10, 3),
+    ('Tinder 2 OBSERVER', 'RSU Observer', 10, 3),
+    ('Tinder 3 CONTROLLER', 'RSU Controller', 13, 3),
+    ('Tinder 3 OBSERVER', 'RSU Observer', 13, 3),
+    ('Tinder 4 CONTROLLER', 'RSU Controller', 16, 2),
+    ('Tinder 4 OBSERVER', 'RSU Observer', 16, 2)
+]
+
+ORGS = ['M', 'N', 'O', 'P']
+
+class SyntheticInput:
+
+    def __init__(self, lines: list[Line], duties: list[Duty], personnel: list[Person], absences: list[AbsenceRequest]):
+        self.lines = lines
+        self.duties = duties
+        self.personnel = personnel
+        self.absences = absences
+
+def flying_days(start: date, num_days: int) -> list[date]:
+    days = []
+    d = start
+
+    while (len(days) < num_days):
+        if (d.isoweekday() <= 5):
+            days.append(d)
+        d += timedelta(days = 1)
+
+    return days
+
+def generate(seed: int = 0, num_days: int = 5, lines_per_day: int = 20, duties_per_day: int = len(DUTY_TEMPLATE), num_personnel: int = 60,
+             qual_mix: dict[tuple[str, str], float] = DEFAULT_QUAL_MIX, pit_line_fraction: float = 0.1,
+             recurring_absence_density: float = 0.1, absence_rate: float = 0.05, start_date: date = date(2023, 1, 2)) -> SyntheticInput:
+    rng = random.Random(seed)
+    days = flying_days(start_date, num_days)
+
+    lines = []
+    duties = []
+    for d in days:
+        midnight = datetime(d.year, d.month, d.day)
+
+        for num in range(1, lines_per_day + 1):
+            takeoff = midnight + timedelta(hours = 7, minutes = 15 * rng.randint(0, 36))
+            org = 'X' if rng.random() < pit_line_fraction else rng.choice(ORGS)
+            lines.append(Line(num, org, takeoff))
+
+        for (name, duty_type, sign_in_hr, hours) in DUTY_TEMPLATE[:duties_per_day]:
+            sign_in = midnight + timedelta(hours = sign_in_hr)
+            duties.append(Duty(name, duty_type, sign_in, sign_in + timedelta(hours = hours)))
+
+    personnel = []
+    absences = []
+    for prsn_id in range(1, num_personnel + 1):
+        person = Person(prsn_id, 'Last%i' % prsn_id, 'First%i' % prsn_id, rng.randint(1, 4))
+
+        if (rng.random() < 0.8):
+            person.assign_to(rng.choice(ORGS))
+
+        for ((qual_type, qual_name), fraction) in qual_mix.items():
+            if (rng.random() < fraction):
+                person.qual(Qualification(qual_type, qual_name))
+
+        personnel.append(person)
+
+        # weekly recurring absence, e.g. a standing meeting
+        if (rng.random() < recurring_absence_density):
+            weekday = rng.randint(1, 5)
+            start_hr = rng.randint(8, 15)
+            for d in days:
+                if (d.isoweekday() == weekday):
+                    start_dt = datetime(d.year, d.month, d.day, start_hr)
+                    absences.append(AbsenceRequest(prsn_id, start_dt, start_dt + timedelta(hours = rng.choice([1, 2]))))
+
+        # one-off absences
+        for d in days:
+            if (rng.random() < absence_rate):
+                start_dt = datetime(d.year, d.month, d.day, rng.randint(0, 14))
+                absences.append(AbsenceRequest(prsn_id, start_dt, start_dt + timedelta(hours = rng.randint(2, 10))))
+
+    return SyntheticInput(lines, duties, personnel, absences)
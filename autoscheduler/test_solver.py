@@ -1,10 +1,44 @@
+import configparser
+import csv
+import math
+import multiprocessing
 import pytest
+import random
+import threading
 import unittest
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from ortools.sat.python import cp_model
-from main import parse_absence_requests
-from scheduler.models import AbsenceRequest, Duty, DutyQual, FlightOrg, Line, Person
-from scheduler.solver import ScheduleModel, ScheduleSolver, ShellSchedule, has_turn_time
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+import models as orm
+from repository import LOX_COL, CSVRepository, DatabaseRepository, parse_absence_requests, parse_timestamp
+from scheduler.models import AbsenceRequest, Duty, IntervalIndex, Line, Person, Qualification
+from scheduler.absences import AbsenceIndex
+from scheduler.callbacks import IntermediateSolution, SolutionSink, StopAtObjective
+from scheduler.compatibility import DayCompatibility
+from scheduler.variables import AssignmentVariables
+from benchmark import find_regressions, run_case
+from synthetic import generate
+from scheduler.parameters import SolverParameters
+from scheduler.portfolio import PortfolioConfig, PortfolioSolver
+from scheduler.recurrence import RecurringAbsence, overlaps
+from scheduler.rolling import RollingHorizonSolver
+from scheduler.decomposition import DecompositionSolver
+from scheduler.diagnosis import diagnose_infeasibility
+from scheduler.incremental import IncrementalSolver
+from scheduler.warmstart import JsonScheduleStore, PublishedSchedule
+from scheduler.cache import CachedModel, ModelCache
+import scheduler.portfolio as portfolio_module
+import scheduler.solver as solver_module
+from scheduler.solver import ScheduleModel, ScheduleSolver, ShellSchedule, build_model, duty_day_exceeded, evaluate_objective, has_turn_time
+
+def solve(solver: ScheduleSolver):
+    solution = solver.solve()
+
+    if (solution._status != cp_model.OPTIMAL):
+        return (solution._status, {})
+
+    return (solution._status, {c.id(): solution.assigned_to(c) for day in solution._schedule.days() for c in day.commitments()})
 
 def test_single_recurring_absence_request_when_parsed_returns_all_times_unavailable():
     ar_str = ["1160170043","1160044308","1160005566","Hatfield","Bennett","Absent","Meeting","OG Meeting","2/2/2021 10:30:00 AM","2/2/2021 12:00:00 PM","2/2/2021 10:30:00 AM","2/10/2021 12:00:00 PM","8"]
@@ -20,14 +54,14 @@ def test_single_recurring_absence_request_when_parsed_returns_all_times_unavaila
 
 def test_given_max_num_duties_single_qualified_person_when_solved_then_optimal_solution():
     lines = []
-    duty1 = Duty("Tinder 1 Controller", DutyQual.CONTROLLER, datetime(2022, 7, 29, 9, 0), datetime(2022, 7, 29, 10, 0))   
-    duty2 = Duty("Tinder 2 Controller", DutyQual.CONTROLLER, datetime(2022, 7, 29, 10, 0), datetime(2022, 7, 29, 11, 0))   
-    duty3 = Duty("Tinder 3 Controller", DutyQual.CONTROLLER, datetime(2022, 7, 29, 11, 0), datetime(2022, 7, 29, 12, 0))   
+    duty1 = Duty("Tinder 1 Controller", 'RSU Controller', datetime(2022, 7, 29, 9, 0), datetime(2022, 7, 29, 10, 0))   
+    duty2 = Duty("Tinder 2 Controller", 'RSU Controller', datetime(2022, 7, 29, 10, 0), datetime(2022, 7, 29, 11, 0))   
+    duty3 = Duty("Tinder 3 Controller", 'RSU Controller', datetime(2022, 7, 29, 11, 0), datetime(2022, 7, 29, 12, 0))   
     duties = [duty1, duty2, duty3]
     absences = []
 
     controller = Person(1, "LastName", "FirstName", 4)
-    controller.qual((DutyQual.CONTROLLER)
+    controller.qual(Qualification('Duty', 'RSU Controller'))
     personnel = [controller]
 
     shell = ShellSchedule(lines, duties)
@@ -37,22 +71,22 @@ def test_given_max_num_duties_single_qualified_person_when_solved_then_optimal_s
     model.add_constraint("Max Events")
 
     solver = ScheduleSolver(model, personnel, shell)
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
 
     assert status == cp_model.OPTIMAL
     assert solution == {duties[0].id(): personnel[0], duties[1].id(): personnel[0], duties[2].id(): personnel[0]}
 
 def test_given_greater_than_max_num_duties_single_qualified_person_when_solved_then_infeasible_solution():
     lines = []
-    duty1 = Duty("Tinder 1 Controller", DutyQual.CONTROLLER, datetime(2022, 7, 29, 9, 0), datetime(2022, 7, 29, 10, 0))   
-    duty2 = Duty("Tinder 2 Controller", DutyQual.CONTROLLER, datetime(2022, 7, 29, 10, 0), datetime(2022, 7, 29, 11, 0))   
-    duty3 = Duty("Tinder 3 Controller", DutyQual.CONTROLLER, datetime(2022, 7, 29, 11, 0), datetime(2022, 7, 29, 12, 0))   
-    duty4 = Duty("Tinder 4 Controller", DutyQual.CONTROLLER, datetime(2022, 7, 29, 12, 0), datetime(2022, 7, 29, 13, 0))   
+    duty1 = Duty("Tinder 1 Controller", 'RSU Controller', datetime(2022, 7, 29, 9, 0), datetime(2022, 7, 29, 10, 0))   
+    duty2 = Duty("Tinder 2 Controller", 'RSU Controller', datetime(2022, 7, 29, 10, 0), datetime(2022, 7, 29, 11, 0))   
+    duty3 = Duty("Tinder 3 Controller", 'RSU Controller', datetime(2022, 7, 29, 11, 0), datetime(2022, 7, 29, 12, 0))   
+    duty4 = Duty("Tinder 4 Controller", 'RSU Controller', datetime(2022, 7, 29, 12, 0), datetime(2022, 7, 29, 13, 0))   
     duties = [duty1, duty2, duty3, duty4]
     absences = []
 
     controller = Person(1, "LastName", "FirstName", 4)
-    controller.qual((DutyQual.CONTROLLER)
+    controller.qual(Qualification('Duty', 'RSU Controller'))
     personnel = [controller]
 
     shell = ShellSchedule(lines, duties)
@@ -60,17 +94,17 @@ def test_given_greater_than_max_num_duties_single_qualified_person_when_solved_t
     model.add_all_contraints()
 
     solver = ScheduleSolver(model, personnel, shell)
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
 
     assert status == cp_model.INFEASIBLE
     assert solution == {} 
 
 def test_given_single_duty_and_single_qualified_person_when_solved_then_duty_is_filled():
     lines = []
-    duties = [Duty("Tinder 1 Controller", DutyQual.CONTROLLER, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'), datetime.strptime('7/29/2022 10:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
+    duties = [Duty("Tinder 1 Controller", 'RSU Controller', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'), datetime.strptime('7/29/2022 10:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
 
     controller = Person(1, "LastName", "FirstName", 4)
-    controller.qual((DutyQual.CONTROLLER)
+    controller.qual(Qualification('Duty', 'RSU Controller'))
     personnel = [controller]
     absences = []
 
@@ -78,14 +112,14 @@ def test_given_single_duty_and_single_qualified_person_when_solved_then_duty_is_
     model = ScheduleModel(shell, personnel, absences)
     model.add_all_contraints()
     solver = ScheduleSolver(model, personnel, shell)
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
 
     assert status == cp_model.OPTIMAL
     assert solution == {duties[0].id(): personnel[0]}
 
 def test_given_single_duty_and_single_unqualified_person_when_solved_then_duty_is_unfilled():
     lines = []
-    duties = [Duty("Tinder 1 Controller", DutyQual.CONTROLLER, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'), datetime.strptime('7/29/2022 10:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
+    duties = [Duty("Tinder 1 Controller", 'RSU Controller', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'), datetime.strptime('7/29/2022 10:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
     personnel = [Person(1, "LastName", "FirstName", 4)]
     absences = []
 
@@ -93,13 +127,13 @@ def test_given_single_duty_and_single_unqualified_person_when_solved_then_duty_i
     model = ScheduleModel(shell, personnel, absences)
     model.add_all_contraints()
     solver = ScheduleSolver(model, personnel, shell)
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
 
     assert status == cp_model.INFEASIBLE
     assert solution == {}
 
 def test_given_single_line_and_single_person_when_solved_then_line_is_filled():
-    lines = [Line(1, FlightOrg.M, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
+    lines = [Line(1, 'M', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
     duties = []
     person = Person(1, "LastName", "FirstName", 4)
     personnel = [person]
@@ -111,13 +145,13 @@ def test_given_single_line_and_single_person_when_solved_then_line_is_filled():
     
     solver = ScheduleSolver(model, personnel, shell)
 
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
     
     assert status == cp_model.OPTIMAL
     assert solution == {lines[0].id(): personnel[0]}
 
 def test_given_single_pilot_with_turn_time_when_solved_then_optimal_solution():
-    lines = [Line(1, FlightOrg.M, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2,FlightOrg.M, datetime.strptime('7/29/2022 11:30:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
+    lines = [Line(1, 'M', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2,'M', datetime.strptime('7/29/2022 11:30:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
     duties = []
     person = Person(1, "LastName", "FirstName", 4)
     personnel = [person]
@@ -128,13 +162,13 @@ def test_given_single_pilot_with_turn_time_when_solved_then_optimal_solution():
     model.add_all_contraints()
 
     solver = ScheduleSolver(model, personnel, shell)
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
 
     assert status == cp_model.OPTIMAL
     assert solution == {lines[0].id(): personnel[0], lines[1].id(): personnel[0]}
 
 def test_given_multiple_pilots_with_turn_time_when_solved_then_optimal_solution():
-    lines = [Line(1, FlightOrg.M, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2, FlightOrg.O, datetime.strptime('7/29/2022 8:30:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(3, FlightOrg.P, datetime.strptime('7/29/2022 11:30:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(4, FlightOrg.P, datetime.strptime('7/29/2022 12:00:00 PM', '%m/%d/%Y %I:%M:%S %p'))]
+    lines = [Line(1, 'M', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2, 'O', datetime.strptime('7/29/2022 8:30:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(3, 'P', datetime.strptime('7/29/2022 11:30:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(4, 'P', datetime.strptime('7/29/2022 12:00:00 PM', '%m/%d/%Y %I:%M:%S %p'))]
     duties = []
     personnel = [Person(1, "LastName", "FirstName", 3), Person(2, "LastName", "FirstName", 4)]
     absences = []
@@ -144,13 +178,13 @@ def test_given_multiple_pilots_with_turn_time_when_solved_then_optimal_solution(
     model.add_all_contraints()
 
     solver = ScheduleSolver(model, personnel, shell)
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
 
     assert status == cp_model.OPTIMAL
     assert ((solution == {lines[0].id(): personnel[0], lines[1].id(): personnel[1], lines[2].id(): personnel[0], lines[3].id(): personnel[1]}) or (solution == {lines[0].id(): personnel[1], lines[1].id(): personnel[0], lines[2].id(): personnel[1], lines[3].id(): personnel[0]}))
 
 def test_given_single_pilot_without_turn_time_between_flights_when_solved_then_optimal_solution_with_empty_line():
-    lines = [Line(1, FlightOrg.M, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2, FlightOrg.O, datetime.strptime('7/29/2022 11:29:59 AM', '%m/%d/%Y %I:%M:%S %p'))] 
+    lines = [Line(1, 'M', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2, 'O', datetime.strptime('7/29/2022 11:29:59 AM', '%m/%d/%Y %I:%M:%S %p'))] 
     duties = []
     personnel = [Person(1, "LastName", "FirstName", 4)]
     absences = []
@@ -160,14 +194,14 @@ def test_given_single_pilot_without_turn_time_between_flights_when_solved_then_o
     model.add_constraint('Min Turn Time')
 
     solver = ScheduleSolver(model, personnel, shell)
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
 
     assert status == cp_model.OPTIMAL
     assert ((solution == {lines[0].id(): None, lines[1].id(): personnel[0]}) or (solution == {lines[0].id(): personnel[0], lines[1].id(): None}))
 
 def test_given_single_pilot_without_turn_time_between_flight_duty_when_solved_then_optimal_solution_with_empty_line():
-    lines = [Line(1, FlightOrg.M, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
-    duties = [Duty("Tinder 1 Controller", DutyQual.CONTROLLER, datetime.strptime('7/29/2022 10:14:59 AM', '%m/%d/%Y %I:%M:%S %p'), datetime.strptime('7/29/2022 1:00:00 PM', '%m/%d/%Y %I:%M:%S %p'))]
+    lines = [Line(1, 'M', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
+    duties = [Duty("Tinder 1 Controller", 'RSU Controller', datetime.strptime('7/29/2022 10:14:59 AM', '%m/%d/%Y %I:%M:%S %p'), datetime.strptime('7/29/2022 1:00:00 PM', '%m/%d/%Y %I:%M:%S %p'))]
     personnel = [Person(1, "LastName", "FirstName", 4)]
     absences = []
 
@@ -176,22 +210,763 @@ def test_given_single_pilot_without_turn_time_between_flight_duty_when_solved_th
     model.add_constraint('Min Turn Time')
 
     solver = ScheduleSolver(model, personnel, shell)
-    (status, solution) = solver.solve()
+    (status, solution) = solve(solver)
 
     assert status == cp_model.OPTIMAL
     assert ((solution == {lines[0].id(): None, duties[0].id(): personnel[0]}) or (solution == {lines[0].id(): personnel[0], duties[0].id(): None}))
 
 def test_given_commitments_with_time_delta_exceeded_when_run_returns_true():
-    lines = [Line(1, FlightOrg.M, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2, FlightOrg.O, datetime.strptime('7/29/2022 12:14:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
+    lines = [Line(1, 'M', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2, 'O', datetime.strptime('7/29/2022 12:14:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
 
     is_exceeded = has_turn_time(lines[0], lines[1], timedelta(hours = 4, minutes = 15))
 
     assert is_exceeded == True
 
 def test_given_commitments_with_time_delta_not_exceeded_when_run_returns_false():
-    lines = [Line(1, FlightOrg.M, datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2, FlightOrg.N, datetime.strptime('7/29/2022 12:15:00 PM', '%m/%d/%Y %I:%M:%S %p'))]
+    lines = [Line(1, 'M', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p')), Line(2, 'N', datetime.strptime('7/29/2022 12:15:00 PM', '%m/%d/%Y %I:%M:%S %p'))]
 
     is_exceeded = has_turn_time(lines[0], lines[1], timedelta(hours = 4, minutes = 15))
 
     assert is_exceeded == False
 
+def test_given_overlapping_commitments_when_indexed_then_maximal_overlap_groups_returned():
+    lines = [Line(1, 'M', datetime(2022, 7, 29, 8, 0)), Line(2, 'N', datetime(2022, 7, 29, 9, 0)), Line(3, 'O', datetime(2022, 7, 29, 11, 0)), Line(4, 'P', datetime(2022, 7, 29, 11, 30))]
+
+    groups = IntervalIndex(lines).overlap_groups()
+
+    assert groups == [[0, 1, 2], [1, 2, 3]]
+
+def test_given_back_to_back_commitments_when_indexed_then_no_overlap_groups_returned():
+    duties = [Duty("SOF 1", 'SOF', datetime(2022, 7, 29, 8, 0), datetime(2022, 7, 29, 12, 0)), Duty("SOF 2", 'SOF', datetime(2022, 7, 29, 12, 0), datetime(2022, 7, 29, 16, 0))]
+
+    groups = IntervalIndex(duties).overlap_groups()
+
+    assert groups == []
+
+def test_given_commitments_spanning_more_than_duty_day_when_precomputed_then_pair_is_incompatible():
+    duties = [Duty("OPS SUP 1", 'Operations Supervisor', datetime(2022, 7, 29, 6, 0), datetime(2022, 7, 29, 10, 0)), Duty("OPS SUP 2", 'Operations Supervisor', datetime(2022, 7, 29, 14, 0), datetime(2022, 7, 29, 18, 1))]
+
+    compatibility = DayCompatibility(duties)
+
+    assert compatibility.duty_day_exceeded.tolist() == [[False, True], [True, False]]
+    assert compatibility.forbidden_groups(compatibility.duty_day_exceeded) == [(0, [1])]
+
+def test_given_commitments_starting_too_far_apart_when_precomputed_then_later_commitments_forbidden():
+    lines = [Line(1, 'M', datetime(2022, 7, 29, 8, 0)), Line(2, 'N', datetime(2022, 7, 29, 12, 15)), Line(3, 'O', datetime(2022, 7, 29, 12, 16))]
+
+    compatibility = DayCompatibility(lines)
+
+    assert compatibility.forbidden_groups(compatibility.turn_time_exceeded) == [(0, [2])]
+
+def test_given_random_commitments_when_precomputed_then_matrices_match_pairwise_checks():
+    rng = random.Random(7)
+    base = datetime(2022, 7, 29, 6, 0)
+    duties = []
+    for i in range(12):
+        start = base + timedelta(minutes = 15 * rng.randint(0, 48))
+        duties.append(Duty("Duty %i" % i, 'SOF', start, start + timedelta(minutes = 15 * rng.randint(1, 52))))
+
+    compatibility = DayCompatibility(duties)
+
+    for (i, c1) in enumerate(duties):
+        for (j, c2) in enumerate(duties):
+            assert compatibility.duty_day_exceeded[i, j] == duty_day_exceeded(c1, c2)
+            assert compatibility.turn_time_exceeded[i, j] == has_turn_time(c1, c2, timedelta(hours = 4, minutes = 15))
+
+def test_given_multi_day_absence_when_indexed_then_found_on_every_spanned_date_for_that_person_only():
+    absence = AbsenceRequest(1, datetime(2022, 7, 29, 16, 0), datetime(2022, 7, 31, 9, 0))
+
+    index = AbsenceIndex([absence])
+
+    assert index.absences_on(1, datetime(2022, 7, 30).date()) == [absence]
+    assert index.absences_on(2, datetime(2022, 7, 30).date()) == []
+    assert index.is_available(1, datetime(2022, 7, 31, 9, 0), datetime(2022, 7, 31, 12, 0)) == True
+    assert index.is_available(1, datetime(2022, 7, 29, 8, 0), datetime(2022, 7, 29, 16, 30)) == False
+
+def test_given_single_pilot_absent_during_line_when_solved_then_line_is_unfilled():
+    lines = [Line(1, 'M', datetime.strptime('7/29/2022 8:00:00 AM', '%m/%d/%Y %I:%M:%S %p'))]
+    duties = []
+    personnel = [Person(1, "LastName", "FirstName", 4)]
+    absences = [AbsenceRequest(1, datetime(2022, 7, 29, 9, 0), datetime(2022, 7, 29, 10, 0))]
+
+    shell = ShellSchedule(lines, duties)
+    model = ScheduleModel(shell, personnel, absences)
+    model.add_constraint('Absence Request')
+
+    solver = ScheduleSolver(model, personnel, shell)
+    (status, solution) = solve(solver)
+
+    assert status == cp_model.OPTIMAL
+    assert solution == {lines[0].id(): None}
+
+def test_given_unqualified_and_non_pit_personnel_when_modeled_then_no_variables_created_for_them():
+    lines = [Line(1, 'X', datetime(2022, 7, 29, 8, 0))]
+    duties = [Duty("SOF 1", 'SOF', datetime(2022, 7, 29, 7, 0), datetime(2022, 7, 29, 12, 0))]
+    sof = Person(1, "LastName", "FirstName", 4)
+    sof.qual(Qualification('Duty', 'SOF'))
+    pit_ip = Person(2, "LastName", "FirstName", 4)
+    pit_ip.qual(Qualification('Flight', 'PIT IP'))
+    personnel = [sof, pit_ip]
+
+    shell = ShellSchedule(lines, duties)
+    model = ScheduleModel(shell, personnel, [])
+    assert [person for (person, _) in model._candidates(shell.commitments().index(duties[0]))] == [sof]
+    assert [person for (person, _) in model._candidates(shell.commitments().index(lines[0]))] == [pit_ip]
+
+def test_given_sparse_assignment_variables_when_sliced_then_only_existing_pairs_returned():
+    model = cp_model.CpModel()
+    variables = AssignmentVariables(3, 2)
+    x00, x10, x21 = model.NewBoolVar('x00'), model.NewBoolVar('x10'), model.NewBoolVar('x21')
+    variables.set(0, 0, x00)
+    variables.set(1, 0, x10)
+    variables.set(2, 1, x21)
+
+    assert variables.row(0) == [(0, x00)]
+    assert variables.column(0) == [x00, x10]
+    assert variables.column(0, 1, 3) == [x10]
+    assert variables.select([0, 2], 1) == [x21]
+    assert len(variables) == 3
+
+@pytest.mark.parametrize('overlap_mode', ['pairwise', 'interval'])
+def test_given_overlapping_lines_and_duty_when_solved_in_either_overlap_mode_then_no_person_double_booked(overlap_mode):
+    lines = [Line(1, 'M', datetime(2022, 7, 29, 8, 0)), Line(2, 'O', datetime(2022, 7, 29, 9, 0)), Line(3, 'O', datetime(2022, 7, 29, 11, 30))]
+    duties = [Duty("SOF 1", 'SOF', datetime(2022, 7, 29, 10, 0), datetime(2022, 7, 29, 11, 0))]
+    sof = Person(1, "LastName", "FirstName", 4)
+    sof.qual(Qualification('Duty', 'SOF'))
+    personnel = [sof, Person(2, "LastName", "FirstName", 4)]
+
+    shell = ShellSchedule(lines, duties)
+    model = ScheduleModel(shell, personnel, [], overlap_mode = overlap_mode)
+    model.add_constraint('Fill Duties')
+    model.add_constraint('Fill Flights')
+    model.add_constraint('Min Turn Time')
+
+    solver = ScheduleSolver(model, personnel, shell)
+    (status, solution) = solve(solver)
+
+    assert status == cp_model.OPTIMAL
+    assert solution[duties[0].id()] == sof
+    assert sum(1 for p in solution.values() if p != None) == 3
+    for c1 in shell.commitments():
+        for c2 in shell.commitments():
+            if (c1 is not c2 and c1.is_conflict(c2) and solution[c1.id()] != None):
+                assert solution[c1.id()] != solution[c2.id()]
+
+def test_given_unknown_overlap_mode_when_modeled_then_value_error():
+    with pytest.raises(ValueError):
+        ScheduleModel(ShellSchedule([], []), [], [], overlap_mode = 'bogus')
+
+def test_given_instrumented_model_when_built_then_stats_recorded_per_stage_without_changing_solution():
+    lines = [Line(1, 'M', datetime(2022, 7, 29, 8, 0)), Line(2, 'O', datetime(2022, 7, 29, 8, 30))]
+    duties = [Duty("SOF 1", 'SOF', datetime(2022, 7, 29, 12, 0), datetime(2022, 7, 29, 16, 0))]
+    sof = Person(1, "LastName", "FirstName", 4)
+    sof.qual(Qualification('Duty', 'SOF'))
+    personnel = [sof, Person(2, "LastName", "FirstName", 4)]
+
+    shell = ShellSchedule(lines, duties)
+    model = ScheduleModel(shell, personnel, [], instrument = True)
+    model.add_all_contraints()
+
+    stats = model.stats()
+    assert [s.name for s in stats.stages()] == ['_add_variables', '_add_objective'] + list(ScheduleModel.constraints.keys())
+    assert stats.stage('_add_variables').variables_added == 5
+    assert stats.stage('Fill Duties').constraints_added == 1
+    assert stats.stage('Fill Duties').literals_referenced == 1
+
+    solver = ScheduleSolver(model, personnel, shell)
+    (status, solution) = solve(solver)
+
+    assert status == cp_model.OPTIMAL
+    assert solution[duties[0].id()] == sof
+
+def test_given_same_seed_when_generated_then_identical_synthetic_inputs():
+    first = generate(seed = 3, num_days = 2, lines_per_day = 5, num_personnel = 10, recurring_absence_density = 0.5)
+    second = generate(seed = 3, num_days = 2, lines_per_day = 5, num_personnel = 10, recurring_absence_density = 0.5)
+
+    assert [l.id() for l in first.lines] == [l.id() for l in second.lines]
+    assert [d.id() for d in first.duties] == [d.id() for d in second.duties]
+    assert [(p.id(), p._ausm_tier, p._assigned_org, p._quals) for p in first.personnel] == [(p.id(), p._ausm_tier, p._assigned_org, p._quals) for p in second.personnel]
+    assert first.absences == second.absences
+    assert len(first.lines) == 10
+
+def test_given_small_synthetic_case_when_benchmarked_then_sizes_and_timings_reported():
+    result = run_case(1, 4, 8, seed = 0, max_time = 5.0, overlap_mode = 'pairwise', recurring_absence_density = 0.1)
+
+    assert result['num_commitments'] == 4 + 13
+    assert result['num_variables'] > 0
+    assert result['build_time_s'] >= 0.0
+    assert find_regressions([result], [dict(result, build_time_s = result['build_time_s'] / 10.0)], 1.5) != []
+
+def test_given_solver_config_and_overrides_when_solved_then_parameters_and_status_recorded():
+    config = configparser.ConfigParser()
+    config.read_string("[SOLVER]\nnum_workers=2\nmax_time_s=30\nrelative_gap=0.05\nabsolute_gap=\nrandom_seed=7\nlog_search=yes\n")
+    params = SolverParameters.from_config(config['SOLVER']).override(max_time_s = 5.0, random_seed = None)
+
+    lines = [Line(1, 'M', datetime(2022, 7, 29, 8, 0))]
+    personnel = [Person(1, "LastName", "FirstName", 4)]
+    shell = ShellSchedule(lines, [])
+    model = ScheduleModel(shell, personnel, [])
+    model.add_all_contraints()
+
+    solution = ScheduleSolver(model, personnel, shell, params).solve()
+
+    assert solution._parameters.to_dict() == {'num_workers': 2, 'max_time_s': 5.0, 'relative_gap': 0.05, 'absolute_gap': None, 'random_seed': 7, 'log_search': True, 'search_branching': None, 'linearization_level': None}
+    assert solution.has_schedule()
+    assert solution.status_name() == 'OPTIMAL'
+    assert solution._objective == pytest.approx(solution._best_bound)
+    assert len(solution._log) > 0
+
+def test_given_unknown_solver_override_when_applied_then_value_error():
+    with pytest.raises(ValueError):
+        SolverParameters().override(workers = 4)
+
+class RecordingSink(SolutionSink):
+
+    def __init__(self):
+        self.solutions = []
+
+    def on_solution(self, solution: IntermediateSolution) -> bool:
+        self.solutions.append(solution)
+        return False
+
+def test_given_sinks_when_solved_then_improving_solutions_streamed_with_assignments():
+    inputs = generate(seed = 1, num_days = 1, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    sink = RecordingSink()
+
+    solution = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1), sinks = [sink]).solve()
+
+    assert solution.has_schedule()
+    assert solution._num_solutions == len(sink.solutions) > 0
+    assert [s.objective for s in sink.solutions] == sorted(s.objective for s in sink.solutions)
+    assert sink.solutions[-1].assignments == solution.assignments()
+
+def test_given_stop_at_objective_sink_when_first_solution_good_enough_then_search_stops_early():
+    inputs = generate(seed = 1, num_days = 1, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    sink = RecordingSink()
+
+    solution = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1), sinks = [sink, StopAtObjective(-1.0)]).solve()
+
+    assert solution.has_schedule()
+    assert len(sink.solutions) == 1
+
+def test_given_published_schedule_when_stored_then_loaded_for_same_dates_only(tmp_path):
+    store = JsonScheduleStore(str(tmp_path))
+    published = PublishedSchedule({'107/29/2022': 3, 'SOF 107/29/2022': None}, 12.5, {'107/29/2022': (datetime(2022, 7, 29, 6, 45), datetime(2022, 7, 29, 10, 15))})
+
+    store.save(datetime(2022, 7, 29).date(), datetime(2022, 7, 29).date(), published)
+
+    loaded = store.load(datetime(2022, 7, 29).date(), datetime(2022, 7, 29).date())
+    assert loaded.assignments == published.assignments
+    assert loaded.wall_time == 12.5
+    assert loaded.times == published.times
+    assert store.load(datetime(2022, 7, 29).date(), datetime(2022, 7, 30).date()) == None
+
+def test_given_published_schedule_and_new_absence_when_warm_started_then_stale_hints_dropped():
+    inputs = generate(seed = 1, num_days = 1, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    first = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+    published = PublishedSchedule.from_solution(first)
+
+    # the person on the first assigned commitment is now absent all day
+    absent = next(first.assigned_to(c) for c in shell.commitments() if first.assigned_to(c) != None)
+    day = shell.days()[0].date()
+    absences = inputs.absences + [AbsenceRequest(absent.id(), datetime(day.year, day.month, day.day), datetime(day.year, day.month, day.day, 23, 59))]
+    num_stale = sum(1 for c in shell.commitments() if first.assigned_to(c) == absent)
+
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, absences)
+    model.add_all_contraints()
+    solver = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1))
+    report = solver.warm_start(published)
+    solution = solver.solve()
+
+    assert report.hints_total == len(shell.commitments())
+    assert report.hints_survived == report.hints_total - num_stale
+    assert solution.has_schedule()
+    assert solution._warm_start.wall_time == solution._wall_time
+    assert all(solution.assigned_to(c) != absent for c in shell.commitments())
+
+def test_given_new_absence_on_one_day_when_solved_incrementally_then_only_that_day_reoptimized():
+    inputs = generate(seed = 1, num_days = 3, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    first = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+    published = PublishedSchedule.from_solution(first)
+
+    day = shell.days()[1]
+    absent = next(first.assigned_to(c) for c in day.commitments() if first.assigned_to(c) != None)
+    midnight = datetime(day.date().year, day.date().month, day.date().day)
+    absences = inputs.absences + [AbsenceRequest(absent.id(), midnight, midnight + timedelta(hours = 23))]
+
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    solver = IncrementalSolver(shell, inputs.personnel, absences, published, parameters = SolverParameters(num_workers = 1))
+    solution = solver.solve()
+
+    assert solver.affected_dates() == {day.date()}
+    assert len(solver.model().variables()) < len(model.variables())
+    assert solution.has_schedule()
+    assert solution._objective == pytest.approx(evaluate_objective(shell, inputs.personnel, solution.assignments()))
+    for c in shell.commitments():
+        person = solution.assigned_to(c)
+        if (c.start_dt().date() != day.date()):
+            assert published.assignments[c.id()] == (person.id() if person != None else None)
+        else:
+            assert person != absent
+
+def test_given_qualification_removed_when_solved_incrementally_then_its_days_reoptimized_without_that_person():
+    inputs = generate(seed = 1, num_days = 3, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    first = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+    published = PublishedSchedule.from_solution(first)
+
+    day = shell.days()[2]
+    duty = next(c for c in day.commitments() if isinstance(c, Duty) and first.assigned_to(c) != None)
+    unqualified = first.assigned_to(duty)
+    unqualified._quals['Duty'].discard(duty.type)
+    stale = set(c.start_dt().date() for c in shell.commitments() if isinstance(c, Duty) and c.type == duty.type and first.assigned_to(c) == unqualified)
+
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    solver = IncrementalSolver(shell, inputs.personnel, inputs.absences, published, parameters = SolverParameters(num_workers = 1))
+    solution = solver.solve()
+
+    assert day.date() in stale
+    assert solver.affected_dates() == stale
+    assert solution.has_schedule()
+    assert all(solution.assigned_to(c) != unqualified for c in shell.commitments() if isinstance(c, Duty) and c.type == duty.type)
+
+def test_given_line_moved_within_its_day_when_solved_incrementally_then_that_day_reoptimized():
+    inputs = generate(seed = 1, num_days = 3, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    first = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+    published = PublishedSchedule.from_solution(first)
+
+    # the day's last line takes off with its first, keeping its number and date and so its id
+    day = shell.days()[1]
+    day_lines = sorted((c for c in day.commitments() if isinstance(c, Line)), key = lambda c: c.time_takeoff)
+    (earliest, latest) = (day_lines[0], day_lines[-1])
+    moved = Line(latest.number, latest.flight_org, earliest.time_takeoff)
+    lines = [moved if l is latest else l for l in inputs.lines]
+
+    shell = ShellSchedule(lines, inputs.duties)
+    solver = IncrementalSolver(shell, inputs.personnel, inputs.absences, published, parameters = SolverParameters(num_workers = 1))
+    solution = solver.solve()
+
+    assert moved.id() == latest.id()
+    assert solver.affected_dates() == {day.date()}
+    assert solution.has_schedule()
+    assert solution.assigned_to(moved) == None or solution.assigned_to(moved) != solution.assigned_to(earliest)
+
+def test_given_solved_model_when_objective_evaluated_then_matches_solver_objective():
+    inputs = generate(seed = 1, num_days = 2, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    solution = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+
+    assert evaluate_objective(shell, inputs.personnel, solution.assignments()) == pytest.approx(solution._objective)
+
+def test_given_changed_objective_weights_when_objective_evaluated_then_matches_solver_objective(monkeypatch):
+    monkeypatch.setattr(solver_module, 'OBJECTIVE_WEIGHTS', {'Filled Lines': 40, 'Org Alignment': 30, 'AUSM': 20, 'Duty Fairness': 10})
+    inputs = generate(seed = 1, num_days = 2, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    solution = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+
+    assert evaluate_objective(shell, inputs.personnel, solution.assignments()) == pytest.approx(solution._objective)
+
+def test_given_multi_day_shell_when_decomposed_then_feasible_schedule_no_better_than_monolithic():
+    inputs = generate(seed = 1, num_days = 2, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    monolithic = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    decomposition = DecompositionSolver(shell, inputs.personnel, inputs.absences, max_rounds = 3, max_workers = 2)
+    solution = decomposition.solve()
+
+    assert solution.has_schedule()
+    assert 0 < decomposition.report().rounds <= 3
+    assert solution._objective == pytest.approx(evaluate_objective(shell, inputs.personnel, solution.assignments()))
+    assert solution._objective <= monolithic._objective + 1e-6
+
+def test_given_time_limit_when_decomposed_then_it_bounds_all_rounds_together():
+    inputs = generate(seed = 1, num_days = 3, lines_per_day = 16, num_personnel = 50)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+
+    decomposition = DecompositionSolver(shell, inputs.personnel, inputs.absences, parameters = SolverParameters(num_workers = 2, max_time_s = 2.0), max_rounds = 5, max_workers = 2)
+    solution = decomposition.solve()
+
+    assert solution.has_schedule()
+    assert decomposition.report().wall_time < 2.0 + 1.0
+    assert solution._objective == pytest.approx(evaluate_objective(shell, inputs.personnel, solution.assignments()))
+
+def test_given_four_day_shell_when_solved_with_rolling_horizon_then_windows_bounded_and_every_day_committed():
+    inputs = generate(seed = 1, num_days = 4, lines_per_day = 6, num_personnel = 40)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    two_day_model = ScheduleModel(shell.subset({shell.days()[0].date(), shell.days()[1].date()}), inputs.personnel, inputs.absences)
+
+    rolling = RollingHorizonSolver(shell, inputs.personnel, inputs.absences, window_days = 2, commit_days = 1, parameters = SolverParameters(num_workers = 1))
+    solution = rolling.solve()
+
+    assert solution.has_schedule()
+    assert [w.committed_through for w in rolling.windows()] == [shell.days()[0].date(), shell.days()[1].date(), shell.days()[3].date()]
+    assert all(w.num_variables <= 2 * len(two_day_model.variables()) for w in rolling.windows())
+    assert solution._objective == pytest.approx(evaluate_objective(shell, inputs.personnel, solution.assignments()))
+    assert all(solution.assigned_to(commit) != None for commit in shell.commitments() if isinstance(commit, Duty))
+
+def test_given_day_with_only_duties_when_solved_with_rolling_horizon_then_windows_follow_date_order():
+    inputs = generate(seed = 1, num_days = 3, lines_per_day = 6, num_personnel = 40)
+    dates = sorted(set(l.start_dt().date() for l in inputs.lines))
+    lines = [l for l in inputs.lines if l.start_dt().date() != dates[1]]
+    shell = ShellSchedule(lines, inputs.duties)
+
+    rolling = RollingHorizonSolver(shell, inputs.personnel, inputs.absences, window_days = 2, commit_days = 1, parameters = SolverParameters(num_workers = 1))
+    solution = rolling.solve()
+
+    assert [day.date() for day in shell.days()] == dates
+    assert [(w.start, w.end, w.committed_through) for w in rolling.windows()] == [(dates[0], dates[1], dates[0]), (dates[1], dates[2], dates[2])]
+    assert solution.has_schedule()
+
+def test_given_integer_objective_mode_when_solved_then_same_objective_as_weighted():
+    inputs = generate(seed = 1, num_days = 2, lines_per_day = 6, num_personnel = 30)
+    objectives = []
+
+    for objective_mode in ('weighted', 'integer'):
+        shell = ShellSchedule(inputs.lines, inputs.duties)
+        model = ScheduleModel(shell, inputs.personnel, inputs.absences, objective_mode = objective_mode)
+        model.add_all_contraints()
+        solution = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+
+        assert solution.status_name() == 'OPTIMAL'
+        objectives.append(solution._objective)
+
+    assert objectives[1] == pytest.approx(objectives[0])
+    assert model.objective_scale() > 1
+
+def test_given_lexicographic_objective_mode_when_solved_then_each_phase_reported_and_lines_maximized_first():
+    inputs = generate(seed = 1, num_days = 2, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences, objective_mode = 'lexicographic')
+    model.add_all_contraints()
+    num_constraints = len(model._handle().Proto().constraints)
+
+    solution = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+
+    assert [phase.name for phase in solution._phases] == ['Filled Lines', 'Org Alignment', 'AUSM', 'Duty Fairness']
+    assert all(phase.status == cp_model.OPTIMAL for phase in solution._phases)
+    assert solution._phases[0].value == sum(1 for c in shell.commitments() if isinstance(c, Line) and solution.assigned_to(c) != None)
+    assert len(model._handle().Proto().constraints) == num_constraints
+
+def test_given_lexicographic_objective_mode_with_time_limit_when_solved_then_phases_share_it_and_sinks_see_phase():
+    inputs = generate(seed = 2, num_days = 3, lines_per_day = 12, num_personnel = 40)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences, objective_mode = 'lexicographic')
+    model.add_all_contraints()
+    sink = RecordingSink()
+
+    solution = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1, max_time_s = 1.0), sinks = [sink]).solve()
+
+    assert solution.has_schedule()
+    assert solution._status == (cp_model.OPTIMAL if all(phase.status == cp_model.OPTIMAL for phase in solution._phases) and len(solution._phases) == 4 else cp_model.FEASIBLE)
+    assert sum(phase.wall_time for phase in solution._phases) <= 1.0 + 0.25
+    assert len(sink.solutions) > 0
+    assert set(s.phase for s in sink.solutions) <= set(phase.name for phase in solution._phases)
+
+def test_given_unknown_objective_mode_when_model_built_then_value_error():
+    with pytest.raises(ValueError):
+        ScheduleModel(ShellSchedule([], []), [], [], objective_mode = 'fastest')
+
+def test_given_interchangeable_personnel_when_symmetry_breaking_then_classes_ordered_by_commitments_and_objective_unchanged():
+    takeoff = datetime(2022, 7, 29, 8, 0)
+    lines = [Line(n, 'M', takeoff + timedelta(hours = 2 * n)) for n in range(1, 5)]
+    personnel = [Person(n, "LastName", "FirstName", 4) for n in range(1, 5)]
+    personnel[3].assign_to('M')
+    objectives = []
+
+    for symmetry_breaking in (False, True):
+        shell = ShellSchedule(lines, [])
+        model = ScheduleModel(shell, personnel, [AbsenceRequest(3, takeoff, takeoff + timedelta(hours = 1))], symmetry_breaking = symmetry_breaking)
+        model.add_all_contraints()
+        solution = ScheduleSolver(model, personnel, shell, SolverParameters(num_workers = 1)).solve()
+        objectives.append(solution._objective)
+
+    counts = [sum(1 for c in shell.commitments() if solution.assigned_to(c) == person) for person in personnel]
+    assert model.equivalence_classes() == [[0, 1]]
+    assert counts[0] >= counts[1]
+    assert objectives[1] == pytest.approx(objectives[0])
+
+def test_given_cached_model_when_rebuilt_with_same_inputs_then_loaded_and_solves_to_same_objective(tmp_path):
+    inputs = generate(seed = 1, num_days = 2, lines_per_day = 6, num_personnel = 30)
+    cache = ModelCache(str(tmp_path))
+    results = []
+
+    for _ in range(2):
+        shell = ShellSchedule(inputs.lines, inputs.duties)
+        model = build_model(shell, inputs.personnel, inputs.absences, cache = cache, instrument = True)
+        solution = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+        results.append(([stage.name for stage in model.stats().stages()], len(model._handle().Proto().constraints), solution._objective))
+
+    assert results[1][0] == ['_restore']
+    assert results[1][1] == results[0][1]
+    assert results[1][2] == pytest.approx(results[0][2])
+
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = build_model(shell, inputs.personnel, inputs.absences, cache = cache, instrument = True, objective_mode = 'integer')
+    assert '_restore' not in [stage.name for stage in model.stats().stages()]
+
+def test_given_full_model_cache_when_stored_then_least_recently_used_entry_evicted(tmp_path):
+    cache = ModelCache(str(tmp_path), max_bytes = 5000)
+
+    for key in ('a', 'b', 'c'):
+        # random text so each entry stays around 2kB compressed
+        cache.store(key, CachedModel(random.Random(key).randbytes(2000).hex(), {}))
+        if (key == 'b'):
+            assert cache.load('a') != None
+
+    assert cache.load('b') == None
+    assert cache.load('c') != None
+    assert cache.size() <= 5000
+
+def test_given_one_shell_when_solved_twice_then_each_solution_keeps_its_own_read_only_assignments():
+    inputs = generate(seed = 1, num_days = 1, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    solutions = []
+
+    for absences in (inputs.absences, []):
+        model = ScheduleModel(shell, inputs.personnel, absences)
+        model.add_all_contraints()
+        solutions.append(ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve())
+
+    first = solutions[0].assignments()
+    assert evaluate_objective(shell, inputs.personnel, first) == pytest.approx(solutions[0]._objective)
+    assert all(solutions[0].assigned_to(c) == (inputs.personnel[first[i]] if i in first else None) for (i, c) in enumerate(shell.commitments()))
+    with pytest.raises(ValueError):
+        first._person_idxs[0] = 0
+
+def test_given_portfolio_of_configurations_when_raced_then_winner_reported_and_matches_monolithic_optimum():
+    inputs = generate(seed = 1, num_days = 2, lines_per_day = 6, num_personnel = 30)
+    shell = ShellSchedule(inputs.lines, inputs.duties)
+    model = ScheduleModel(shell, inputs.personnel, inputs.absences)
+    model.add_all_contraints()
+    monolithic = ScheduleSolver(model, inputs.personnel, shell, SolverParameters(num_workers = 1)).solve()
+
+    configs = [PortfolioConfig('default'), PortfolioConfig('fixed-search', parameters = {'search_branching': 'FIXED_SEARCH'}), PortfolioConfig('integer-objective', model_options = {'objective_mode': 'integer'})]
+    portfolio = PortfolioSolver(shell, inputs.personnel, inputs.absences, configs, SolverParameters(num_workers = 1, max_time_s = 60.0))
+    solution = portfolio.solve()
+
+    assert solution._status == cp_model.OPTIMAL
+    assert solution._objective == pytest.approx(monolithic._objective)
+    assert portfolio.report().winner in [config.name for config in configs]
+    assert len(portfolio.report().results) == len(configs)
+    assert evaluate_objective(shell, inputs.personnel, solution.assignments()) == pytest.approx(solution._objective)
+
+def test_given_race_stopped_while_configuration_builds_when_run_then_its_solve_stops_too(monkeypatch):
+    inputs = generate(seed = 1, num_days = 7, lines_per_day = 10, num_personnel = 50)
+    stop = threading.Event()
+    monkeypatch.setattr(portfolio_module, '_stop', stop)
+    monkeypatch.setattr(portfolio_module, '_incumbent', multiprocessing.Value('d', -math.inf))
+
+    # set before the search starts, which a single stop request would miss
+    threading.Timer(0.001, stop.set).start()
+    result = portfolio_module._run_config(PortfolioConfig('default'), inputs.lines, inputs.duties, inputs.personnel, inputs.absences, SolverParameters(num_workers = 1, max_time_s = 60.0))
+
+    assert result.status != cp_model.OPTIMAL
+    assert result.wall_time < 2.0
+
+def test_given_two_overlapping_duties_and_one_controller_when_diagnosed_then_both_duties_and_the_overlap_reported():
+    duties = [Duty("Tinder 1 Controller", 'RSU Controller', datetime(2022, 7, 29, 9, 0), datetime(2022, 7, 29, 11, 0)),
+              Duty("Tinder 2 Controller", 'RSU Controller', datetime(2022, 7, 29, 10, 0), datetime(2022, 7, 29, 12, 0))]
+    controller = Person(1, "LastName", "FirstName", 4)
+    controller.qual(Qualification('Duty', 'RSU Controller'))
+    personnel = [controller, Person(2, "LastName", "FirstName", 4)]
+
+    shell = ShellSchedule([], duties)
+    model = ScheduleModel(shell, personnel, [])
+    model.add_all_contraints()
+    assert ScheduleSolver(model, personnel, shell).solve()._status == cp_model.INFEASIBLE
+
+    report = diagnose_infeasibility(shell, personnel, [])
+
+    assert report.status == cp_model.INFEASIBLE
+    assert set(str(conflict) for conflict in report.conflicts) == {
+        'Duty Qualified Personnel (Tinder 1 Controller07/29/2022; LastName, FirstName)',
+        'Duty Qualified Personnel (Tinder 2 Controller07/29/2022; LastName, FirstName)',
+        'Min Turn Time (Fri, 7/29/2022; LastName, FirstName)'
+    }
+
+def test_given_duty_whose_only_qualified_person_is_absent_when_diagnosed_then_absence_reported():
+    duty = Duty("SOF 1", 'SOF', datetime(2022, 7, 29, 9, 0), datetime(2022, 7, 29, 13, 0))
+    sof = Person(1, "LastName", "FirstName", 4)
+    sof.qual(Qualification('Duty', 'SOF'))
+    personnel = [sof, Person(2, "Other", "Person", 4)]
+    absences = [AbsenceRequest(1, datetime(2022, 7, 29, 8, 0), datetime(2022, 7, 29, 17, 0))]
+
+    report = diagnose_infeasibility(ShellSchedule([], [duty]), personnel, absences)
+
+    assert report.status == cp_model.INFEASIBLE
+    assert report.families() == ['Absence Request', 'Duty Qualified Personnel']
+    assert 'Absence Request (SOF 107/29/2022; LastName, FirstName)' in [str(conflict) for conflict in report.conflicts]
+
+def test_given_feasible_shell_when_diagnosed_then_no_conflicts():
+    inputs = generate(seed = 1, num_days = 1, lines_per_day = 6, num_personnel = 30)
+    report = diagnose_infeasibility(ShellSchedule(inputs.lines, inputs.duties), inputs.personnel, inputs.absences)
+
+    assert report.status == cp_model.OPTIMAL
+    assert report.conflicts == []
+
+def sqlite_session_factory(rows: list):
+    engine = create_engine('sqlite://')
+    orm.Base.metadata.create_all(engine)
+    session_factory = sessionmaker(engine)
+
+    with session_factory() as session:
+        session.add_all(rows)
+        session.commit()
+
+    return session_factory
+
+def test_given_shell_and_absences_across_weeks_when_loaded_for_window_then_only_window_returned():
+    org = orm.Organization(name = 'A')
+    duty = orm.Duty(name = 'SOF 1', duty_type = orm.DutyType(name = 'SOF'))
+    rows = [orm.ShellLine(num = n, org = org, start_date_time = datetime(2023, 1, d, 8, 0), go = 1) for (n, d) in ((1, 1), (2, 9), (3, 10), (4, 17))]
+    rows += [orm.ShellDuty(duty = duty, start_date_time = datetime(2023, 1, d, 7, 0), end_date_time = datetime(2023, 1, d, 15, 0)) for d in (2, 9, 16)]
+    rows += [
+        # ends before, overlaps and starts after the window
+        orm.AbsenceRequestDto(person_id = 1, start_date_time = datetime(2023, 1, 2, 8, 0), end_date_time = datetime(2023, 1, 3, 8, 0)),
+        orm.AbsenceRequestDto(person_id = 2, start_date_time = datetime(2023, 1, 8, 20, 0), end_date_time = datetime(2023, 1, 9, 8, 0)),
+        orm.AbsenceRequestDto(person_id = 3, start_date_time = datetime(2023, 1, 16, 8, 0), end_date_time = datetime(2023, 1, 16, 9, 0)),
+        # every Tuesday (isoweekday 2) from the first week through the window, and one whose occurrences ended the week before
+        orm.AbsenceRequestDto(person_id = 4, start_date_time = datetime(2023, 1, 2, 8, 0), end_date_time = datetime(2023, 1, 2, 9, 0), occur_end_date_time = datetime(2023, 1, 31, 8, 0), day_of_week_ptn = 1 << 2),
+        orm.AbsenceRequestDto(person_id = 5, start_date_time = datetime(2023, 1, 2, 8, 0), end_date_time = datetime(2023, 1, 2, 9, 0), occur_end_date_time = datetime(2023, 1, 6, 8, 0), day_of_week_ptn = 1 << 2)
+    ]
+    repo = DatabaseRepository(sqlite_session_factory(rows))
+
+    (start, end) = (date(2023, 1, 9), date(2023, 1, 15))
+
+    assert [line.number for line in repo.get_lines(start, end)] == [2, 3]
+    assert [duty.start_dt() for duty in repo.get_duties(start, end)] == [datetime(2023, 1, 9, 7, 0)]
+    assert sorted((ar.person_id(), ar.start_dt()) for ar in repo.get_absences(start, end)) == [(2, datetime(2023, 1, 8, 20, 0)), (4, datetime(2023, 1, 10, 8, 0))]
+
+def count_queries(session_factory) -> list[str]:
+    statements = []
+    event.listen(session_factory.kw['bind'], 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+def test_given_many_personnel_and_shell_rows_when_loaded_then_query_count_does_not_grow_with_rows():
+    orgs = [orm.Organization(name = name) for name in ('A', 'B', 'C')]
+    types = [orm.QualificationType(name = name) for name in ('Duty', 'Flight')]
+    quals = [orm.Qualification(type = types[0], name = 'SOF'), orm.Qualification(type = types[0], name = 'RSU Controller'), orm.Qualification(type = types[1], name = 'PIT IP')]
+    duties = [orm.Duty(name = 'SOF %i' % n, duty_type = orm.DutyType(name = 'SOF')) for n in range(3)]
+
+    rows = [orm.PersonLine(person = orm.Person(last_name = 'Last%i' % n, first_name = 'First'), ausm_tier = n % 5, assigned_org = [orgs[n % 3]], quals = quals[n % 3:]) for n in range(60)]
+    rows += [orm.ShellLine(num = n, org = orgs[n % 3], start_date_time = datetime(2023, 1, 9, 8, 0) + timedelta(minutes = 15 * n), go = 1) for n in range(40)]
+    rows += [orm.ShellDuty(duty = duties[n % 3], start_date_time = datetime(2023, 1, 9, 7, 0) + timedelta(hours = n), end_date_time = datetime(2023, 1, 9, 8, 0) + timedelta(hours = n)) for n in range(12)]
+
+    session_factory = sqlite_session_factory(rows)
+    repo = DatabaseRepository(session_factory)
+    statements = count_queries(session_factory)
+
+    personnel = repo.get_personnel()
+    assert len(statements) <= 3
+    assert len(personnel) == 60
+    assert personnel[4]._assigned_org == 'B'
+    assert personnel[4]._quals['Duty'] == {'RSU Controller'}
+    assert personnel[4]._quals['Flight'] == {'PIT IP'}
+
+    statements.clear()
+    lines = repo.get_lines(date(2023, 1, 9), date(2023, 1, 9))
+    assert len(statements) == 1
+    assert [line.flight_org for line in lines[:3]] == ['A', 'B', 'C']
+
+    statements.clear()
+    duties = repo.get_duties(date(2023, 1, 9), date(2023, 1, 9))
+    assert len(statements) == 1
+    assert [duty.type for duty in duties] == ['SOF'] * 12
+
+def test_given_database_repository_when_input_loaded_then_one_bundle_with_every_dataset_and_timing():
+    org = orm.Organization(name = 'A')
+    rows = [orm.PersonLine(person = orm.Person(last_name = 'Last%i' % n, first_name = 'First'), ausm_tier = 1, assigned_org = [org]) for n in range(3)]
+    rows += [orm.ShellLine(num = n, org = org, start_date_time = datetime(2023, 1, 9, 8 + n, 0), go = 1) for n in range(4)]
+    rows += [orm.ShellDuty(duty = orm.Duty(name = 'SOF 1', duty_type = orm.DutyType(name = 'SOF')), start_date_time = datetime(2023, 1, 9, 7, 0), end_date_time = datetime(2023, 1, 9, 15, 0))]
+    rows += [orm.AbsenceRequestDto(person_id = 1, start_date_time = datetime(2023, 1, 9, 0, 0), end_date_time = datetime(2023, 1, 9, 12, 0))]
+    repo = DatabaseRepository(sqlite_session_factory(rows))
+
+    inputs = repo.load_input(date(2023, 1, 9), date(2023, 1, 9))
+
+    assert (len(inputs.personnel()), len(inputs.lines()), len(inputs.duties()), len(inputs.absences())) == (3, 4, 1, 1)
+    assert set(inputs.timings()) == {'personnel', 'lines', 'duties', 'absences'}
+    assert inputs.wall_time() >= max(inputs.timings().values())
+    assert isinstance(inputs.lines(), tuple)
+    assert len(inputs.shell().commitments()) == 5
+
+def test_given_recurring_absence_running_for_years_when_expanded_for_window_then_only_window_occurrences_returned():
+    # weekdays (isoweekday 1 to 5) at 8 for an hour, for ten years
+    rule = RecurringAbsence(1, datetime(2020, 1, 6, 8, 0), datetime(2020, 1, 6, 9, 0), datetime(2030, 1, 6, 8, 0), 0b111110)
+    (window_start, window_end) = (datetime(2023, 1, 9), datetime(2023, 1, 16))
+
+    windowed = list(rule.occurrences(window_start, window_end))
+
+    assert [ar.start_dt() for ar in windowed] == [datetime(2023, 1, d, 8, 0) for d in range(9, 14)]
+    assert windowed == [ar for ar in rule.occurrences() if overlaps(ar.start_dt(), ar.end_dt(), window_start, window_end)]
+
+def test_given_export_timestamps_when_parsed_then_same_as_strptime():
+    for text in ('7/29/2022 12:00:00 AM', '07/29/2022 12:30:15 PM', '12/31/2023 11:59:59 PM', '1/2/2023 7:05:00 am'):
+        assert parse_timestamp(text) == datetime.strptime(text, '%m/%d/%Y %I:%M:%S %p')
+
+    with pytest.raises(ValueError):
+        parse_timestamp('2022-07-29 13:00:00')
+
+def write_csv(path, header: list[str], rows: list[list]) -> str:
+    with open(path, 'w', newline = '') as out_file:
+        writer = csv.writer(out_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    return str(path)
+
+def test_given_csv_exports_when_loaded_in_parallel_then_same_window_as_sequential(tmp_path):
+    lox_row = [''] * (max(LOX_COL) + 1)
+    (lox_row[LOX_COL.LAST_NAME], lox_row[LOX_COL.FIRST_NAME], lox_row[LOX_COL.PRSN_ID], lox_row[LOX_COL.CONTROLLER], lox_row[LOX_COL.AUSM_TIER], lox_row[LOX_COL.ASSIGNED_FLIGHT]) = ('Last', 'First', '1', 'X', '2', 'm')
+
+    filepaths = {
+        'lox': write_csv(tmp_path / 'lox.csv', ['col'] * len(lox_row), [lox_row]),
+        'flying-schedule': write_csv(tmp_path / 'lines.csv', ['num', 'takeoff', 'org'], [[n, '1/%i/2023 8:00:00 AM' % d, '1 FTS - M Flight'] for (n, d) in ((1, 8), (2, 9), (3, 10), (4, 16))]),
+        'duty-schedule': write_csv(tmp_path / 'duties.csv', ['col'] * 8, [['', '', '', 'SOF 1', '', '', '1/%i/2023 7:00:00 AM' % d, '1/%i/2023 3:00:00 PM' % d] for d in (8, 9)]),
+        'absence-requests': write_csv(tmp_path / 'absences.csv', ['col'] * 13, [
+            ['', '', 1, '', '', '', '', '', '1/2/2023 8:00:00 AM', '1/2/2023 9:00:00 AM', '', '12/31/2025 8:00:00 AM', '4'],
+            ['', '', 1, '', '', '', '', '', '1/20/2023 8:00:00 AM', '1/20/2023 9:00:00 AM', '', '1/20/2023 8:00:00 AM', '']
+        ]),
+        'published-dir': str(tmp_path)
+    }
+    (start, end) = (date(2023, 1, 9), date(2023, 1, 15))
+
+    sequential = CSVRepository(filepaths).load_input(start, end)
+    parallel = CSVRepository(filepaths, parallel_parse = True).load_input(start, end)
+
+    for inputs in (sequential, parallel):
+        assert [line.number for line in inputs.lines()] == [2, 3]
+        assert [duty.start_dt() for duty in inputs.duties()] == [datetime(2023, 1, 9, 7, 0)]
+        assert [ar.start_dt() for ar in inputs.absences()] == [datetime(2023, 1, 10, 8, 0)]
+        assert inputs.personnel()[0]._quals['Duty'] == {'RSU Controller'}
+        assert inputs.personnel()[0]._assigned_org == 'M'
+
+def test_given_csv_export_missing_columns_when_loaded_then_columns_named_in_error(tmp_path):
+    filepaths = {'lox': write_csv(tmp_path / 'lox.csv', ['col'] * 20, [['x'] * 20]), 'published-dir': str(tmp_path)}
+
+    with pytest.raises(ValueError, match = 'AUSM_TIER, ASSIGNED_FLIGHT'):
+        CSVRepository(filepaths).get_personnel()
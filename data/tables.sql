@@ -16,6 +16,7 @@ DROP TABLE duty_type CASCADE;
 
 DROP TABLE org CASCADE;
 
+DROP TABLE schedule_assignment CASCADE;
 DROP TABLE schedule CASCADE;
 
 DROP TABLE auth_group CASCADE;
@@ -115,9 +116,26 @@ CREATE TABLE IF NOT EXISTS schedule (
     start_date              DATE,
     end_date                DATE,
     submission_date_time    TIMESTAMP WITHOUT TIME ZONE,
-    status                  VARCHAR NOT NULL
+    status                  VARCHAR NOT NULL,
+    solve_wall_time         DOUBLE PRECISION
 );
 
+CREATE TABLE IF NOT EXISTS schedule_assignment (
+    id                      SERIAL PRIMARY KEY,
+    schedule_id             INT REFERENCES schedule(id) NOT NULL,
+    commitment_key          VARCHAR NOT NULL,
+    start_date_time         TIMESTAMP WITHOUT TIME ZONE,
+    end_date_time           TIMESTAMP WITHOUT TIME ZONE,
+    person_line_id          INT REFERENCES person_line(id)
+);
+
+-- builds only load the shell and absences inside the dates being scheduled
+CREATE INDEX IF NOT EXISTS shell_line_start_date_time_idx ON shell_line (start_date_time);
+CREATE INDEX IF NOT EXISTS shell_duty_start_date_time_idx ON shell_duty (start_date_time);
+CREATE INDEX IF NOT EXISTS absence_request_start_date_time_idx ON absence_request (start_date_time);
+CREATE INDEX IF NOT EXISTS absence_request_end_date_time_idx ON absence_request (end_date_time);
+CREATE INDEX IF NOT EXISTS absence_request_occur_end_date_time_idx ON absence_request (occur_end_date_time) WHERE day_of_week_ptn <> 0;
+
 CREATE TEMPORARY TABLE tmp_person (
     prsn_id INT PRIMARY KEY,
     last_name VARCHAR,